@@ -3,7 +3,13 @@ Composition Analyzer - Análise de Composição (P4 - Baixa)
 Análise espectroscópica do núcleo e coma do cometa 3I/ATLAS
 """
 
+# deadline for an NPU composition request (seconds)
+NPU_TIMEOUT = 5.0
+
 class CompositionAnalyzer:
+    # release period (s) used by the Scheduler
+    period = 2.0
+
     def __init__(self, ipc, npu_driver, priority=4):
         self.ipc = ipc
         self.npu = npu_driver
@@ -15,23 +21,38 @@ class CompositionAnalyzer:
         """Analisa composição química do cometa"""
         print(f"🔬 Analyzing composition of 3I/ATLAS from '{image_file}'...")
         
-        # Solicita processamento via NPU
-        self.ipc.send_message(
+        # Solicita processamento via NPU (request/reply com prazo)
+        future = self.ipc.request(
             sender="CompositionAnalyzer",
             receiver="NPUDriver",
-            data={'action': 'process', 'task': 'composition_analysis'}
+            data={'action': 'process', 'task': 'composition_analysis'},
+            timeout=NPU_TIMEOUT
         )
+        future.add_done_callback(self._on_npu_reply)
         # heartbeat to RecoveryAgent to show activity
         self.ipc.send_message('CompositionAnalyzer', 'RecoveryAgent', {'type': 'heartbeat'})
     
+    def _on_npu_reply(self, future):
+        """Callback do Future do pedido ao NPU"""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            print(f"[Composition] NPU request failed: {error}")
+            return
+        self.report(future.result().data.get('result', {}))
+
+    def report(self, result: dict):
+        print(f"\n📊 Composition Analysis Results:")
+        print(f"   Molecules detected: {result.get('molecules', [])}")
+        print(f"   Organic compounds: {result.get('organics', 'none')}")
+        print(f"   Comparison: {result.get('comparison', 'N/A')}")
+
     def receive_message(self, msg):
         """Handler de mensagens IPC"""
+        # uncorrelated results (e.g. a reply that arrived after the deadline)
         if msg.sender == "NPUDriver" and 'result' in msg.data:
-            result = msg.data['result']
-            print(f"\n📊 Composition Analysis Results:")
-            print(f"   Molecules detected: {result.get('molecules', [])}")
-            print(f"   Organic compounds: {result.get('organics', 'none')}")
-            print(f"   Comparison: {result.get('comparison', 'N/A')}")
+            self.report(msg.data['result'])
     
     def run(self):
         """Execução da análise científica"""
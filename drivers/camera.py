@@ -3,12 +3,24 @@ Camera Driver - Captura imagens do cometa 3I/ATLAS
 Isolado em modo usuário (P3)
 """
 
+from kernel.mmu import WRITE
+
 class CameraDriver:
-    def __init__(self, ipc, irq=None, priority=3):
+    # release period (s) used by the Scheduler
+    period = 1.0
+
+    def __init__(self, ipc, irq=None, priority=3, frame_bytes=0, mmu=None):
         self.ipc = ipc
         self.irq = irq
         self.priority = priority
         self.image_count = 0
+        # when > 0, each capture fills a zero-copy IPC buffer handed to FileSystem
+        self.frame_bytes = frame_bytes
+        # with a backed MMU, frames are captured into the driver's own region instead
+        self.mmu = mmu if mmu is not None and mmu.memory is not None else None
+        self.frame_addr = None
+        if self.mmu is not None and frame_bytes:
+            self.frame_addr = self.mmu.allocate('CameraDriver', frame_bytes)
         ipc.register("CameraDriver", self.receive_message)
         print("[DRIVER] Camera Driver loaded (isolated, P3)")
     
@@ -18,15 +30,23 @@ class CameraDriver:
         filename = f"3I_ATLAS_nucleus_{self.image_count:03d}.jpg"
         print(f"📸 Camera: Captured image '{filename}' (nucleus of 3I/ATLAS)")
         
+        data = {
+            'action': 'save',
+            'filename': filename,
+            'type': 'comet_nucleus_image'
+        }
+        if self.frame_addr is not None:
+            # FileSystem persists straight from our region, read through the grant the hub makes
+            data['region'] = self._capture_to_region(filename)
+        elif self.frame_bytes:
+            # frame goes by reference: FileSystem becomes the buffer owner on delivery
+            data['frame'] = self._capture_frame(filename)
+
         # Envia via IPC para salvar
         self.ipc.send_message(
             sender="CameraDriver",
             receiver="FileSystem",
-            data={
-                'action': 'save',
-                'filename': filename,
-                'type': 'comet_nucleus_image'
-            }
+            data=data
         )
         # Trigger a hardware IRQ to indicate capture (simulate hardware)
         if self.irq is not None:
@@ -38,6 +58,25 @@ class CameraDriver:
         self.ipc.send_message('CameraDriver', 'RecoveryAgent', {'type': 'heartbeat'})
         return filename
     
+    def _capture_frame(self, filename: str):
+        """Lê o sensor direto para um buffer do hub e devolve o handle"""
+        handle = self.ipc.alloc_buffer('CameraDriver', self.frame_bytes)
+        header = f"ATLAS-FRAME {filename}".encode('ascii')[:self.frame_bytes]
+        self.ipc.buffers.write(handle, 'CameraDriver', header)
+        # simulated pixel data fills the rest of the frame
+        self.ipc.buffers.write(handle, 'CameraDriver', bytes(self.frame_bytes - len(header)), offset=len(header))
+        return handle
+
+    def _capture_to_region(self, filename: str):
+        """Lê o sensor direto para a região do driver na MMU e devolve o handle"""
+        view = self.mmu.view('CameraDriver', self.frame_addr, self.frame_bytes, WRITE)
+        header = f"ATLAS-FRAME {filename}".encode('ascii')[:self.frame_bytes]
+        view[:len(header)] = header
+        # simulated pixel data fills the rest of the frame
+        view[len(header):] = bytes(self.frame_bytes - len(header))
+        view.release()
+        return self.mmu.handle('CameraDriver', self.frame_addr)
+
     def receive_message(self, msg):
         """Handler de mensagens IPC"""
         if msg.data.get('action') == 'capture':
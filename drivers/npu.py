@@ -4,6 +4,9 @@ Processamento de IA para navegação e análise (P3)
 """
 
 class NPUDriver:
+    # release period (s) used by the Scheduler
+    period = 1.0
+
     def __init__(self, ipc, priority=3):
         self.ipc = ipc
         self.priority = priority
@@ -29,11 +32,8 @@ class NPUDriver:
         """Handler de mensagens IPC"""
         if msg.data.get('action') == 'process':
             result = self.process(msg.data)
-            self.ipc.send_message(
-                sender="NPUDriver",
-                receiver=msg.sender,
-                data={'result': result}
-            )
+            # reply() routes the result back to the matching request by correlation id
+            self.ipc.reply(msg, {'result': result})
             # heartbeat after processing
             self.ipc.send_message('NPUDriver', 'RecoveryAgent', {'type': 'heartbeat'})
     
@@ -3,15 +3,27 @@ PropulsionDriver - controla os propulsores (thrusters)
 Recebe comandos via IPC: { action: 'burn'|'thrust'|'stop', duration, thrust }
 Envia telemetria e heartbeats para RecoveryAgent.
 """
+import asyncio
 import time
 
+# simulated settle time (s) of a burn
+BURN_SETTLE = 0.01
+
+
 class PropulsionDriver:
+    # release period (s) used by the Scheduler
+    period = 1.0
+
     def __init__(self, ipc, irq=None, priority=3):
         self.ipc = ipc
         self.irq = irq
         self.priority = priority
         self.state = 'IDLE'
-        ipc.register('PropulsionDriver', self.receive_message)
+        # asyncio runtime: the burn awaits the hardware instead of sleeping on the loop
+        if getattr(ipc, 'loop', None) is not None:
+            ipc.register('PropulsionDriver', self.receive_message_async)
+        else:
+            ipc.register('PropulsionDriver', self.receive_message)
         print('[DRIVER] Propulsion Driver loaded (isolated, P3)')
 
     def receive_message(self, msg):
@@ -20,26 +32,52 @@ class PropulsionDriver:
         if action == 'burn' or action == 'thrust':
             duration = data.get('duration', 100)
             thrust = data.get('thrust', 1.0)
-            self.perform_burn(duration, thrust)
-            # ACK to sender
-            self.ipc.send_message('PropulsionDriver', msg.sender, {'status': 'ack', 'action': action})
+            # ACK to sender goes out in the same batch as the burn telemetry
+            self.perform_burn(duration, thrust, ack=(msg.sender, {'status': 'ack', 'action': action}))
         elif action == 'stop':
             self.state = 'IDLE'
             self.ipc.send_message('PropulsionDriver', msg.sender, {'status': 'stopped'})
 
-    def perform_burn(self, duration_ms, thrust):
+    async def receive_message_async(self, msg):
+        """Handler do runtime asyncio: o burn aguarda sem bloquear o loop"""
+        data = msg.data or {}
+        action = data.get('action')
+        if action == 'burn' or action == 'thrust':
+            duration = data.get('duration', 100)
+            thrust = data.get('thrust', 1.0)
+            await self.perform_burn_async(duration, thrust, ack=(msg.sender, {'status': 'ack', 'action': action}))
+        else:
+            self.receive_message(msg)
+
+    def perform_burn(self, duration_ms, thrust, ack=None):
+        self._begin_burn(duration_ms, thrust)
+        # simulate short activity
+        time.sleep(BURN_SETTLE)
+        self._end_burn(duration_ms, thrust, ack)
+
+    async def perform_burn_async(self, duration_ms, thrust, ack=None):
+        self._begin_burn(duration_ms, thrust)
+        await asyncio.sleep(BURN_SETTLE)
+        self._end_burn(duration_ms, thrust, ack)
+
+    def _begin_burn(self, duration_ms, thrust):
         self.state = 'BURNING'
         print(f"🔥 Propulsion: performing burn for {duration_ms} ms at thrust {thrust}")
-        # simulate short activity
-        time.sleep(0.01)
-        # send telemetry and heartbeat to RecoveryAgent
-        self.ipc.send_message('PropulsionDriver', 'RecoveryAgent', {'type': 'heartbeat'})
-        self.ipc.send_message('PropulsionDriver', 'RecoveryAgent', {'telemetry': {'thrust': thrust, 'duration_ms': duration_ms}})
-        # send telemetry also to Energy Manager
+
+    def _end_burn(self, duration_ms, thrust, ack=None):
+        # heartbeat + telemetry to RecoveryAgent and EnergyManager (+ optional ACK) in one hub operation
+        telemetry = {'thrust': thrust, 'duration_ms': duration_ms}
+        batch = [
+            ('RecoveryAgent', {'type': 'heartbeat'}),
+            ('RecoveryAgent', {'telemetry': telemetry}),
+            ('EnergyManager', {'telemetry': telemetry}),
+        ]
+        if ack is not None:
+            batch.append(ack)
         try:
-            self.ipc.send_message('PropulsionDriver', 'EnergyManager', {'telemetry': {'thrust': thrust, 'duration_ms': duration_ms}})
-        except Exception:
-            pass
+            self.ipc.send_many('PropulsionDriver', batch)
+        except Exception as e:
+            print(f"[Propulsion] Telemetry batch failed: {e}")
         # simulate hardware IRQ on burn complete
         if self.irq is not None:
             try:
@@ -0,0 +1,150 @@
+"""
+Buffers de payload sem cópia para o IPC
+
+Frames de câmera e tensores da NPU não devem trafegar como dicts copiados.
+Um processo aloca um buffer no pool do hub, escreve nele através de um
+`memoryview` e envia apenas o `BufferHandle` (referência + comprimento) no
+payload da mensagem. O hub aplica a semântica de posse:
+
+- só o dono atual obtém views, transfere ou libera o buffer
+- ao enviar um handle ponto a ponto, a posse passa ao destinatário
+- depois de liberado, qualquer acesso ao handle falha
+
+Backends: 'shm' (`multiprocessing.shared_memory`, visível por outros
+processos) ou 'heap' (`bytearray`, apenas no mesmo interpretador).
+"""
+
+import itertools
+import threading
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # pragma: no cover - platforms without shared memory
+    shared_memory = None
+
+
+class BufferOwnershipError(Exception):
+    """Acesso a buffer por quem não é o dono, ou a buffer já liberado"""
+
+
+class BufferHandle:
+    """Referência leve (e serializável) a um buffer do pool"""
+    __slots__ = ('buffer_id', 'shm_name', 'size', 'length', 'owner')
+
+    def __init__(self, buffer_id: int, shm_name, size: int, owner: str):
+        self.buffer_id = buffer_id
+        self.shm_name = shm_name
+        self.size = size
+        self.length = 0
+        self.owner = owner
+
+    def __getstate__(self):
+        return (self.buffer_id, self.shm_name, self.size, self.length, self.owner)
+
+    def __setstate__(self, state):
+        self.buffer_id, self.shm_name, self.size, self.length, self.owner = state
+
+    def __repr__(self):
+        return f"BufferHandle(#{self.buffer_id} {self.length}/{self.size}B owner={self.owner})"
+
+
+class BufferPool:
+    """Pool de buffers com posse controlada pelo hub"""
+
+    def __init__(self, backend: str = 'shm'):
+        if backend == 'shm' and shared_memory is None:
+            backend = 'heap'
+        if backend not in ('shm', 'heap'):
+            raise ValueError(f"Unknown buffer backend: {backend}")
+        self.backend = backend
+        # buffer id -> (handle, storage); storage is SharedMemory or bytearray
+        self._buffers = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buffers)
+
+    def allocate(self, owner: str, size: int) -> BufferHandle:
+        """Aloca um buffer de `size` bytes pertencente a `owner`"""
+        if size < 1:
+            raise ValueError("Buffer size must be >= 1")
+        buffer_id = next(self._ids)
+        if self.backend == 'shm':
+            storage = shared_memory.SharedMemory(create=True, size=size)
+            handle = BufferHandle(buffer_id, storage.name, size, owner)
+        else:
+            storage = bytearray(size)
+            handle = BufferHandle(buffer_id, None, size, owner)
+        with self._lock:
+            self._buffers[buffer_id] = (handle, storage)
+        return handle
+
+    def _lookup(self, handle: BufferHandle, process_name: str):
+        entry = self._buffers.get(handle.buffer_id)
+        if entry is None:
+            raise BufferOwnershipError(f"Buffer #{handle.buffer_id} was released")
+        owned, storage = entry
+        if owned.owner != process_name:
+            raise BufferOwnershipError(
+                f"'{process_name}' does not own buffer #{handle.buffer_id} (owner: '{owned.owner}')")
+        return owned, storage
+
+    def view(self, handle: BufferHandle, process_name: str, whole: bool = False) -> memoryview:
+        """View sem cópia do conteúdo válido (`length` bytes, ou tudo com `whole`)"""
+        with self._lock:
+            owned, storage = self._lookup(handle, process_name)
+        raw = storage.buf if self.backend == 'shm' else memoryview(storage)
+        return raw if whole else raw[:owned.length]
+
+    def write(self, handle: BufferHandle, process_name: str, data, offset: int = 0) -> int:
+        """Copia `data` para o buffer (a única cópia: da origem para o buffer)"""
+        end = offset + len(data)
+        if end > handle.size:
+            raise ValueError(f"Write of {len(data)} bytes at {offset} exceeds buffer size {handle.size}")
+        view = self.view(handle, process_name, whole=True)
+        view[offset:end] = data
+        with self._lock:
+            owned, _ = self._lookup(handle, process_name)
+            owned.length = max(owned.length, end)
+            handle.length = owned.length
+        return end
+
+    def transfer(self, handle: BufferHandle, from_process: str, to_process: str):
+        """Passa a posse do buffer para outro processo"""
+        with self._lock:
+            owned, _ = self._lookup(handle, from_process)
+            owned.owner = to_process
+            handle.owner = to_process
+
+    def release(self, handle: BufferHandle, process_name: str):
+        """Libera o buffer; apenas o dono atual pode liberar"""
+        with self._lock:
+            _, storage = self._lookup(handle, process_name)
+            del self._buffers[handle.buffer_id]
+        if self.backend == 'shm':
+            try:
+                storage.close()
+            except BufferError:
+                # a caller still holds a view; the segment is freed once it is dropped
+                pass
+            storage.unlink()
+
+    def owner_of(self, handle: BufferHandle):
+        entry = self._buffers.get(handle.buffer_id)
+        return entry[0].owner if entry else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'backend': self.backend,
+                'buffers': len(self._buffers),
+                'bytes': sum(h.size for h, _ in self._buffers.values()),
+            }
+
+    def close(self):
+        """Libera todos os buffers restantes (shutdown)"""
+        with self._lock:
+            entries = list(self._buffers.values())
+        for handle, _ in entries:
+            self.release(handle, handle.owner)
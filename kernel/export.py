@@ -0,0 +1,58 @@
+"""
+Exportação do estado do kernel para o servidor Node (dashboard)
+
+`StateExporter` publica periodicamente `Scheduler.snapshot()` (cpu real,
+perdas de prazo, latência e jitter por processo) via POST em
+`/api/kernel/state`. O servidor passa a servir essa tabela em `/api/state`,
+de onde o dashboard e `tools/process_snapshot.py` leem. Sem servidor no ar,
+cada tentativa falha em silêncio e a próxima tenta de novo.
+"""
+
+import json
+import threading
+import urllib.request
+
+DEFAULT_URL = 'http://localhost:3001/api/kernel/state'
+
+
+class StateExporter:
+    """Thread que envia o snapshot do escalonador ao servidor Node"""
+
+    def __init__(self, scheduler, url: str = DEFAULT_URL, interval: float = 1.0):
+        self.scheduler = scheduler
+        self.url = url
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._linked = False
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, daemon=True, name='state-export')
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.push()
+            self._stop.wait(self.interval)
+
+    def push(self) -> bool:
+        """Envia um snapshot; False se o servidor não respondeu"""
+        body = json.dumps(self.scheduler.snapshot()).encode('utf-8')
+        request = urllib.request.Request(self.url, data=body, method='POST',
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=2) as response:
+                response.read()
+        except Exception:
+            # the dashboard server is optional: log only link changes, not every retry
+            if self._linked:
+                print(f"[KERNEL] State export to {self.url} lost")
+            self._linked = False
+            return False
+        if not self._linked:
+            print(f"[KERNEL] Exporting scheduler state to {self.url}")
+        self._linked = True
+        return True
@@ -1,38 +1,1166 @@
 """
 IPC - Inter-Process Communication (Hub-and-Spoke)
 Todos os processos comunicam-se exclusivamente via IPC
+
+Modos de entrega:
+- síncrono (padrão): o callback do destinatário roda na pilha do remetente
+- assíncrono (opt-in, `IPC(async_mode=True)`): cada processo registrado ganha
+  uma mailbox limitada drenada por um dispatcher próprio; quando a mailbox
+  enche, a política de backpressure decide entre bloquear, descartar a mais
+  antiga, descartar a nova ou rejeitar com erro
+
+Além de `send_message` (ponto a ponto) e `broadcast` (todos os processos), o
+hub oferece publish/subscribe por tópico: `publish` só entrega aos inscritos
+no tópico, e todos eles recebem a mesma mensagem com payload imutável.
+
+Request/reply: `request` devolve um `concurrent.futures.Future` (ou um
+awaitable via `request_async`); o servidor responde com `reply(msg, data)` e o
+hub casa a resposta com o pedido pelo id de correlação, respeitando o prazo
+de cada chamada.
+
+Herança de prioridade: um pedido carrega a classe do requisitante (a
+prioridade efetiva dele no escalonador, se houver). Com
+`attach_scheduler(scheduler)`, o servidor que deve respostas roda na classe
+do requisitante mais crítico enquanto houver pedidos pendentes e volta à
+prioridade base quando o último é resolvido. O tempo que um pedido passa
+atrás de pedidos menos críticos já pendentes no mesmo servidor entra nas
+métricas como inversão.
+
+No modo assíncrono as entregas pendentes de cada mailbox são ordenadas pela
+classe de prioridade (P1–P4 de `kernel.scheduler`) do remetente, com
+envelhecimento: cada classe de distância equivale a
+`aging_step` segundos de espera, então tráfego P4 nunca fica parado para sempre.
+
+Payloads grandes (frames, tensores) vão em buffers do pool do hub
+(`alloc_buffer`); a mensagem carrega só o `BufferHandle` e a posse do buffer
+passa do remetente ao destinatário na entrega (veja `kernel.buffers`).
+Com `attach_mmu(mmu)`, um `RegionHandle` no payload de uma mensagem ponto a
+ponto ou de um `publish` concede ao destinatário acesso à região da MMU
+(veja `kernel.mmu`), e as mudanças de pressão de memória da MMU são
+publicadas no tópico 'memory.pressure'.
+
+Mensagens para processos não registrados vão para uma fila de dead letters
+limitada (teto por destinatário e TTL). Quando o processo se registra de novo
+(ex.: restart hook do RecoveryAgent), o hub reentrega essas mensagens em
+ordem e com limite de taxa.
+
+Falhas de handlers ficam isoladas do remetente: exceções são registradas,
+cada destinatário pode ter um orçamento de tempo por entrega e quem falha
+repetidamente entra em quarentena, com aviso ao RecoveryAgent (veja
+`kernel.supervisor`).
 """
 
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from types import MappingProxyType
+
+from kernel.buffers import BufferPool, BufferHandle, BufferOwnershipError
+from kernel.metrics import IPCMetrics
+from kernel.mmu import RegionHandle, MEMORY_PRESSURE_TOPIC
+from kernel.scheduler import P4_LOW
+from kernel.supervisor import (HandlerSupervisor, HandlerRunner, DEFAULT_FAULT_THRESHOLD,
+                               DEFAULT_QUARANTINE_PERIOD, ERROR, OVERRUN, TIMEOUT, QUARANTINED)
+from kernel.trace import make_tracer, SEND, BROADCAST, PUBLISH
+
+# Backpressure policies for bounded mailboxes
+BLOCK = 'block'
+DROP_OLDEST = 'drop_oldest'
+DROP_NEWEST = 'drop_newest'
+REJECT = 'reject'
+BACKPRESSURE_POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST, REJECT)
+
+DEFAULT_MAILBOX_CAPACITY = 64
+# priority assumed for senders the hub does not know (e.g. 'Tester')
+DEFAULT_PRIORITY = P4_LOW
+# seconds of waiting that compensate one priority class in mailbox ordering
+DEFAULT_AGING_STEP = 0.05
+# dead-letter retention and replay pacing
+DEFAULT_DEAD_LETTER_CAP = 256
+DEFAULT_DEAD_LETTER_TTL = 60.0
+DEFAULT_REPLAY_RATE = 200.0
+
+# Receives handler_fault reports when a receiver is quarantined
+RECOVERY_AGENT = 'RecoveryAgent'
+# Sender of MMU memory-pressure publications
+MMU_SENDER = 'MMU'
+
+# global sequence ids; next() on itertools.count is atomic under the GIL
+_sequence = itertools.count(1)
+
+
+class MailboxFullError(Exception):
+    """Mailbox cheia com política 'reject'"""
+
+
 class Message:
-    def __init__(self, sender: str, receiver: str, data: dict):
+    """Envelope de mensagem IPC (com __slots__, sem __dict__ por instância).
+
+    Além de remetente, destinatário e payload, carrega um número de sequência
+    global monotônico, o instante de envio (`time.monotonic_ns()`), a
+    prioridade herdada do remetente e um id de correlação opcional.
+    """
+    __slots__ = ('sender', 'receiver', 'data', 'seq', 'timestamp_ns', 'priority', 'correlation_id')
+
+    def __init__(self, sender: str, receiver: str, data: dict, priority: int = DEFAULT_PRIORITY,
+                 correlation_id=None):
         self.sender = sender
         self.receiver = receiver
         self.data = data
+        self.seq = next(_sequence)
+        self.timestamp_ns = time.monotonic_ns()
+        self.priority = priority
+        self.correlation_id = correlation_id
+
+    def age_ns(self) -> int:
+        """Tempo desde o envio, em ns"""
+        return time.monotonic_ns() - self.timestamp_ns
+
+    def __repr__(self):
+        return (f"Message(#{self.seq} {self.sender} → {self.receiver} P{self.priority}"
+                f"{'' if self.correlation_id is None else f' corr={self.correlation_id}'})")
+
+
+class Mailbox:
+    """Fila limitada de um processo, drenada por uma thread dispatcher dedicada.
+
+    Um consumidor lento só atrasa a própria mailbox: os remetentes apenas
+    enfileiram e seguem, exceto na política 'block' com a fila cheia.
+
+    As entregas saem em ordem de prazo virtual `chegada + classe * aging_step`,
+    onde a classe é a do remetente (mesmo quando o destinatário é crítico).
+    Assim uma mensagem P1 ultrapassa tráfego P4 recém-chegado, mas uma P4 que já esperou
+    `3 * aging_step` volta a ter a vez.
+    """
+
+    def __init__(self, owner: str, callback, capacity: int = DEFAULT_MAILBOX_CAPACITY,
+                 policy: str = BLOCK, block_timeout: float = None,
+                 aging_step: float = DEFAULT_AGING_STEP, batch_callback=None, observer=None,
+                 budget: float = None, on_drop=None):
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        if capacity < 1:
+            raise ValueError("Mailbox capacity must be >= 1")
+        self.owner = owner
+        self.callback = callback
+        self.batch_callback = batch_callback
+        # observer(owner, msgs, started_ns, error, budget, reported) is told about every handler run
+        self.observer = observer
+        # per-invocation time budget (s); a stalled handler is reported once
+        self.budget = budget
+        # on_drop(owner, msg) is told about every message refused or evicted, outside the lock
+        self.on_drop = on_drop
+        self.capacity = capacity
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.aging_step = aging_step
+        self.dropped = 0
+        self.rejected = 0
+        self.delivered = 0
+        # heap of (virtual deadline, seq, delivery class, msg)
+        self._items = []
+        self._busy = False
+        self._started = 0.0
+        self._stall_reported = False
+        self._running = True
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._dispatch_loop, name=f"ipc-{owner}", daemon=True)
+        self._thread.start()
+
+    def depth(self) -> int:
+        return len(self._items)
+
+    def put(self, msg: Message) -> bool:
+        """Enfileira mensagem aplicando a política de backpressure.
+
+        Retorna False se a mensagem foi descartada.
+        """
+        dropped = []
+        try:
+            with self._cond:
+                accepted = self._put_locked(msg, dropped)
+                self._cond.notify_all()
+                return accepted
+        finally:
+            self._notify_dropped(dropped)
+
+    def put_many(self, msgs: list) -> int:
+        """Enfileira várias mensagens numa única aquisição do lock.
+
+        Retorna quantas foram aceitas.
+        """
+        accepted = 0
+        dropped = []
+        try:
+            with self._cond:
+                try:
+                    for i, msg in enumerate(msgs):
+                        if self._put_locked(msg, dropped):
+                            accepted += 1
+                except MailboxFullError:
+                    # the rest of the batch is refused with the rejected message
+                    dropped.extend(msgs[i + 1:])
+                    raise
+                finally:
+                    self._cond.notify_all()
+        finally:
+            self._notify_dropped(dropped)
+        return accepted
+
+    def _notify_dropped(self, dropped: list):
+        if dropped and self.on_drop is not None:
+            for msg in dropped:
+                self.on_drop(self.owner, msg)
+
+    def _put_locked(self, msg: Message, dropped: list) -> bool:
+        # a handler posting to its own mailbox must never wait on itself
+        own_thread = threading.current_thread() is self._thread
+        if len(self._items) >= self.capacity and not own_thread:
+            if self.policy == DROP_NEWEST:
+                self.dropped += 1
+                dropped.append(msg)
+                return False
+            if self.policy == DROP_OLDEST:
+                self.dropped += 1
+                victim = self._least_urgent()
+                if msg.priority > self._items[victim][2]:
+                    # the arrival itself is the least critical message: it is the one dropped
+                    dropped.append(msg)
+                    return False
+                dropped.append(self._evict(victim))
+            elif self.policy == REJECT:
+                self.rejected += 1
+                dropped.append(msg)
+                raise MailboxFullError(f"Mailbox of '{self.owner}' is full ({self.capacity})")
+            else:
+                deadline = None if self.block_timeout is None else time.monotonic() + self.block_timeout
+                while len(self._items) >= self.capacity and self._running:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self.dropped += 1
+                        dropped.append(msg)
+                        return False
+                    self._cond.wait(remaining)
+        rank = msg.priority
+        heapq.heappush(self._items, (time.monotonic() + rank * self.aging_step, msg.seq, rank, msg))
+        return True
+
+    def _least_urgent(self) -> int:
+        # index of the oldest entry of the least critical class; called with _cond held
+        return min(range(len(self._items)), key=lambda i: (-self._items[i][2], self._items[i][1]))
+
+    def _evict(self, victim: int) -> Message:
+        msg = self._items[victim][3]
+        self._items[victim] = self._items[-1]
+        self._items.pop()
+        heapq.heapify(self._items)
+        return msg
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                while not self._items and self._running:
+                    self._cond.wait()
+                if not self._items:
+                    return
+                batch_callback = self.batch_callback
+                if batch_callback is not None:
+                    # batch receivers take everything pending in one invocation
+                    msgs = [heapq.heappop(self._items)[3] for _ in range(len(self._items))]
+                else:
+                    msgs = [heapq.heappop(self._items)[3]]
+                self._busy = True
+                self._started = time.monotonic()
+                self._stall_reported = False
+                # wake senders blocked on a full mailbox
+                self._cond.notify_all()
+            started_ns = time.monotonic_ns()
+            error = None
+            try:
+                if batch_callback is not None:
+                    batch_callback(msgs)
+                else:
+                    self.callback(msgs[0])
+            except Exception as e:
+                error = e
+            finally:
+                if self.observer is not None:
+                    # a stall already reported is not counted again as an overrun
+                    self.observer(self.owner, msgs, started_ns, error, self.budget, self._stall_reported)
+                elif error is not None:
+                    print(f"[IPC] Handler of '{self.owner}' failed: {error}")
+                with self._cond:
+                    self._busy = False
+                    self.delivered += len(msgs)
+                    self._cond.notify_all()
+
+    def check_stall(self) -> bool:
+        """True (uma vez por invocação) se o handler corrente passou do orçamento"""
+        if self.budget is None or not self._busy:
+            return False
+        with self._cond:
+            if (not self._busy or self._stall_reported
+                    or time.monotonic() - self._started < self.budget):
+                return False
+            self._stall_reported = True
+            return True
+
+    def idle(self) -> bool:
+        with self._cond:
+            return not self._items and not self._busy
+
+    def join(self, timeout: float = None) -> bool:
+        """Espera a mailbox esvaziar e o handler corrente terminar"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._items or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self) -> list:
+        """Para o dispatcher e devolve as mensagens que ainda não foram entregues"""
+        with self._cond:
+            self._running = False
+            pending = [entry[3] for entry in sorted(self._items)]
+            self._items = []
+            self._cond.notify_all()
+        return pending
+
+
+class DeadLetterQueue:
+    """Retém mensagens de destinatários ausentes, com teto por destinatário e TTL.
+
+    Ao atingir o teto, a mensagem mais antiga daquele destinatário é
+    descartada; mensagens mais velhas que `ttl` segundos expiram. Durante um
+    replay, novas mensagens para o destinatário entram no fim da fila para
+    preservar a ordem de entrega. `on_discard(msg)` é avisado de cada
+    mensagem descartada ou expirada, fora do lock.
+    """
+
+    def __init__(self, per_receiver_cap: int = DEFAULT_DEAD_LETTER_CAP, ttl: float = DEFAULT_DEAD_LETTER_TTL,
+                 on_discard=None):
+        if per_receiver_cap < 1:
+            raise ValueError("Dead-letter cap must be >= 1")
+        self.per_receiver_cap = per_receiver_cap
+        self.ttl = ttl
+        self.evicted_cap = 0
+        self.expired = 0
+        self.replayed = 0
+        self.on_discard = on_discard
+        self._queues = {}
+        self._replaying = set()
+        # messages evicted or expired under the lock, handed to on_discard after releasing it
+        self._discarded = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            yield
+            discarded, self._discarded = self._discarded, []
+        if discarded and self.on_discard is not None:
+            for msg in discarded:
+                self.on_discard(msg)
+
+    def __len__(self):
+        with self._locked():
+            self._expire_all()
+            return sum(len(q) for q in self._queues.values())
+
+    def _expire(self, receiver: str, queue: deque):
+        # called with _lock held; messages are appended in age order
+        if self.ttl is None:
+            return
+        limit = time.monotonic_ns() - int(self.ttl * 1e9)
+        while queue and queue[0].timestamp_ns < limit:
+            self._discarded.append(queue.popleft())
+            self.expired += 1
+        if not queue and receiver not in self._replaying:
+            del self._queues[receiver]
+
+    def _expire_all(self):
+        for receiver, queue in list(self._queues.items()):
+            self._expire(receiver, queue)
+
+    def _append(self, msg: Message):
+        queue = self._queues.get(msg.receiver)
+        if queue is None:
+            queue = self._queues[msg.receiver] = deque()
+        if len(queue) >= self.per_receiver_cap:
+            self._discarded.append(queue.popleft())
+            self.evicted_cap += 1
+        queue.append(msg)
+
+    def put(self, msg: Message):
+        with self._locked():
+            self._append(msg)
+
+    def put_many(self, msgs: list):
+        with self._locked():
+            for msg in msgs:
+                self._append(msg)
+
+    def defer_if_replaying(self, receiver: str, msgs: list) -> bool:
+        """Se `receiver` está em replay, enfileira `msgs` atrás das pendentes"""
+        with self._locked():
+            if receiver not in self._replaying:
+                return False
+            for msg in msgs:
+                self._append(msg)
+            return True
+
+    def begin_replay(self, receiver: str) -> bool:
+        """Marca início de replay; False se não há nada retido para o destinatário"""
+        with self._locked():
+            queue = self._queues.get(receiver)
+            if queue is not None:
+                self._expire(receiver, queue)
+            if not self._queues.get(receiver) or receiver in self._replaying:
+                return False
+            self._replaying.add(receiver)
+            return True
+
+    def next_replay(self, receiver: str):
+        """Próxima mensagem a reentregar; ao esvaziar, encerra o replay"""
+        with self._locked():
+            queue = self._queues.get(receiver)
+            if queue is not None:
+                self._expire(receiver, queue)
+            if not queue:
+                self._replaying.discard(receiver)
+                self._queues.pop(receiver, None)
+                return None
+            self.replayed += 1
+            return queue.popleft()
+
+    def abort_replay(self, receiver: str, msg: Message):
+        """Devolve `msg` ao início da fila e encerra o replay"""
+        with self._locked():
+            queue = self._queues.get(receiver)
+            if queue is None:
+                queue = self._queues[receiver] = deque()
+            queue.appendleft(msg)
+            self.replayed -= 1
+            self._replaying.discard(receiver)
+
+    def messages(self, receiver: str = None) -> list:
+        with self._locked():
+            self._expire_all()
+            if receiver is not None:
+                return list(self._queues.get(receiver, ()))
+            return sorted((m for q in self._queues.values() for m in q), key=lambda m: m.seq)
+
+    def stats(self) -> dict:
+        with self._locked():
+            self._expire_all()
+            return {
+                'retained': {r: len(q) for r, q in self._queues.items()},
+                'evicted_cap': self.evicted_cap,
+                'expired': self.expired,
+                'replayed': self.replayed,
+            }
+
 
 class IPC:
-    def __init__(self):
-        self.message_queue = []
+    def __init__(self, async_mode: bool = False, mailbox_capacity: int = DEFAULT_MAILBOX_CAPACITY,
+                 backpressure: str = BLOCK, block_timeout: float = None, trace='console',
+                 aging_step: float = DEFAULT_AGING_STEP, buffer_backend: str = 'shm',
+                 dead_letter_cap: int = DEFAULT_DEAD_LETTER_CAP, dead_letter_ttl: float = DEFAULT_DEAD_LETTER_TTL,
+                 replay_rate: float = DEFAULT_REPLAY_RATE, metrics: bool = True,
+                 handler_budget: float = None, fault_threshold: int = DEFAULT_FAULT_THRESHOLD,
+                 quarantine_period: float = DEFAULT_QUARANTINE_PERIOD):
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {backpressure}")
+        self.dead_letters = DeadLetterQueue(dead_letter_cap, dead_letter_ttl, on_discard=self._discard_dead_letter)
+        self.replay_rate = replay_rate
         self.registered_processes = {}
-        print("[KERNEL] IPC Hub initialized (Hub-and-Spoke)")
-    
-    def register(self, process_name: str, callback):
-        """Registra processo no hub IPC"""
+        # process name -> callable taking a list of messages (opt-in)
+        self.batch_handlers = {}
+        # process name -> scheduling priority, stamped on outgoing messages
+        self.priorities = {}
+        # process name -> handler time budget (s); None means unbounded
+        self.handler_budget = handler_budget
+        self.handler_budgets = {}
+        self.supervisor = HandlerSupervisor(fault_threshold, quarantine_period)
+        # sync mode: process name -> HandlerRunner for receivers with a budget
+        self._runners = {}
+        self._runners_lock = threading.Lock()
+        self.async_mode = async_mode
+        self.mailbox_capacity = mailbox_capacity
+        self.backpressure = backpressure
+        self.block_timeout = block_timeout
+        self.aging_step = aging_step
+        self.mailboxes = {}
+        self.tracer = make_tracer(trace)
+        self.metrics = IPCMetrics() if metrics else None
+        self.buffers = BufferPool(buffer_backend)
+        # topic -> tuple of subscriber names (copy-on-write, iterated lock-free)
+        self.subscriptions = {}
+        self._subs_lock = threading.Lock()
+        # correlation id -> (future, requester, server) for in-flight requests
+        self._pending = {}
+        self._deadlines = []
+        self._pending_cond = threading.Condition()
+        self._reaper = None
+        self._correlation = itertools.count(1)
+        # receiver -> {correlation id: requester priority} of the requests it owes
+        self._inheritance = {}
+        # receiver -> {correlation id: (less critical requests it found pending, since ns)}
+        self._inversions = {}
+        self._inherit_lock = threading.Lock()
+        self.scheduler = None
+        self.mmu = None
+        mode = "async mailboxes" if async_mode else "Hub-and-Spoke"
+        print(f"[KERNEL] IPC Hub initialized ({mode})")
+
+    def register(self, process_name: str, callback, mailbox_capacity: int = None,
+                 backpressure: str = None, priority: int = None, batch_callback=None,
+                 handler_budget: float = None):
+        """Registra processo no hub IPC
+
+        No modo assíncrono, `mailbox_capacity` e `backpressure` sobrescrevem
+        os padrões do hub para este processo. Sem `priority` explícita, usa o
+        atributo `priority` da instância dona do callback, se houver.
+        Com `batch_callback`, o processo recebe lotes (lista de `Message`)
+        numa única chamada: os de `send_many` e, no modo assíncrono, tudo que
+        estiver pendente na mailbox. `handler_budget` (s) sobrescreve o
+        orçamento de tempo por entrega do hub; registrar de novo encerra uma
+        quarentena.
+        """
+        if priority is None:
+            priority = getattr(getattr(callback, '__self__', None), 'priority', None)
+        if priority is not None:
+            self.priorities[process_name] = priority
+        if batch_callback is not None:
+            self.batch_handlers[process_name] = batch_callback
+        else:
+            self.batch_handlers.pop(process_name, None)
+        budget = handler_budget if handler_budget is not None else self.handler_budget
+        if budget is not None:
+            self.handler_budgets[process_name] = budget
+        else:
+            self.handler_budgets.pop(process_name, None)
+        if self.supervisor.reset(process_name):
+            print(f"[IPC] '{process_name}' re-registered, quarantine lifted")
+        # a runner stuck in the old handler is abandoned with it
+        self._close_runner(process_name)
+        if self.async_mode:
+            mailbox = self.mailboxes.get(process_name)
+            if mailbox is None:
+                self.mailboxes[process_name] = Mailbox(
+                    process_name, callback,
+                    capacity=mailbox_capacity or self.mailbox_capacity,
+                    policy=backpressure or self.backpressure,
+                    block_timeout=self.block_timeout,
+                    aging_step=self.aging_step,
+                    batch_callback=batch_callback,
+                    observer=self._observe,
+                    budget=budget,
+                    on_drop=self._dropped,
+                )
+            else:
+                # re-registration (e.g. restart hook) keeps pending messages
+                mailbox.callback = callback
+                mailbox.batch_callback = batch_callback
+                mailbox.budget = budget
+        # mark the replay before publishing the callback so concurrent senders queue behind it
+        replay = self.dead_letters.begin_replay(process_name)
         self.registered_processes[process_name] = callback
         print(f"  → Process '{process_name}' registered in IPC Hub")
-    
-    def send_message(self, sender: str, receiver: str, data: dict):
-        """Envia mensagem via hub central"""
-        msg = Message(sender, receiver, data)
-        print(f"📨 IPC: {sender} → {receiver} | {data}")
-        
+        if replay:
+            self._spawn_replay(process_name)
+
+    @property
+    def message_queue(self) -> list:
+        """Mensagens retidas para destinatários ausentes (ordem de envio)"""
+        return self.dead_letters.messages()
+
+    def _spawn_replay(self, process_name: str):
+        threading.Thread(target=self._replay_dead_letters, args=(process_name,),
+                         name=f"ipc-replay-{process_name}", daemon=True).start()
+
+    def _replay_dead_letters(self, process_name: str):
+        """Reentrega as dead letters de um processo re-registrado, em ordem e com limite de taxa"""
+        interval = 1.0 / self.replay_rate if self.replay_rate else 0.0
+        count = 0
+        while True:
+            msg = self.dead_letters.next_replay(process_name)
+            if msg is None:
+                break
+            if (process_name not in self.registered_processes
+                    or self.supervisor.is_quarantined(process_name)):
+                # went away (or was quarantined) again mid-replay: keep the rest for the next registration
+                self.dead_letters.abort_replay(process_name, msg)
+                break
+            try:
+                self._deliver(process_name, msg)
+                count += 1
+            except Exception as e:
+                print(f"[IPC] Replay to '{process_name}' failed: {e}")
+            if interval:
+                time.sleep(interval)
+        if count:
+            print(f"[IPC] Replayed {count} queued message(s) to '{process_name}'")
+
+    def unregister(self, process_name: str):
+        """Remove processo do hub; mensagens pendentes na mailbox vão para a fila"""
+        self.registered_processes.pop(process_name, None)
+        self.batch_handlers.pop(process_name, None)
+        mailbox = self.mailboxes.pop(process_name, None)
+        if mailbox is not None:
+            self.dead_letters.put_many(mailbox.close())
+        self._close_runner(process_name)
+        print(f"  → Process '{process_name}' unregistered from IPC Hub")
+
+    def _close_runner(self, process_name: str):
+        with self._runners_lock:
+            runner = self._runners.pop(process_name, None)
+        if runner is not None:
+            runner.close()
+
+    def set_priority(self, process_name: str, priority: int):
+        """Define a prioridade herdada pelas mensagens enviadas por um processo"""
+        self.priorities[process_name] = priority
+
+    def priority_of(self, process_name: str) -> int:
+        return self.priorities.get(process_name, DEFAULT_PRIORITY)
+
+    def attach_scheduler(self, scheduler):
+        """Liga a herança de prioridade aos processos de `scheduler`"""
+        self.scheduler = scheduler
+
+    def attach_mmu(self, mmu):
+        """Passa a conceder regiões da MMU enviadas como `RegionHandle` e publica a pressão de memória"""
+        self.mmu = mmu
+        mmu.on_pressure(lambda event: self.publish(MMU_SENDER, MEMORY_PRESSURE_TOPIC, event))
+
+    def _effective_priority(self, process_name: str) -> int:
+        # a boosted requester passes its inherited class on (transitive inheritance)
+        proc = self.scheduler.processes.get(process_name) if self.scheduler is not None else None
+        return proc.priority if proc is not None else self.priority_of(process_name)
+
+    def _inherit(self, receiver: str, correlation_id, priority: int = None):
+        # record (priority) or drop (None) a request owed by receiver and re-apply its boost
+        if self.scheduler is None and self.metrics is None:
+            return
+        waited = []
+        with self._inherit_lock:
+            owed = self._inheritance.setdefault(receiver, {})
+            if priority is None:
+                owed.pop(correlation_id, None)
+                waited = self._settle_inversions(receiver, correlation_id)
+            else:
+                if self.metrics is not None:
+                    blockers = {cid for cid, p in owed.items() if p > priority}
+                    if blockers:
+                        self._inversions.setdefault(receiver, {})[correlation_id] = (blockers, time.monotonic_ns())
+                owed[correlation_id] = priority
+            boost = min(owed.values()) if owed else None
+            if boost is None:
+                del self._inheritance[receiver]
+            if self.scheduler is not None:
+                self.scheduler.inherit_priority(receiver, boost)
+        for waited_ns in waited:
+            self.metrics.observe_inversion(receiver, waited_ns)
+
+    def _settle_inversions(self, receiver: str, correlation_id) -> list:
+        # called with _inherit_lock held; an inverted request stops waiting once it is
+        # resolved or the last less critical request it found pending is gone
+        inverted = self._inversions.get(receiver)
+        if not inverted:
+            return []
+        now = time.monotonic_ns()
+        waited = []
+        entry = inverted.pop(correlation_id, None)
+        if entry is not None:
+            waited.append(now - entry[1])
+        for cid, (blockers, since) in list(inverted.items()):
+            blockers.discard(correlation_id)
+            if not blockers:
+                del inverted[cid]
+                waited.append(now - since)
+        if not inverted:
+            del self._inversions[receiver]
+        return waited
+
+    def inherited_priorities(self) -> dict:
+        """Servidores com pedidos pendentes -> classe do requisitante mais crítico"""
+        with self._inherit_lock:
+            return {receiver: min(owed.values()) for receiver, owed in self._inheritance.items()}
+
+    def set_tracer(self, trace):
+        """Troca o tracer do hub ('console', 'off', 'sampled:N', 'ring[:N]' ou objeto)"""
+        self.tracer = make_tracer(trace)
+
+    def _deliver(self, receiver: str, msg: Message) -> bool:
+        if self._divert(receiver, (msg,)):
+            return True
+        if self.async_mode:
+            return self.mailboxes[receiver].put(msg)
+        self._call(receiver, self.registered_processes[receiver], msg, (msg,))
+        return True
+
+    def _divert(self, receiver: str, msgs) -> bool:
+        """True se `msgs` foram desviadas para a fila de dead letters (quarentena)"""
+        if self.async_mode and receiver in self.handler_budgets:
+            mailbox = self.mailboxes.get(receiver)
+            if mailbox is not None and mailbox.check_stall():
+                self._fault(receiver, TIMEOUT, f"handler still running after {mailbox.budget}s")
+        if not self.supervisor.quarantined:
+            return False
+        state = self.supervisor.check(receiver)
+        if state is None:
+            return False
+        if msgs[0].receiver != receiver:
+            # published messages are addressed to the topic; retain a per-receiver copy
+            msgs = [Message(m.sender, receiver, m.data, m.priority, m.correlation_id) for m in msgs]
+        if state == QUARANTINED:
+            self.dead_letters.put_many(msgs)
+            return True
+        print(f"[IPC] '{receiver}' released from quarantine")
+        if self.dead_letters.begin_replay(receiver):
+            self._spawn_replay(receiver)
+        return self.dead_letters.defer_if_replaying(receiver, msgs)
+
+    def _call(self, receiver: str, handler, payload, msgs):
+        """Executa um handler síncrono, isolado e dentro do orçamento do destinatário"""
+        budget = self.handler_budgets.get(receiver)
+        if budget is None:
+            self._invoke(receiver, handler, payload, msgs)
+            return
+        with self._runners_lock:
+            runner = self._runners.get(receiver)
+            if runner is None:
+                runner = self._runners[receiver] = HandlerRunner(receiver)
+        if runner.on_runner_thread():
+            # a handler sending to itself must not wait on its own thread
+            self._invoke(receiver, handler, payload, msgs, budget)
+            return
+        # a late finish is reported by the waiting sender as a timeout, below
+        done = runner.submit(self._invoke, receiver, handler, payload, msgs, budget, True)
+        if not done.wait(budget):
+            self._fault(receiver, TIMEOUT, f"handler still running after {budget}s, sender released")
+
+    def _invoke(self, receiver: str, handler, payload, msgs, budget: float = None, reported: bool = False):
+        started_ns = time.monotonic_ns()
+        error = None
+        try:
+            handler(payload)
+        except Exception as e:
+            error = e
+        self._observe(receiver, msgs, started_ns, error, budget, reported)
+
+    def _observe(self, receiver: str, msgs, started_ns: int, error: Exception = None, budget: float = None,
+                 reported: bool = False):
+        # handler time for the whole call; delivery latency of the oldest message
+        elapsed = time.monotonic_ns() - started_ns
+        if self.metrics is not None:
+            self.metrics.observe_handler(receiver, elapsed, started_ns - min(m.timestamp_ns for m in msgs))
+        if error is not None:
+            print(f"[IPC] Handler of '{receiver}' failed: {error}")
+            for msg in msgs:
+                if msg.correlation_id is not None:
+                    # a request whose handler failed fails its caller now, not at the deadline
+                    self._resolve(msg.correlation_id, error=error)
+            self._fault(receiver, ERROR, repr(error))
+        elif budget is not None and elapsed > budget * 1e9:
+            # a late finish already reported as a timeout is not a success either
+            if not reported:
+                self._fault(receiver, OVERRUN, f"handler took {elapsed / 1e6:.1f}ms (budget {budget * 1e3:.0f}ms)")
+        else:
+            self.supervisor.success(receiver)
+
+    def _fault(self, receiver: str, reason: str, detail: str):
+        if not self.supervisor.fault(receiver, reason, detail):
+            return
+        period = self.supervisor.quarantine_period
+        print(f"[IPC] ⚠️  '{receiver}' quarantined for {period}s ({reason}: {detail})")
+        if receiver == RECOVERY_AGENT or RECOVERY_AGENT not in self.registered_processes:
+            return
+        self._spawn_report({
+            'type': 'handler_fault',
+            'process': receiver,
+            'reason': reason,
+            'detail': detail,
+            'quarantine_s': period,
+        })
+
+    def _spawn_report(self, report: dict):
+        # the RecoveryAgent may run restart hooks: never on the faulting sender's thread
+        threading.Thread(target=self._report_fault, args=(report,),
+                         name=f"ipc-fault-{report['process']}", daemon=True).start()
+
+    def _report_fault(self, report: dict):
+        try:
+            self.send_message('IPC', RECOVERY_AGENT, report)
+        except Exception as e:
+            print(f"[IPC] Could not report fault of '{report['process']}': {e}")
+
+    def handler_faults(self) -> dict:
+        """Falhas por destinatário (erros, estouros, timeouts, quarentenas)"""
+        return self.supervisor.stats()
+
+    def send_message(self, sender: str, receiver: str, data: dict, correlation_id=None) -> bool:
+        """Envia mensagem via hub central
+
+        Retorna False se a mailbox do destinatário descartou a mensagem.
+        """
+        return self._send(sender, receiver, data, correlation_id, self.priorities.get(sender, DEFAULT_PRIORITY))
+
+    def _send(self, sender: str, receiver: str, data: dict, correlation_id, priority: int) -> bool:
+        if len(self.buffers) or self.mmu is not None:
+            self._transfer_handles(sender, receiver, data)
+        msg = Message(sender, receiver, data, priority, correlation_id)
+        tracer = self.tracer
+        if tracer.enabled:
+            tracer.trace(SEND, sender, receiver, data)
+        if self.metrics is not None:
+            self.metrics.count_route(sender, receiver, data)
+
         if receiver in self.registered_processes:
-            self.registered_processes[receiver](msg)
+            if self.dead_letters.defer_if_replaying(receiver, (msg,)):
+                return True
+            return self._deliver(receiver, msg)
+        self.dead_letters.put(msg)
+        return True
+
+    def send_many(self, sender: str, messages) -> int:
+        """Envia vários pedidos `(receiver, data)` numa única operação do hub.
+
+        As mensagens são agrupadas por destinatário (mantendo a ordem de cada
+        um); quem registrou `batch_callback` recebe o grupo numa só chamada.
+        Uma mailbox 'reject' cheia recusa só o próprio grupo: os demais
+        destinatários recebem os seus. Retorna quantas mensagens foram
+        entregues ou enfileiradas.
+        """
+        priority = self.priorities.get(sender, DEFAULT_PRIORITY)
+        tracer = self.tracer
+        groups = {}
+        for receiver, data in messages:
+            if tracer.enabled:
+                tracer.trace(SEND, sender, receiver, data)
+            if self.metrics is not None:
+                self.metrics.count_route(sender, receiver, data)
+            groups.setdefault(receiver, []).append(Message(sender, receiver, data, priority))
+        has_handles = len(self.buffers) > 0 or self.mmu is not None
+        accepted = 0
+        for receiver, msgs in groups.items():
+            if has_handles:
+                # ownership moves group by group, right before that group is delivered
+                self._transfer_group(receiver, msgs)
+            callback = self.registered_processes.get(receiver)
+            if callback is None:
+                self.dead_letters.put_many(msgs)
+                accepted += len(msgs)
+            elif self.dead_letters.defer_if_replaying(receiver, msgs) or self._divert(receiver, msgs):
+                accepted += len(msgs)
+            elif self.async_mode:
+                try:
+                    accepted += self.mailboxes[receiver].put_many(msgs)
+                except MailboxFullError as e:
+                    # the refused messages already handed their buffers back
+                    print(f"[IPC] Batch to '{receiver}' rejected: {e}")
+            else:
+                batch_callback = self.batch_handlers.get(receiver)
+                if batch_callback is not None:
+                    self._call(receiver, batch_callback, msgs, msgs)
+                else:
+                    for msg in msgs:
+                        self._deliver(receiver, msg)
+                accepted += len(msgs)
+        return accepted
+
+    def _transfer_group(self, receiver: str, msgs: list):
+        done = []
+        try:
+            for msg in msgs:
+                self._transfer_handles(msg.sender, receiver, msg.data)
+                done.append(msg)
+        except Exception:
+            # a handle the sender does not own cancels the group; give back what already moved
+            for msg in done:
+                self._dropped(receiver, msg)
+            raise
+
+    def request(self, sender: str, receiver: str, data: dict, timeout: float = None) -> Future:
+        """Envia um pedido e devolve um Future com a `Message` de resposta.
+
+        O destinatário responde com `ipc.reply(msg, data)`. Se `timeout` (s)
+        expirar antes da resposta, o Future falha com `TimeoutError`. O pedido
+        carrega a classe de prioridade do remetente.
+        """
+        correlation_id = f"{sender}#{next(self._correlation)}"
+        future = Future()
+        priority = self._effective_priority(sender)
+        # boost before sending, so the server already runs at the requester's class
+        self._inherit(receiver, correlation_id, priority)
+        with self._pending_cond:
+            self._pending[correlation_id] = (future, sender, receiver)
+            if timeout is not None:
+                self._arm_deadline(correlation_id, timeout)
+        try:
+            if not self._send(sender, receiver, data, correlation_id, priority):
+                self._resolve(correlation_id, error=MailboxFullError(
+                    f"Request {correlation_id} dropped by the mailbox of '{receiver}'"))
+        except Exception as e:
+            self._resolve(correlation_id, error=e)
+        return future
+
+    async def request_async(self, sender: str, receiver: str, data: dict, timeout: float = None):
+        """Versão awaitable de `request`; devolve a `Message` de resposta"""
+        return await asyncio.wrap_future(self.request(sender, receiver, data, timeout))
+
+    def reply(self, request_msg: Message, data: dict) -> bool:
+        """Responde a uma mensagem recebida.
+
+        Se ela veio de `request`, resolve o Future pendente do solicitante;
+        caso contrário (ou se o prazo já expirou) envia uma mensagem comum de
+        volta ao remetente, mantendo o id de correlação.
+        """
+        correlation_id = request_msg.correlation_id
+        if correlation_id is not None:
+            with self._pending_cond:
+                entry = self._pending.get(correlation_id)
+            if entry is not None:
+                responder = request_msg.receiver
+                if len(self.buffers) or self.mmu is not None:
+                    self._transfer_handles(responder, request_msg.sender, data)
+                response = Message(responder, request_msg.sender, data,
+                                   self.priorities.get(responder, DEFAULT_PRIORITY), correlation_id)
+                tracer = self.tracer
+                if tracer.enabled:
+                    tracer.trace(SEND, responder, request_msg.sender, data)
+                if self.metrics is not None:
+                    self.metrics.count_route(responder, request_msg.sender, data)
+                return self._resolve(correlation_id, result=response)
+        return self.send_message(request_msg.receiver, request_msg.sender, data, correlation_id=correlation_id)
+
+    def pending_requests(self) -> int:
+        with self._pending_cond:
+            return len(self._pending)
+
+    def _resolve(self, correlation_id, result=None, error=None) -> bool:
+        with self._pending_cond:
+            entry = self._pending.pop(correlation_id, None)
+        if entry is None:
+            return False
+        future, _, receiver = entry
+        self._inherit(receiver, correlation_id, None)
+        if future.cancelled():
+            return False
+        if error is not None:
+            future.set_exception(error)
         else:
-            self.message_queue.append(msg)
-    
+            future.set_result(result)
+        return True
+
+    def _arm_deadline(self, correlation_id, timeout: float):
+        # called with _pending_cond held
+        heapq.heappush(self._deadlines, (time.monotonic() + timeout, correlation_id))
+        self._ensure_reaper()
+        self._pending_cond.notify()
+
+    def _expire(self, correlation_id):
+        self._resolve(correlation_id, error=TimeoutError(f"IPC request {correlation_id} timed out"))
+
+    def _ensure_reaper(self):
+        # called with _pending_cond held
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._deadline_loop, name="ipc-deadlines", daemon=True)
+            self._reaper.start()
+
+    def _deadline_loop(self):
+        """Expira pedidos cujo prazo venceu (uma única thread para todo o hub)"""
+        while True:
+            expired = []
+            with self._pending_cond:
+                while not self._deadlines:
+                    self._pending_cond.wait()
+                now = time.monotonic()
+                while self._deadlines and self._deadlines[0][0] <= now:
+                    expired.append(heapq.heappop(self._deadlines)[1])
+                if not expired:
+                    self._pending_cond.wait(self._deadlines[0][0] - now)
+                    continue
+            for correlation_id in expired:
+                self._expire(correlation_id)
+
     def broadcast(self, sender: str, data: dict):
         """Broadcast para todos os processos"""
-        print(f"📢 IPC Broadcast from {sender}: {data}")
-        for process_name, callback in self.registered_processes.items():
+        tracer = self.tracer
+        if tracer.enabled:
+            tracer.trace(BROADCAST, sender, None, data)
+        if len(self.buffers):
+            self._reject_handles(data)
+        priority = self.priorities.get(sender, DEFAULT_PRIORITY)
+        for process_name in list(self.registered_processes):
             if process_name != sender:
-                callback(Message(sender, process_name, data))
+                if self.metrics is not None:
+                    self.metrics.count_route(sender, process_name, data)
+                self._deliver(process_name, Message(sender, process_name, data, priority))
+
+    def subscribe(self, process_name: str, topic: str):
+        """Inscreve processo em um tópico (ou tipo de mensagem)"""
+        with self._subs_lock:
+            current = self.subscriptions.get(topic, ())
+            if process_name not in current:
+                self.subscriptions[topic] = current + (process_name,)
+        print(f"  → Process '{process_name}' subscribed to '{topic}'")
+
+    def unsubscribe(self, process_name: str, topic: str = None):
+        """Remove inscrição em um tópico (ou em todos, se `topic` for None)"""
+        with self._subs_lock:
+            topics = [topic] if topic is not None else list(self.subscriptions)
+            for t in topics:
+                remaining = tuple(n for n in self.subscriptions.get(t, ()) if n != process_name)
+                if remaining:
+                    self.subscriptions[t] = remaining
+                else:
+                    self.subscriptions.pop(t, None)
+
+    def subscribers(self, topic: str) -> tuple:
+        return self.subscriptions.get(topic, ())
+
+    def publish(self, sender: str, topic: str, data: dict) -> int:
+        """Publica em um tópico; o custo escala com o número de inscritos.
+
+        Todos os inscritos recebem a mesma `Message`, cujo `data` é uma visão
+        somente-leitura do payload (`receiver` é o nome do tópico).
+        Retorna quantos inscritos receberam a mensagem.
+        """
+        subscribers = self.subscriptions.get(topic, ())
+        tracer = self.tracer
+        if tracer.enabled:
+            tracer.trace(PUBLISH, sender, topic, data)
+        if not subscribers:
+            return 0
+        if len(self.buffers):
+            self._reject_handles(data)
+        msg = Message(sender, topic, MappingProxyType(dict(data)), self.priorities.get(sender, DEFAULT_PRIORITY))
+        delivered = 0
+        for process_name in subscribers:
+            if process_name != sender and process_name in self.registered_processes:
+                if self.mmu is not None:
+                    # a shared region can be granted to every subscriber
+                    self._grant_regions(sender, process_name, data)
+                if self.metrics is not None:
+                    self.metrics.count_route(sender, process_name, data)
+                if self._deliver(process_name, msg):
+                    delivered += 1
+        return delivered
+
+    def alloc_buffer(self, owner: str, size: int) -> BufferHandle:
+        """Aloca um buffer de payload sem cópia pertencente a `owner`"""
+        return self.buffers.allocate(owner, size)
+
+    def buffer_view(self, handle: BufferHandle, process_name: str) -> memoryview:
+        """memoryview dos bytes válidos do buffer; só o dono atual tem acesso"""
+        return self.buffers.view(handle, process_name)
+
+    def release_buffer(self, handle: BufferHandle, process_name: str):
+        self.buffers.release(handle, process_name)
+
+    def _transfer_handles(self, sender: str, receiver: str, data):
+        # point-to-point delivery hands buffer ownership to the receiver and grants shared regions
+        if not data:
+            return
+        for value in data.values():
+            if isinstance(value, BufferHandle):
+                self.buffers.transfer(value, sender, receiver)
+            elif isinstance(value, RegionHandle) and self.mmu is not None:
+                self.mmu.grant(sender, value.base, receiver, value.perms)
+
+    def _dropped(self, receiver: str, msg: Message):
+        # a message the mailbox never accepted hands its buffers back to the sender
+        if msg.data and len(self.buffers):
+            for value in msg.data.values():
+                if isinstance(value, BufferHandle) and self.buffers.owner_of(value) == receiver:
+                    self.buffers.transfer(value, receiver, msg.sender)
+        if msg.correlation_id is not None:
+            # a dropped or evicted request fails its caller now, not at the deadline
+            with self._pending_cond:
+                entry = self._pending.get(msg.correlation_id)
+            if entry is not None and entry[2] == receiver:
+                self._resolve(msg.correlation_id, error=MailboxFullError(
+                    f"Request {msg.correlation_id} dropped by the mailbox of '{receiver}'"))
+
+    def _discard_dead_letter(self, msg: Message):
+        # a dead letter that will never be delivered frees what its send handed over
+        if not msg.data:
+            return
+        for value in msg.data.values():
+            if isinstance(value, BufferHandle):
+                if self.buffers.owner_of(value) == msg.receiver:
+                    self.buffers.release(value, msg.receiver)
+            elif isinstance(value, RegionHandle) and self.mmu is not None:
+                if any(isinstance(v, RegionHandle) and v.base == value.base
+                       for m in self.dead_letters.messages(msg.receiver) if m.data for v in m.data.values()):
+                    # another retained message still needs the grant
+                    continue
+                try:
+                    self.mmu.revoke(value.owner, value.base, msg.receiver)
+                except ValueError:
+                    # the owner already freed the region
+                    pass
+
+    def _grant_regions(self, sender: str, receiver: str, data):
+        for value in data.values():
+            if isinstance(value, RegionHandle):
+                self.mmu.grant(sender, value.base, receiver, value.perms)
+
+    def _reject_handles(self, data):
+        if not data:
+            return
+        for value in data.values():
+            if isinstance(value, BufferHandle):
+                raise BufferOwnershipError("Buffer handles can only be sent point-to-point")
+
+    def metrics_snapshot(self) -> dict:
+        """Métricas do hub como dict: rotas, histogramas e gauges de fila"""
+        if self.metrics is None:
+            return {}
+        return self.metrics.snapshot(self.queue_depths(), self.dead_letters.stats()['retained'])
+
+    def metrics_text(self) -> str:
+        """Métricas do hub em formato texto de exposição (Prometheus)"""
+        if self.metrics is None:
+            return ''
+        return self.metrics.render_text(self.queue_depths(), self.dead_letters.stats()['retained'])
+
+    def queue_depth(self, process_name: str) -> int:
+        """Mensagens pendentes na mailbox do processo (0 no modo síncrono)"""
+        mailbox = self.mailboxes.get(process_name)
+        return mailbox.depth() if mailbox else 0
+
+    def queue_depths(self) -> dict:
+        return {name: mb.depth() for name, mb in self.mailboxes.items()}
+
+    def flush(self, timeout: float = None) -> bool:
+        """Espera todas as mailboxes esvaziarem (útil em testes e no shutdown)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # handlers may post to mailboxes already drained, so repeat until stable
+        while True:
+            for mailbox in list(self.mailboxes.values()):
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                if not mailbox.join(remaining):
+                    return False
+            if all(mb.idle() for mb in list(self.mailboxes.values())):
+                return True
+
+    def shutdown(self):
+        """Encerra os dispatchers das mailboxes e libera os buffers restantes"""
+        for mailbox in self.mailboxes.values():
+            mailbox.close()
+        with self._runners_lock:
+            runners, self._runners = list(self._runners.values()), {}
+        for runner in runners:
+            runner.close()
+        self.buffers.close()
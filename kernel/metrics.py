@@ -0,0 +1,268 @@
+"""
+Métricas do kernel - contadores e histogramas de baixo custo
+
+`Histogram` usa baldes log-lineares no estilo HDR: cada potência de dois é
+dividida em 2**sub_bits sub-baldes, o que limita o erro relativo a menos de
+1/2**sub_bits (12,5% com sub_bits=3) com poucas dezenas de baldes para
+faixas de ns a s.
+
+`IPCMetrics` agrega, por rota (remetente, destinatário), contagem de
+mensagens e estimativa de bytes; por destinatário, histogramas de tempo de
+handler e de latência de entrega. Tudo pode ser lido como dict (`snapshot`)
+ou em formato texto de exposição (`render_text`, estilo Prometheus).
+
+`RunAccounting` guarda, por processo do escalonador, as últimas N execuções
+em anéis compactos (`array('q')`): latência liberação→início, tempo de
+execução e instante de início, além de totais de execuções, perdas de prazo
+e CPU.
+"""
+
+import threading
+from array import array
+
+from kernel.buffers import BufferHandle
+
+
+class Histogram:
+    """Histograma log-linear (HDR) de inteiros não negativos"""
+
+    def __init__(self, sub_bits: int = 3):
+        self.sub_bits = sub_bits
+        self._sub = 1 << sub_bits
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _key(self, value: int) -> int:
+        # keep sub_bits bits below the leading one: 2**sub_bits buckets per octave
+        shift = value.bit_length() - self.sub_bits - 1
+        if shift <= 0:
+            return value
+        return (shift << self.sub_bits) + (value >> shift)
+
+    def upper_bound(self, key: int) -> int:
+        """Maior valor que cai no balde `key`"""
+        if key < 2 * self._sub:
+            return key
+        shift = (key >> self.sub_bits) - 1
+        mantissa = self._sub | (key & (self._sub - 1))
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, value: int):
+        value = max(0, int(value))
+        key = self._key(value)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, p: float) -> int:
+        """Limite superior do balde que contém o percentil `p` (0-100)"""
+        if not self.count:
+            return 0
+        target = max(1, int(round(self.count * p / 100.0)))
+        seen = 0
+        for key in sorted(self.counts):
+            seen += self.counts[key]
+            if seen >= target:
+                return min(self.upper_bound(key), self.max)
+        return self.max
+
+    def buckets(self) -> list:
+        """Pares (limite superior, contagem cumulativa) dos baldes não vazios"""
+        out = []
+        seen = 0
+        for key in sorted(self.counts):
+            seen += self.counts[key]
+            out.append((self.upper_bound(key), seen))
+        return out
+
+    def summary(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'min': self.min or 0,
+            'max': self.max or 0,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+        }
+
+
+def estimate_size(data) -> int:
+    """Estimativa barata (rasa) do tamanho de um payload em bytes"""
+    if not data:
+        return 0
+    size = 0
+    for key, value in data.items():
+        size += len(key) if isinstance(key, str) else 8
+        if isinstance(value, (str, bytes, bytearray)):
+            size += len(value)
+        elif isinstance(value, BufferHandle):
+            size += value.length
+        elif isinstance(value, (dict, list, tuple)):
+            size += 16 * len(value)
+        else:
+            size += 8
+    return size
+
+
+def _labels(**labels) -> str:
+    return ','.join(f'{k}="{v}"' for k, v in labels.items())
+
+
+class IPCMetrics:
+    """Contadores por rota e histogramas por destinatário do hub IPC"""
+
+    def __init__(self):
+        # (sender, receiver) -> [messages, bytes]
+        self.routes = {}
+        # receiver -> Histogram of handler execution time (ns)
+        self.handler_ns = {}
+        # receiver -> Histogram of send-to-handler latency (ns)
+        self.delivery_ns = {}
+        # server -> Histogram of time more critical requesters waited on it (ns)
+        self.inversion_ns = {}
+        self._lock = threading.Lock()
+
+    def count_route(self, sender: str, receiver: str, data, messages: int = 1):
+        size = estimate_size(data) * messages
+        with self._lock:
+            route = self.routes.get((sender, receiver))
+            if route is None:
+                self.routes[(sender, receiver)] = [messages, size]
+            else:
+                route[0] += messages
+                route[1] += size
+
+    def observe_handler(self, receiver: str, elapsed_ns: int, latency_ns: int = None):
+        with self._lock:
+            hist = self.handler_ns.get(receiver)
+            if hist is None:
+                hist = self.handler_ns[receiver] = Histogram()
+            hist.record(elapsed_ns)
+            if latency_ns is not None:
+                lat = self.delivery_ns.get(receiver)
+                if lat is None:
+                    lat = self.delivery_ns[receiver] = Histogram()
+                lat.record(latency_ns)
+
+    def observe_inversion(self, receiver: str, waited_ns: int):
+        with self._lock:
+            hist = self.inversion_ns.get(receiver)
+            if hist is None:
+                hist = self.inversion_ns[receiver] = Histogram()
+            hist.record(waited_ns)
+
+    def hot_routes(self, limit: int = 5) -> list:
+        """Rotas com mais mensagens: [((sender, receiver), count), ...]"""
+        with self._lock:
+            ranked = sorted(self.routes.items(), key=lambda item: item[1][0], reverse=True)
+        return [(route, stats[0]) for route, stats in ranked[:limit]]
+
+    def snapshot(self, queue_depths: dict = None, dead_letters: dict = None) -> dict:
+        with self._lock:
+            return {
+                'routes': {f"{s}->{r}": {'messages': c, 'bytes': b} for (s, r), (c, b) in self.routes.items()},
+                'handler_ns': {r: h.summary() for r, h in self.handler_ns.items()},
+                'delivery_latency_ns': {r: h.summary() for r, h in self.delivery_ns.items()},
+                'priority_inversion_ns': {r: h.summary() for r, h in self.inversion_ns.items()},
+                'queue_depth': dict(queue_depths or {}),
+                'dead_letters': dict(dead_letters or {}),
+            }
+
+    def render_text(self, queue_depths: dict = None, dead_letters: dict = None) -> str:
+        """Exposição em texto (formato Prometheus)"""
+        lines = []
+        with self._lock:
+            lines.append('# TYPE atlas_ipc_messages_total counter')
+            for (s, r), (count, _) in sorted(self.routes.items()):
+                lines.append(f'atlas_ipc_messages_total{{{_labels(sender=s, receiver=r)}}} {count}')
+            lines.append('# TYPE atlas_ipc_bytes_total counter')
+            for (s, r), (_, size) in sorted(self.routes.items()):
+                lines.append(f'atlas_ipc_bytes_total{{{_labels(sender=s, receiver=r)}}} {size}')
+            for metric, hists in (('atlas_ipc_handler_seconds', self.handler_ns),
+                                  ('atlas_ipc_delivery_latency_seconds', self.delivery_ns),
+                                  ('atlas_ipc_priority_inversion_seconds', self.inversion_ns)):
+                lines.append(f'# TYPE {metric} histogram')
+                for receiver, hist in sorted(hists.items()):
+                    for bound, cumulative in hist.buckets():
+                        le = f"{bound / 1e9:.9f}"
+                        lines.append(f'{metric}_bucket{{{_labels(receiver=receiver, le=le)}}} {cumulative}')
+                    lines.append(f'{metric}_bucket{{{_labels(receiver=receiver, le="+Inf")}}} {hist.count}')
+                    lines.append(f'{metric}_sum{{{_labels(receiver=receiver)}}} {hist.total / 1e9:.9f}')
+                    lines.append(f'{metric}_count{{{_labels(receiver=receiver)}}} {hist.count}')
+        lines.append('# TYPE atlas_ipc_queue_depth gauge')
+        for receiver, depth in sorted((queue_depths or {}).items()):
+            lines.append(f'atlas_ipc_queue_depth{{{_labels(receiver=receiver)}}} {depth}')
+        lines.append('# TYPE atlas_ipc_dead_letters gauge')
+        for receiver, depth in sorted((dead_letters or {}).items()):
+            lines.append(f'atlas_ipc_dead_letters{{{_labels(receiver=receiver)}}} {depth}')
+        return '\n'.join(lines) + '\n'
+
+
+class RunAccounting:
+    """Contabilidade de execuções de um processo em anéis de tamanho fixo"""
+
+    def __init__(self, capacity: int = 128):
+        if capacity < 1:
+            raise ValueError("Accounting capacity must be >= 1")
+        self.capacity = capacity
+        self.latency_ns = array('q', bytes(8 * capacity))
+        self.exec_ns = array('q', bytes(8 * capacity))
+        self.start_ns = array('q', bytes(8 * capacity))
+        self.runs = 0
+        self.deadline_misses = 0
+        self.cpu_ns = 0
+        self._lock = threading.Lock()
+
+    def record(self, release_ns: int, start_ns: int, finish_ns: int, deadline_ns: int, exec_ns: int = None):
+        """Registra uma execução; `deadline_ns` é o prazo absoluto da liberação.
+
+        `exec_ns` é o tempo efetivamente executado quando a execução foi
+        fatiada (preempção); por padrão, `finish_ns - start_ns`.
+        """
+        if exec_ns is None:
+            exec_ns = finish_ns - start_ns
+        with self._lock:
+            slot = self.runs % self.capacity
+            self.latency_ns[slot] = max(0, start_ns - release_ns)
+            self.exec_ns[slot] = exec_ns
+            self.start_ns[slot] = start_ns
+            self.runs += 1
+            self.cpu_ns += exec_ns
+            if finish_ns > deadline_ns:
+                self.deadline_misses += 1
+
+    def _window(self, ring) -> list:
+        # called with _lock held: retained samples, oldest first
+        count = min(self.runs, self.capacity)
+        start = self.runs - count
+        return [ring[i % self.capacity] for i in range(start, self.runs)]
+
+    def summary(self, now_ns: int) -> dict:
+        """Estatísticas da janela retida; `cpu_share` é a fração de uma CPU"""
+        with self._lock:
+            if not self.runs:
+                return {'runs': 0, 'deadline_misses': 0, 'cpu_share': 0.0}
+            latency = sorted(self._window(self.latency_ns))
+            execs = self._window(self.exec_ns)
+            starts = self._window(self.start_ns)
+            runs, misses = self.runs, self.deadline_misses
+        span = now_ns - starts[0]
+        return {
+            'runs': runs,
+            'deadline_misses': misses,
+            'latency_p50_ns': latency[len(latency) // 2],
+            'latency_max_ns': latency[-1],
+            # release jitter: spread of release-to-start latency over the window
+            'jitter_ns': latency[-1] - latency[0],
+            'exec_mean_ns': sum(execs) // len(execs),
+            'exec_max_ns': max(execs),
+            'cpu_share': sum(execs) / span if span > 0 else 0.0,
+        }
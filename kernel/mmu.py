@@ -1,38 +1,732 @@
 """
 MMU - Memory Management Unit
 Proteção e isolamento de memória entre processos
+
+O espaço de endereços físico simulado (`memory_size` bytes) é gerido por um
+alocador buddy: blocos potência de dois a partir de `min_block`, uma lista
+livre por ordem e fusão com o bloco vizinho ("buddy") na liberação. Alocar
+e liberar custam O(log n). Regiões nunca se sobrepõem; realocar um nome
+devolve o bloco anterior e `free`/`realloc` permitem encolher, crescer e
+liberar. `stats()` informa utilização e fragmentação interna e externa.
+
+Cada processo tem um espaço de endereços (`AddressSpace`) com quantas
+regiões precisar (`allocate` define a região principal, `map` acrescenta
+outras), indexadas por endereço base: achar a região de um endereço é uma
+busca binária. Cada região tem bits de permissão READ/WRITE/EXECUTE
+(`protect` muda). `check_access` consulta antes um TLB, cache LRU das
+traduções (processo, página) recentes, invalidado quando o mapeamento do
+processo muda.
+
+Com `MMU(backing='bytearray')` ou `MMU(backing='mmap')` (anônimo, ou sobre
+o arquivo `backing_path`) a memória física simulada existe de verdade: o
+endereço de uma região é o deslocamento dela nesse armazenamento. `view`,
+`read` e `write` checam faixa e permissões e devolvem `memoryview`s sem
+cópia, válidas enquanto a região estiver mapeada. Regiões novas começam
+zeradas e `realloc` leva o conteúdo junto quando a região muda de lugar.
+
+Regiões compartilhadas: o dono (ou quem já tem acesso) concede leitura ou
+escrita a outro processo com `grant`, que mapeia a mesma região no espaço
+dele; `revoke` retira. Cada região conta quantos espaços a mapeiam e só
+volta ao alocador quando o último a desmapeia. Um `RegionHandle` (de
+`handle`) enviado pelo IPC vira uma concessão ao destinatário na entrega
+(veja `IPC.attach_mmu`), o que permite pipelines produtor/consumidor sem
+cópia.
+
+Cotas e pressão: `set_quota` limita os bytes que um processo pode ter
+alocados e `MMU(quota=...)` limita o total; passar do limite levanta
+`QuotaExceededError`. A região conta para o dono até voltar ao alocador.
+O nível de pressão (normal, warning, critical) de cada escopo, global ou
+processo com cota, segue as `watermarks`. Quando muda, os ouvintes de
+`on_pressure` são avisados fora do lock da MMU; com `IPC.attach_mmu` o
+aviso é publicado no tópico 'memory.pressure'.
 """
 
-class MMU:
+import heapq
+import mmap
+import threading
+from bisect import bisect_right, insort
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Simulated physical memory and smallest buddy block (bytes, powers of two)
+DEFAULT_MEMORY_SIZE = 0x100000
+MIN_BLOCK = 0x100
+
+# Permission bits of a region
+READ = 0x4
+WRITE = 0x2
+EXECUTE = 0x1
+RW = READ | WRITE
+RWX = READ | WRITE | EXECUTE
+
+# TLB granularity and capacity
+PAGE_SIZE = 0x1000
+DEFAULT_TLB_ENTRIES = 64
+
+
+# Memory pressure levels and the usage ratios that enter them
+NORMAL = 'normal'
+WARNING = 'warning'
+CRITICAL = 'critical'
+DEFAULT_WATERMARKS = {WARNING: 0.75, CRITICAL: 0.9}
+# scope of the whole address space in pressure events
+GLOBAL = 'global'
+# IPC topic where pressure changes are published (IPC.attach_mmu)
+MEMORY_PRESSURE_TOPIC = 'memory.pressure'
+
+
+def perm_str(perms: int) -> str:
+    """Bits de permissão no formato 'rwx'"""
+    return ''.join(flag if perms & bit else '-' for flag, bit in (('r', READ), ('w', WRITE), ('x', EXECUTE)))
+
+
+class OutOfMemoryError(MemoryError):
+    """Não há bloco livre grande o bastante para o pedido"""
+
+
+class QuotaExceededError(OutOfMemoryError):
+    """A alocação passaria da cota do processo ou da cota global"""
+
+
+class MemoryAccessError(Exception):
+    """Acesso fora das regiões do processo, sem permissão ou a memória não lastreada"""
+
+
+class BuddyAllocator:
+    """Alocador buddy sobre um espaço de endereços [0, size)"""
+
+    def __init__(self, size: int = DEFAULT_MEMORY_SIZE, min_block: int = MIN_BLOCK):
+        for value in (size, min_block):
+            if value <= 0 or value & (value - 1):
+                raise ValueError(f"Buddy sizes must be powers of two: {value}")
+        if min_block > size:
+            raise ValueError("Minimum block larger than memory")
+        self.size = size
+        self.min_order = min_block.bit_length() - 1
+        self.max_order = size.bit_length() - 1
+        # order -> set of free block addresses, plus a heap to hand out the lowest one
+        # (heap entries no longer in the set are skipped lazily)
+        self._free = {order: set() for order in range(self.min_order, self.max_order + 1)}
+        self._heaps = {order: [] for order in self._free}
+        # base address -> order of allocated blocks
+        self._allocated = {}
+        self.used = 0
+        self._add_free(0, self.max_order)
+
+    def _order_for(self, size: int) -> int:
+        if size <= 0:
+            raise ValueError(f"Allocation size must be positive: {size}")
+        return max(self.min_order, (size - 1).bit_length())
+
+    def _add_free(self, addr: int, order: int):
+        self._free[order].add(addr)
+        heapq.heappush(self._heaps[order], addr)
+
+    def _pop_free(self, order: int):
+        free, heap = self._free[order], self._heaps[order]
+        while heap:
+            addr = heapq.heappop(heap)
+            if addr in free:
+                free.remove(addr)
+                return addr
+        return None
+
+    def alloc(self, size: int) -> int:
+        """Reserva um bloco de pelo menos `size` bytes e devolve seu endereço"""
+        order = self._order_for(size)
+        for current in range(order, self.max_order + 1):
+            addr = self._pop_free(current)
+            if addr is not None:
+                break
+        else:
+            raise OutOfMemoryError(f"No free block for {size} bytes (largest free: {self.largest_free()})")
+        # split down to the requested order, freeing the upper halves
+        while current > order:
+            current -= 1
+            self._add_free(addr + (1 << current), current)
+        self._allocated[addr] = order
+        self.used += 1 << order
+        return addr
+
+    def free(self, addr: int):
+        """Libera o bloco em `addr`, fundindo-o com os buddies livres"""
+        order = self._allocated.pop(addr, None)
+        if order is None:
+            raise ValueError(f"Address 0x{addr:08X} is not an allocated block")
+        self.used -= 1 << order
+        while order < self.max_order:
+            buddy = addr ^ (1 << order)
+            if buddy not in self._free[order]:
+                break
+            # the stale heap entry of the buddy is skipped on pop
+            self._free[order].remove(buddy)
+            addr = min(addr, buddy)
+            order += 1
+        self._add_free(addr, order)
+
+    def resize(self, addr: int, size: int) -> bool:
+        """Ajusta o bloco no lugar; False se ele precisa mudar de endereço"""
+        order = self._allocated.get(addr)
+        if order is None:
+            raise ValueError(f"Address 0x{addr:08X} is not an allocated block")
+        target = self._order_for(size)
+        if target > order:
+            # grow by absorbing free upper buddies; the block must stay aligned
+            needed = []
+            for current in range(order, target):
+                buddy = addr ^ (1 << current)
+                if buddy < addr or buddy not in self._free[current]:
+                    return False
+                needed.append((current, buddy))
+            for current, buddy in needed:
+                self._free[current].remove(buddy)
+        else:
+            # shrink by freeing the upper halves
+            for current in range(order - 1, target - 1, -1):
+                self._add_free(addr + (1 << current), current)
+        self._allocated[addr] = target
+        self.used += (1 << target) - (1 << order)
+        return True
+
+    def block_size(self, addr: int) -> int:
+        return 1 << self._allocated[addr]
+
+    def largest_free(self) -> int:
+        for order in range(self.max_order, self.min_order - 1, -1):
+            if self._free[order]:
+                return 1 << order
+        return 0
+
+    def free_blocks(self) -> dict:
+        """Blocos livres por tamanho"""
+        return {1 << order: len(blocks) for order, blocks in self._free.items() if blocks}
+
+
+class RegionHandle:
+    """Referência leve (e serializável) a uma região, enviada pelo IPC"""
+    __slots__ = ('base', 'size', 'perms', 'owner')
+
+    def __init__(self, base: int, size: int, perms: int, owner: str):
+        self.base = base
+        self.size = size
+        self.perms = perms
+        self.owner = owner
+
+    def __getstate__(self):
+        return (self.base, self.size, self.perms, self.owner)
+
+    def __setstate__(self, state):
+        self.base, self.size, self.perms, self.owner = state
+
+    def __repr__(self):
+        return f"RegionHandle(0x{self.base:08X} {self.size}B {perm_str(self.perms)} owner={self.owner})"
+
+
+class AddressSpace:
+    """Regiões mapeadas de um processo, ordenadas por endereço base"""
+
     def __init__(self):
+        self._bases = []
+        # base address -> region dict
+        self.regions = {}
+
+    def add(self, region: dict):
+        insort(self._bases, region['base'])
+        self.regions[region['base']] = region
+
+    def remove(self, base: int):
+        region = self.regions.pop(base, None)
+        if region is not None:
+            del self._bases[bisect_right(self._bases, base) - 1]
+        return region
+
+    def find(self, address: int):
+        """Região que contém `address`, ou None (O(log n))"""
+        i = bisect_right(self._bases, address) - 1
+        if i < 0:
+            return None
+        region = self.regions[self._bases[i]]
+        return region if address < region['base'] + region['size'] else None
+
+    def __len__(self):
+        return len(self._bases)
+
+
+class TLB:
+    """Cache LRU de traduções (processo, página) -> região"""
+
+    def __init__(self, entries: int = DEFAULT_TLB_ENTRIES):
+        self.entries = entries
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # handlers check access from several threads
+        self._lock = threading.Lock()
+
+    def lookup(self, process_name: str, address: int):
+        key = (process_name, address // PAGE_SIZE)
+        with self._lock:
+            region = self._cache.get(key)
+            # a page may hold several small regions: the cached one must contain the address
+            if region is not None and region['base'] <= address < region['base'] + region['size']:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return region
+            self.misses += 1
+            return None
+
+    def insert(self, process_name: str, address: int, region: dict):
+        key = (process_name, address // PAGE_SIZE)
+        with self._lock:
+            self._cache[key] = region
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.entries:
+                self._cache.popitem(last=False)
+
+    def flush(self, process_name: str = None):
+        """Invalida as traduções de um processo (ou todas)"""
+        with self._lock:
+            if process_name is None:
+                self._cache.clear()
+                return
+            for key in [key for key in self._cache if key[0] == process_name]:
+                del self._cache[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {'entries': len(self._cache), 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+class MMU:
+    def __init__(self, memory_size: int = DEFAULT_MEMORY_SIZE, min_block: int = MIN_BLOCK,
+                 tlb_entries: int = DEFAULT_TLB_ENTRIES, backing: str = None, backing_path: str = None,
+                 quota: int = None, watermarks: dict = None):
+        self.allocator = BuddyAllocator(memory_size, min_block)
+        # global and per-process limits on the bytes charged to owners (None = no limit)
+        self.quota = quota
+        self.quotas = {}
+        # process name -> bytes of the live regions it owns
+        self.charged = {}
+        self._charged_total = 0
+        # (ratio, level) from the highest watermark down
+        self.watermarks = sorted(((ratio, level) for level, ratio in (watermarks or DEFAULT_WATERMARKS).items()),
+                                 reverse=True)
+        # scope (GLOBAL or process name) -> current pressure level
+        self.pressure = {GLOBAL: NORMAL}
+        self._pressure_listeners = []
+        self._touched = set()
+        self._depth = 0
+        self.backing = backing
+        self._store = None
+        self._file = None
+        # memoryview over the whole simulated physical memory; None when unbacked
+        self.memory = self._open_backing(backing, backing_path, memory_size)
+        # process name -> its primary region (the one `allocate` manages)
         self.memory_map = {}
+        # base address -> region, for every allocated region
+        self.regions = {}
+        # process name -> AddressSpace of the regions it can access
+        self.spaces = {}
+        self.tlb = TLB(tlb_entries)
         self.protected_regions = set()
+        # mapping changes come from boot code, restart hooks and IPC deliveries
+        self._lock = threading.RLock()
         print("[KERNEL] MMU initialized (Memory Protection Active)")
-    
-    def allocate(self, process_name: str, size_bytes: int) -> int:
+
+    def _open_backing(self, backing: str, backing_path: str, size: int):
+        if backing is None:
+            return None
+        if backing == 'bytearray':
+            self._store = bytearray(size)
+        elif backing == 'mmap':
+            if backing_path is None:
+                self._store = mmap.mmap(-1, size)
+            else:
+                self._file = open(backing_path, 'a+b')
+                self._file.truncate(size)
+                self._store = mmap.mmap(self._file.fileno(), size)
+        else:
+            raise ValueError(f"Unknown MMU backing: {backing}")
+        return memoryview(self._store)
+
+    def close(self):
+        """Libera a memória de lastro (mmap e arquivo)"""
+        if self.memory is None:
+            return
+        try:
+            self.memory.release()
+            if isinstance(self._store, mmap.mmap):
+                self._store.close()
+        except BufferError:
+            # a caller still holds a view; the mapping goes away once it is dropped
+            pass
+        if self._file is not None:
+            self._file.close()
+        self.memory = None
+
+    @contextmanager
+    def _mutation(self):
+        # holds the lock; the outermost mutation re-evaluates pressure and notifies after releasing it
+        with self._lock:
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+            events = self._pressure_changes() if self._depth == 0 else []
+        for event in events:
+            self._notify_pressure(event)
+
+    def set_quota(self, process_name: str, limit: int = None):
+        """Limita os bytes alocados pelo processo (None tira a cota)"""
+        with self._mutation():
+            if limit is None:
+                self.quotas.pop(process_name, None)
+                self.pressure.pop(process_name, None)
+            else:
+                self.quotas[process_name] = limit
+                self._touched.add(process_name)
+
+    def usage(self, process_name: str) -> int:
+        """Bytes cobrados do processo (regiões vivas das quais é dono)"""
+        return self.charged.get(process_name, 0)
+
+    def _check_quota(self, process_name: str, delta: int):
+        # called with _lock held, before the allocator is touched
+        if delta <= 0:
+            return
+        limit = self.quotas.get(process_name)
+        if limit is not None and self.charged.get(process_name, 0) + delta > limit:
+            raise QuotaExceededError(f"'{process_name}' would use {self.charged.get(process_name, 0) + delta} "
+                                     f"bytes (quota {limit})")
+        if self.quota is not None and self._charged_total + delta > self.quota:
+            raise QuotaExceededError(f"System would use {self._charged_total + delta} bytes (quota {self.quota})")
+
+    def _charge(self, process_name: str, delta: int):
+        # called with _lock held
+        self.charged[process_name] = self.charged.get(process_name, 0) + delta
+        if not self.charged[process_name]:
+            del self.charged[process_name]
+        self._charged_total += delta
+        self._touched.add(process_name)
+
+    def _level(self, used: int, limit: int) -> str:
+        ratio = used / limit if limit else 1.0
+        for threshold, level in self.watermarks:
+            if ratio >= threshold:
+                return level
+        return NORMAL
+
+    def _global_usage(self) -> tuple:
+        # physical blocks in use, or the charged bytes against the global quota, whichever is tighter
+        used, limit = self.allocator.used, self.allocator.size
+        if self.quota is not None and self._charged_total * limit > used * self.quota:
+            used, limit = self._charged_total, self.quota
+        return used, limit
+
+    def _pressure_changes(self) -> list:
+        # called with _lock held
+        scopes = [(GLOBAL,) + self._global_usage()]
+        scopes += [(name, self.charged.get(name, 0), self.quotas[name]) for name in self._touched if name in self.quotas]
+        self._touched.clear()
+        events = []
+        for scope, used, limit in scopes:
+            level = self._level(used, limit)
+            previous = self.pressure.get(scope, NORMAL)
+            if level != previous:
+                self.pressure[scope] = level
+                events.append({'type': 'memory_pressure', 'scope': scope, 'level': level,
+                               'previous': previous, 'used': used, 'limit': limit})
+        return events
+
+    def on_pressure(self, listener):
+        """Registra `listener(event)`, chamado quando o nível de pressão de um escopo muda"""
+        self._pressure_listeners.append(listener)
+
+    def _notify_pressure(self, event: dict):
+        icon = '✅' if event['level'] == NORMAL else '⚠️ '
+        print(f"[MMU] {icon} Memory pressure {event['level']} ({event['scope']}: "
+              f"{event['used']}/{event['limit']} bytes)")
+        for listener in self._pressure_listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"[MMU] Pressure listener failed: {e}")
+
+    def allocate(self, process_name: str, size_bytes: int, perms: int = RW) -> int:
         """Aloca memória isolada para processo.
 
         size_bytes: tamanho em bytes.
-        Retorna o endereço base simulado (int).
+        Retorna o endereço base simulado (int). Se o processo já tinha uma
+        região principal (ex.: restart), ela é liberada depois que o novo
+        bloco foi obtido.
         """
-        base_addr = len(self.memory_map) * 0x1000
-        self.memory_map[process_name] = {
+        with self._mutation():
+            old = self.memory_map.get(process_name)
+            # a refused allocation (quota or no free block) must leave the old region in place
+            self._check_quota(process_name, size_bytes - (old['size'] if old is not None and old['refs'] == 1 else 0))
+            base_addr = self.allocator.alloc(size_bytes)
+            if old is not None:
+                self.unmap(process_name, old['base'])
+            self._add_region(process_name, base_addr, size_bytes, perms)
+            self.memory_map[process_name] = self.regions[base_addr]
+        print(f"  → Allocated {size_bytes} bytes for '{process_name}' at 0x{base_addr:08X}")
+        return base_addr
+
+    def map(self, process_name: str, size_bytes: int, perms: int = RW) -> int:
+        """Acrescenta uma região ao espaço de endereços do processo; devolve a base"""
+        with self._mutation():
+            self._check_quota(process_name, size_bytes)
+            base_addr = self.allocator.alloc(size_bytes)
+            self._add_region(process_name, base_addr, size_bytes, perms)
+        return base_addr
+
+    def _add_region(self, process_name: str, base_addr: int, size_bytes: int, perms: int):
+        # called under _mutation, with the block already taken from the allocator
+        self._charge(process_name, size_bytes)
+        region = {
             'base': base_addr,
             'size': size_bytes,
-            'protected': True
+            'protected': True,
+            'perms': perms,
+            'owner': process_name,
+            # address spaces mapping the region (owner + grantees)
+            'refs': 1,
+            # grantee -> its mapping of the region (own permission bits)
+            'mappings': {},
         }
-        print(f"  → Allocated {size_bytes} bytes for '{process_name}' at 0x{base_addr:08X}")
-        return base_addr
-    
-    def check_access(self, process_name: str, address: int) -> bool:
-        """Verifica se processo pode acessar endereço"""
-        if process_name not in self.memory_map:
+        self.regions[base_addr] = region
+        self.spaces.setdefault(process_name, AddressSpace()).add(region)
+        if self.memory is not None:
+            # never hand a previous owner's bytes to a new region
+            self.memory[base_addr:base_addr + size_bytes] = bytes(size_bytes)
+
+    def _owned(self, process_name: str, base_addr: int) -> dict:
+        # the region at base_addr, if process_name owns it and still maps it
+        space = self.spaces.get(process_name)
+        region = self.regions.get(base_addr)
+        if region is None or space is None or space.regions.get(base_addr) is not region:
+            raise ValueError(f"'{process_name}' has no region at 0x{base_addr:08X}")
+        return region
+
+    def unmap(self, process_name: str, base_addr: int) -> bool:
+        """Tira uma região (própria ou compartilhada) do espaço do processo.
+
+        O bloco só volta ao alocador quando nenhum espaço a mapeia mais.
+        """
+        with self._mutation():
+            space = self.spaces.get(process_name)
+            entry = space.remove(base_addr) if space is not None else None
+            if entry is None:
+                return False
+            if not space:
+                del self.spaces[process_name]
+            self.tlb.flush(process_name)
+            region = self.regions[base_addr]
+            if entry is region:
+                if self.memory_map.get(process_name) is region:
+                    del self.memory_map[process_name]
+            else:
+                del region['mappings'][process_name]
+            region['refs'] -= 1
+            if region['refs'] == 0:
+                del self.regions[base_addr]
+                self.allocator.free(base_addr)
+                self._charge(region['owner'], -region['size'])
+            return True
+
+    def free(self, process_name: str) -> bool:
+        """Desfaz todos os mapeamentos do processo (regiões próprias e compartilhadas)"""
+        with self._mutation():
+            space = self.spaces.get(process_name)
+            bases = list(space.regions) if space is not None else []
+            for base in bases:
+                self.unmap(process_name, base)
+        if bases:
+            print(f"  → Freed {len(bases)} region(s) of '{process_name}'")
+        return bool(bases)
+
+    def realloc(self, process_name: str, size_bytes: int, base_addr: int = None) -> int:
+        """Muda o tamanho de uma região (a principal, por padrão); devolve a nova base (pode mudar)"""
+        with self._mutation():
+            if base_addr is None:
+                region = self.memory_map.get(process_name)
+                if region is None:
+                    return self.allocate(process_name, size_bytes)
+            else:
+                region = self._owned(process_name, base_addr)
+            old_base, old_size = region['base'], region['size']
+            self._check_quota(process_name, size_bytes - old_size)
+            if self.allocator.resize(old_base, size_bytes):
+                if self.memory is not None and size_bytes > old_size:
+                    self.memory[old_base + old_size:old_base + size_bytes] = bytes(size_bytes - old_size)
+            else:
+                # allocate before freeing, so a failed move keeps the old region
+                new_base = self.allocator.alloc(size_bytes)
+                if self.memory is not None:
+                    kept = min(old_size, size_bytes)
+                    self.memory[new_base:new_base + kept] = self.memory[old_base:old_base + kept]
+                    self.memory[new_base + kept:new_base + size_bytes] = bytes(size_bytes - kept)
+                self.allocator.free(old_base)
+                del self.regions[old_base]
+                region['base'] = new_base
+                self.regions[new_base] = region
+            region['size'] = size_bytes
+            self._charge(process_name, size_bytes - old_size)
+            # the owner and every grantee see the region at its new place and size
+            for name, entry in [(process_name, region)] + list(region['mappings'].items()):
+                space = self.spaces[name]
+                space.remove(old_base)
+                entry['base'], entry['size'] = region['base'], size_bytes
+                space.add(entry)
+                self.tlb.flush(name)
+            return region['base']
+
+    def protect(self, process_name: str, base_addr: int, perms: int):
+        """Muda as permissões de uma região do processo (as concessões ficam como estão)"""
+        with self._lock:
+            self._owned(process_name, base_addr)['perms'] = perms
+            self.tlb.flush(process_name)
+
+    def grant(self, grantor: str, base_addr: int, peer: str, perms: int = READ) -> dict:
+        """Mapeia a região em `base_addr` no espaço de `peer` com as permissões `perms`.
+
+        Quem concede precisa ter essas permissões sobre a região (dono ou
+        outro concessionário). Devolve o mapeamento do `peer`.
+        """
+        with self._lock:
+            region = self.regions.get(base_addr)
+            space = self.spaces.get(grantor)
+            entry = space.regions.get(base_addr) if space is not None else None
+            if region is None or entry is None:
+                raise MemoryAccessError(f"'{grantor}' has no region at 0x{base_addr:08X} to share")
+            if entry['perms'] & perms != perms:
+                raise MemoryAccessError(f"'{grantor}' cannot grant {perm_str(perms)} "
+                                        f"on its {perm_str(entry['perms'])} mapping")
+            peer_space = self.spaces.setdefault(peer, AddressSpace())
+            mapping = peer_space.regions.get(base_addr)
+            if mapping is None:
+                mapping = {
+                    'base': base_addr,
+                    'size': region['size'],
+                    'protected': True,
+                    'perms': perms,
+                    'owner': region['owner'],
+                    'shared': True,
+                }
+                region['mappings'][peer] = mapping
+                region['refs'] += 1
+                peer_space.add(mapping)
+            elif mapping is not region:
+                mapping['perms'] |= perms
+            self.tlb.flush(peer)
+        print(f"  → MMU: '{grantor}' granted {perm_str(perms)} on 0x{base_addr:08X} to '{peer}'")
+        return mapping
+
+    def revoke(self, owner: str, base_addr: int, peer: str = None) -> int:
+        """Retira a concessão de `peer` (ou de todos); devolve quantas foram revogadas.
+
+        Views já entregues continuam válidas; o acesso checado acaba na hora.
+        """
+        with self._mutation():
+            region = self.regions.get(base_addr)
+            if region is None or region['owner'] != owner:
+                raise ValueError(f"'{owner}' has no region at 0x{base_addr:08X}")
+            peers = list(region['mappings']) if peer is None else [p for p in (peer,) if p in region['mappings']]
+            for name in peers:
+                self.unmap(name, base_addr)
+        if peers:
+            print(f"  → MMU: '{owner}' revoked 0x{base_addr:08X} from {', '.join(peers)}")
+        return len(peers)
+
+    def handle(self, process_name: str, base_addr: int, perms: int = READ) -> RegionHandle:
+        """Handle da região para enviar pelo IPC; o hub concede `perms` ao destinatário"""
+        with self._lock:
+            space = self.spaces.get(process_name)
+            entry = space.regions.get(base_addr) if space is not None else None
+            if entry is None or entry['perms'] & perms != perms:
+                raise MemoryAccessError(f"'{process_name}' cannot share 0x{base_addr:08X} as {perm_str(perms)}")
+            return RegionHandle(base_addr, entry['size'], perms, entry['owner'])
+
+    def translate(self, process_name: str, address: int):
+        """Região do processo que contém `address` (TLB, depois o índice), ou None"""
+        region = self.tlb.lookup(process_name, address)
+        if region is not None:
+            return region
+        space = self.spaces.get(process_name)
+        region = space.find(address) if space is not None else None
+        if region is not None:
+            self.tlb.insert(process_name, address, region)
+        return region
+
+    def _check_range(self, process_name: str, address: int, length: int, access: int) -> dict:
+        if length < 0:
+            raise ValueError(f"Negative length: {length}")
+        region = self.translate(process_name, address)
+        if region is None:
+            raise MemoryAccessError(f"Segmentation fault by '{process_name}' at 0x{address:08X}")
+        if address + length > region['base'] + region['size']:
+            raise MemoryAccessError(f"Access by '{process_name}' of {length} bytes at 0x{address:08X} "
+                                    f"crosses the end of its region")
+        if region['perms'] & access != access:
+            raise MemoryAccessError(f"Protection fault by '{process_name}' at 0x{address:08X} "
+                                    f"({perm_str(access)} on {perm_str(region['perms'])} region)")
+        if self.memory is None:
+            raise MemoryAccessError("MMU memory is not backed (use MMU(backing=...))")
+        return region
+
+    def view(self, process_name: str, address: int, length: int, access: int = READ) -> memoryview:
+        """View sem cópia de `length` bytes; só gravável se `access` inclui WRITE"""
+        self._check_range(process_name, address, length, access)
+        view = self.memory[address:address + length]
+        return view if access & WRITE else view.toreadonly()
+
+    def read(self, process_name: str, address: int, length: int) -> memoryview:
+        """View somente leitura, sem cópia"""
+        return self.view(process_name, address, length, READ)
+
+    def write(self, process_name: str, address: int, data) -> int:
+        """Copia `data` para a memória do processo; devolve o número de bytes"""
+        self.view(process_name, address, len(data), WRITE)[:] = data
+        return len(data)
+
+    def stats(self) -> dict:
+        """Utilização e fragmentação do espaço de endereços"""
+        allocator = self.allocator
+        requested = sum(region['size'] for region in self.regions.values())
+        free = allocator.size - allocator.used
+        largest = allocator.largest_free()
+        return {
+            'total': allocator.size,
+            'used': allocator.used,
+            'requested': requested,
+            'free': free,
+            'regions': len(self.regions),
+            'shared_regions': sum(1 for region in self.regions.values() if region['mappings']),
+            'pressure': dict(self.pressure),
+            'utilization': allocator.used / allocator.size,
+            # bytes lost to power-of-two rounding inside allocated blocks
+            'internal_fragmentation': (allocator.used - requested) / allocator.used if allocator.used else 0.0,
+            # share of free memory not usable by one allocation of the largest free block size
+            'external_fragmentation': 1 - largest / free if free else 0.0,
+            'largest_free_block': largest,
+            'free_blocks': allocator.free_blocks(),
+            'tlb': self.tlb.stats(),
+        }
+
+    def check_access(self, process_name: str, address: int, access: int = READ) -> bool:
+        """Verifica se processo pode acessar endereço com as permissões `access`"""
+        if process_name not in self.spaces:
             print(f"❌ MMU: Access violation by '{process_name}'")
             return False
-        
-        region = self.memory_map[process_name]
-        if region['base'] <= address < region['base'] + region['size']:
-            return True
-        
-        print(f"❌ MMU: Segmentation fault by '{process_name}' at 0x{address:08X}")
-        return False
+
+        region = self.translate(process_name, address)
+        if region is None:
+            print(f"❌ MMU: Segmentation fault by '{process_name}' at 0x{address:08X}")
+            return False
+        if region['perms'] & access != access:
+            print(f"❌ MMU: Protection fault by '{process_name}' at 0x{address:08X} "
+                  f"({perm_str(access)} on {perm_str(region['perms'])} region)")
+            return False
+        return True
@@ -0,0 +1,252 @@
+"""
+Runtime asyncio do kernel - Scheduler, IPC e RecoveryAgent num único event loop
+
+Alternativa ao modelo de threads: em vez de uma thread por escalonador,
+dispatcher de mailbox e monitor, tudo roda como callbacks e tasks de um
+event loop asyncio.
+
+- `AsyncIPC`: cada entrega é um callback do loop (handlers síncronos) ou uma
+  task (handlers `async def`, serializados por destinatário). O orçamento de
+  tempo de um handler assíncrono cancela a task de fato. Um handler síncrono
+  com orçamento (ex.: FileSystem, que escreve em disco) pode bloquear: roda
+  na thread própria do destinatário e o loop só aguarda o resultado. Prazos
+  de `request` são `loop.call_later`, sem a thread de prazos.
+- `AsyncScheduler`: uma corrotina dispatcher libera os processos pela
+  política do `Scheduler`; corpos comuns rodam no próprio loop, corpos
+  `async def` e geradores viram tasks (podem aguardar I/O, `request_async`
+  ou `asyncio.to_thread` sem segurar o loop). Um corpo síncrono com `wcet`
+  declarado roda via `asyncio.to_thread`. `PropulsionDriver` registra um
+  handler `async def` e aguarda o burn com `asyncio.sleep`.
+- `RecoveryAgent` detecta `ipc.loop` e troca a thread de monitor por um timer.
+
+Serviços que usam o contrato `register`/`run` funcionam sem mudanças; a
+diferença é que `send_message` apenas agenda a entrega, que acontece na
+próxima volta do loop.
+"""
+
+import asyncio
+import inspect
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from kernel.ipc import IPC
+from kernel.scheduler import Scheduler, RUNNING, DEAD
+from kernel.supervisor import TIMEOUT
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _is_async_body(func) -> bool:
+    return inspect.iscoroutinefunction(func) or inspect.isgeneratorfunction(func)
+
+
+class AsyncIPC(IPC):
+    """Hub IPC cujas entregas são callbacks e tasks de um event loop"""
+
+    def __init__(self, loop=None, **kwargs):
+        # deliveries are loop callbacks, never mailbox threads
+        kwargs['async_mode'] = False
+        self.loop = loop or asyncio.get_running_loop()
+        # process name -> asyncio.Lock serializing its async handlers
+        self._handler_locks = {}
+        # process name -> single thread running its blocking (budgeted) sync handler
+        self._executors = {}
+        self._tasks = set()
+        super().__init__(**kwargs)
+
+    def _soon(self, callback, *args):
+        if _running_loop() is self.loop:
+            self.loop.call_soon(callback, *args)
+        else:
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    def _call(self, receiver: str, handler, payload, msgs):
+        self._soon(self._dispatch, receiver, handler, payload, msgs)
+
+    def _dispatch(self, receiver: str, handler, payload, msgs):
+        budget = self.handler_budgets.get(receiver)
+        if inspect.iscoroutinefunction(handler):
+            self._spawn_handler(self._invoke_async(receiver, handler, payload, msgs, budget))
+        elif budget is not None:
+            # a budgeted sync handler may block on I/O: it runs off the loop, which only awaits it
+            self._spawn_handler(self._invoke_async(receiver, self._off_loop(receiver, handler), payload, msgs, budget))
+        else:
+            self._invoke(receiver, handler, payload, msgs)
+
+    def _close_runner(self, process_name: str):
+        super()._close_runner(process_name)
+        executor = self._executors.pop(process_name, None)
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _spawn_handler(self, coro):
+        task = self.loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _off_loop(self, receiver: str, handler):
+        executor = self._executors.get(receiver)
+        if executor is None:
+            # one thread per receiver keeps its handlers in order, even past a timeout
+            executor = self._executors[receiver] = ThreadPoolExecutor(1, thread_name_prefix=f"ipc-{receiver}")
+
+        async def run(payload):
+            await self.loop.run_in_executor(executor, handler, payload)
+        return run
+
+    async def _invoke_async(self, receiver: str, handler, payload, msgs, budget: float = None):
+        lock = self._handler_locks.get(receiver)
+        if lock is None:
+            lock = self._handler_locks[receiver] = asyncio.Lock()
+        async with lock:
+            started_ns = time.monotonic_ns()
+            error = None
+            try:
+                if budget is None:
+                    await handler(payload)
+                else:
+                    await asyncio.wait_for(handler(payload), budget)
+            except asyncio.TimeoutError:
+                self._fault(receiver, TIMEOUT, f"handler cancelled after {budget}s")
+                return
+            except Exception as e:
+                error = e
+            self._observe(receiver, msgs, started_ns, error)
+
+    def _spawn_report(self, report: dict):
+        self._soon(self._report_fault, report)
+
+    def _arm_deadline(self, correlation_id, timeout: float):
+        self._soon(self.loop.call_later, timeout, self._expire, correlation_id)
+
+    async def drain(self):
+        """Espera as entregas agendadas e as tasks de handlers terminarem"""
+        idle = 0
+        while idle < 2:
+            await asyncio.sleep(0)
+            if self._tasks:
+                idle = 0
+                await asyncio.gather(*list(self._tasks), return_exceptions=True)
+            else:
+                idle += 1
+
+    def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        for executor in self._executors.values():
+            executor.shutdown(wait=False)
+        self._executors.clear()
+        super().shutdown()
+
+
+class AsyncScheduler(Scheduler):
+    """Scheduler cujo dispatcher é uma corrotina no event loop"""
+
+    def __init__(self, loop=None, **kwargs):
+        # one dispatcher; concurrency comes from tasks, not workers
+        kwargs['workers'] = 1
+        self.loop = loop or asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._dispatcher = None
+        self._body_tasks = set()
+        super().__init__(**kwargs)
+
+    def _wakeup(self):
+        super()._wakeup()
+        if _running_loop() is self.loop:
+            self._wake.set()
+        else:
+            self.loop.call_soon_threadsafe(self._wake.set)
+
+    def _start(self):
+        def create():
+            self._dispatcher = self.loop.create_task(self._dispatch())
+        if _running_loop() is self.loop:
+            create()
+        else:
+            self.loop.call_soon_threadsafe(create)
+
+    async def _dispatch(self):
+        print("\n[SCHEDULER] Starting asyncio scheduling loop...")
+        while self._running:
+            with self._cond:
+                self._release_due(time.monotonic())
+                proc = self._take(0)
+                if proc is not None:
+                    self.worker_stats[0]['runs'] += 1
+                    self._set_state(proc, RUNNING)
+                    self.running[proc.name] = proc
+                    proc.last_dispatch = next(self._dispatches)
+                timeout = None
+                if proc is None and self.waiting:
+                    timeout = max(0.0, self.waiting.peek_key()[0] - time.monotonic())
+                self._wake.clear()
+            if proc is not None:
+                self._start_run(proc)
+                # let IPC deliveries and running bodies progress between dispatches
+                await asyncio.sleep(0)
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _start_run(self, proc):
+        self.current_process = proc
+        started_ns = time.monotonic_ns()
+        print(f"\n⚙️  Executing: {proc.name} (Priority {proc.priority})")
+        if proc.cpu_bound and self.process_workers:
+            body = self._run_in_pool(proc)
+        elif proc.wcet is not None and not _is_async_body(proc.func):
+            # a sync body with a budget may block on I/O: a thread runs it, the loop only awaits
+            body = asyncio.to_thread(proc.func)
+        else:
+            try:
+                body = proc.func()
+            except Exception as e:
+                print(f"[SCHEDULER] Process {proc.name} crashed: {e}")
+                body = None
+        if inspect.iscoroutine(body) or inspect.isgenerator(body):
+            task = self.loop.create_task(self._drive(proc, body, started_ns))
+            self._body_tasks.add(task)
+            task.add_done_callback(self._body_tasks.discard)
+            return
+        self._finish(proc, started_ns)
+
+    async def _run_in_pool(self, proc):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.process_workers, mp_context=multiprocessing.get_context('spawn'))
+        await self.loop.run_in_executor(self._pool, proc.func)
+
+    async def _drive(self, proc, body, started_ns: int):
+        try:
+            if inspect.iscoroutine(body):
+                await body
+            else:
+                # each yield of a generator body hands the loop to other tasks
+                for _ in body:
+                    if proc.state == DEAD:
+                        body.close()
+                        break
+                    await asyncio.sleep(0)
+        except Exception as e:
+            print(f"[SCHEDULER] Process {proc.name} crashed: {e}")
+        self._finish(proc, started_ns)
+
+    def _finish(self, proc, started_ns: int):
+        # wall time from start to finish; an async body's awaits are not CPU time
+        self._account(proc, started_ns, time.monotonic_ns())
+        self._requeue(proc, proc.name)
+
+    def stop(self):
+        super().stop()
+        for task in list(self._body_tasks):
+            task.cancel()
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
@@ -1,77 +1,741 @@
 """
 Escalonador Preemptivo por Prioridade
 P1 (Crítica) > P2 (Alta) > P3 (Média) > P4 (Baixa)
+
+Políticas plugáveis (`Scheduler(policy=...)`):
+- 'priority': prioridade fixa, FIFO dentro da mesma classe (padrão)
+- 'rr': prioridade fixa, round-robin dentro da classe (quem rodou há mais tempo vai primeiro)
+- 'rm': rate-monotonic, período menor = mais prioritário
+- 'edf': earliest-deadline-first, prazo absoluto `release_time + deadline`
+
+Processos que declaram `wcet` (pior tempo de execução, em segundos) passam
+por controle de admissão: um conjunto de tarefas que a política não
+consegue garantir é rejeitado com `AdmissionError`. Processos sem `wcet`
+são best-effort e não entram na conta.
+
+Com `Scheduler(workers=N)` os processos liberados rodam em N threads, cada
+uma com sua fila: P1 fica num worker dedicado e as demais classes são
+distribuídas entre os outros; um worker ocioso rouba o trabalho mais
+urgente das filas vizinhas (o worker de P1 nunca rouba, para manter a
+cadência). Processos marcados `cpu_bound` rodam num pool de processos
+(`process_workers`), fora do GIL; o `run` deles precisa ser serializável
+(pickle). Serviços que guardam o hub IPC (locks, threads) vão para outro
+processo via `kernel.transport.spawn_service`.
+
+Preempção cooperativa: se o `run` de um processo é um gerador ou uma
+corrotina, cada `yield` (ou `await checkpoint()`) é um ponto seguro. O
+escalonador executa o corpo em fatias de até `quantum` segundos e, a cada
+ponto seguro, troca para um processo mais prioritário que tenha ficado
+pronto; o corpo interrompido volta à fila e continua de onde parou. Corpos
+comuns continuam rodando até o fim.
+
+Herança de prioridade: `inherit_priority(name, p)` eleva temporariamente um
+processo à classe `p` sem mudar sua prioridade base (`set_priority`); o IPC
+usa isso para que um servidor com pedidos pendentes rode na classe do
+requisitante mais crítico (veja `IPC.attach_scheduler`). Nas políticas 'rm'
+e 'edf' a classe só desempata.
 """
 
-import heapq
+import inspect
+import itertools
+import math
+import multiprocessing
+import pickle
 import threading
 import time
+import types
+from concurrent.futures import ProcessPoolExecutor
 from typing import List
 
+from kernel.metrics import RunAccounting
+
+# Priority classes (lower number = more critical)
+P1_CRITICAL = 1
+P2_HIGH = 2
+P3_MEDIUM = 3
+P4_LOW = 4
+PRIORITY_CLASSES = (P1_CRITICAL, P2_HIGH, P3_MEDIUM, P4_LOW)
+
+# Period (s) of processes that do not declare one
+DEFAULT_PERIOD = 0.1
+
+# Time slice (s) for generator/coroutine process bodies
+DEFAULT_QUANTUM = 0.02
+
+# Process lifecycle states
+READY = "READY"          # released, in a run queue
+RUNNING = "RUNNING"      # executing on a worker
+BLOCKED = "BLOCKED"      # waiting for its next release
+SUSPENDED = "SUSPENDED"  # held out of scheduling until resume()
+DEAD = "DEAD"            # removed or replaced (restart)
+
+
+class AdmissionError(Exception):
+    """O conjunto de tarefas não é escalonável pela política ativa"""
+
+
+@types.coroutine
+def checkpoint():
+    """Ponto seguro de preempção para corpos de processo `async def`"""
+    yield
+
+
 class Process:
-    def __init__(self, name: str, priority: int, func):
+    def __init__(self, name: str, priority: int, func, period: float = None,
+                 wcet: float = None, deadline: float = None, cpu_bound: bool = False):
         self.name = name
+        # effective priority: the base one, or an inherited (more critical) class
         self.priority = priority
+        self.base_priority = priority
+        self.inherited = None
         self.func = func
-        self.state = "READY"
+        # seconds between releases; None takes the scheduler's default period
+        self.period = period
+        # worst-case execution time (s); only processes declaring it are admission-checked
+        self.wcet = wcet
+        # relative deadline (s); None means the end of the period
+        self.deadline = deadline
+        # dispatch counter of the last run (round-robin order)
+        self.last_dispatch = -1
+        # run in the scheduler's process pool; func must be picklable
+        self.cpu_bound = cpu_bound
+        # generator/coroutine of a run interrupted by preemption
+        self.body = None
+        # first-slice start and executed time of the current run
+        self.run_started_ns = 0
+        self.run_exec_ns = 0
+        # monotonic time of the current (or next) release
+        self.release_time = 0.0
+        self.state = READY
 
     def __lt__(self, other):
         # Menor número = maior prioridade
         return self.priority < other.priority
 
 
-class Scheduler:
+def utilization(tasks) -> float:
+    """Soma de wcet/period de tuplas (period, wcet, deadline[, priority])"""
+    return sum(task[1] / task[0] for task in tasks)
+
+
+def response_times(tasks) -> list:
+    """Análise de tempo de resposta (prioridade fixa, na ordem dada).
+
+    `tasks` são tuplas (period, wcet, deadline[, priority]) da mais para a
+    menos prioritária; devolve o pior tempo de resposta de cada uma, ou None
+    se ele passar do prazo.
+    """
+    out = []
+    for i, task in enumerate(tasks):
+        wcet, deadline = task[1], task[2]
+        higher = tasks[:i]
+        response = wcet + sum(other[1] for other in higher)
+        while True:
+            nxt = wcet + sum(math.ceil(response / other[0] - 1e-12) * other[1] for other in higher)
+            if nxt > deadline:
+                out.append(None)
+                break
+            if nxt <= response:
+                out.append(nxt)
+                break
+            response = nxt
+    return out
+
+
+class FixedPriorityPolicy:
+    """Prioridade fixa; FIFO (ordem de liberação) dentro da mesma classe"""
+    name = 'priority'
+
+    def key(self, proc: Process, period: float) -> tuple:
+        return (proc.priority,)
+
+    def preempts(self, waiting: tuple, running: tuple) -> bool:
+        """Se a chave na fila tira quem está rodando num ponto seguro"""
+        # only a strictly more critical class; same-class turns wait for the quantum
+        return waiting[0] < running[0]
+
+    def admit(self, tasks: list):
+        """None se o conjunto é aceito; senão o motivo da rejeição"""
+        u = utilization(tasks)
+        if u > 1.0:
+            return f"utilization {u:.3f} > 1"
+        for i, task in enumerate(tasks):
+            # every other task of the same or a more critical class may run first
+            ahead = sorted((other for j, other in enumerate(tasks) if j != i and other[3] <= task[3]),
+                           key=lambda other: other[3])
+            if response_times(ahead + [task])[-1] is None:
+                return (f"P{task[3]} task with period {task[0]}s misses its {task[2]}s deadline "
+                        f"(response-time analysis)")
+        return None
+
+
+class RoundRobinPolicy(FixedPriorityPolicy):
+    """Prioridade fixa; dentro da classe, quem rodou há mais tempo vai primeiro"""
+    name = 'rr'
+
+    def key(self, proc: Process, period: float) -> tuple:
+        return (proc.priority, proc.last_dispatch)
+
+
+class RateMonotonicPolicy(FixedPriorityPolicy):
+    """Rate-monotonic: período menor tem prioridade maior"""
+    name = 'rm'
+
+    def key(self, proc: Process, period: float) -> tuple:
+        return (period, proc.priority)
+
+    def preempts(self, waiting: tuple, running: tuple) -> bool:
+        return waiting < running
+
+    def admit(self, tasks: list):
+        u = utilization(tasks)
+        n = len(tasks)
+        implicit = all(task[2] >= task[0] for task in tasks)
+        if n and implicit and u <= n * (2 ** (1.0 / n) - 1):
+            # Liu & Layland bound: schedulable without further analysis
+            return None
+        if u > 1.0:
+            return f"utilization {u:.3f} > 1"
+        ordered = sorted(tasks, key=lambda task: task[0])
+        for task, response in zip(ordered, response_times(ordered)):
+            if response is None:
+                return f"task with period {task[0]}s misses its {task[2]}s deadline (response-time analysis)"
+        return None
+
+
+class EDFPolicy(FixedPriorityPolicy):
+    """Earliest-deadline-first pelo prazo absoluto da liberação corrente"""
+    name = 'edf'
+
+    def key(self, proc: Process, period: float) -> tuple:
+        deadline = proc.deadline if proc.deadline is not None else period
+        return (proc.release_time + deadline, proc.priority)
+
+    def preempts(self, waiting: tuple, running: tuple) -> bool:
+        return waiting < running
+
+    def admit(self, tasks: list):
+        # density test: exact for implicit deadlines, sufficient for constrained ones
+        density = sum(task[1] / min(task[0], task[2]) for task in tasks)
+        if density > 1.0:
+            return f"density {density:.3f} > 1"
+        return None
+
+
+POLICIES = {cls.name: cls for cls in (FixedPriorityPolicy, RoundRobinPolicy, RateMonotonicPolicy, EDFPolicy)}
+
+
+def make_policy(spec):
+    """Cria uma política a partir do nome ('priority', 'rr', 'rm', 'edf') ou devolve o objeto"""
+    if spec is None:
+        return FixedPriorityPolicy()
+    if not isinstance(spec, str):
+        return spec
+    cls = POLICIES.get(spec.strip().lower())
+    if cls is None:
+        raise ValueError(f"Unknown scheduling policy: {spec}")
+    return cls()
+
+
+class IndexedHeap:
+    """Heap binário indexado por nome: push, pop, remove e update em O(log n)"""
+
     def __init__(self):
-        self.ready_queue = []
+        # entries are [key, name, item]
+        self._heap = []
+        self._pos = {}
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __contains__(self, name) -> bool:
+        return name in self._pos
+
+    def peek_key(self):
+        return self._heap[0][0] if self._heap else None
+
+    def push(self, name: str, key, item):
+        if name in self._pos:
+            raise KeyError(f"'{name}' is already queued")
+        self._heap.append([key, name, item])
+        self._pos[name] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+
+    def pop(self):
+        """Remove e devolve o item de menor chave"""
+        return self._remove_at(0)
+
+    def remove(self, name: str):
+        """Remove e devolve o item de `name` (None se não estiver na fila)"""
+        index = self._pos.get(name)
+        return None if index is None else self._remove_at(index)
+
+    def update(self, name: str, key):
+        """Troca a chave de `name` e reposiciona o item"""
+        index = self._pos[name]
+        old = self._heap[index][0]
+        self._heap[index][0] = key
+        if key < old:
+            self._sift_up(index)
+        else:
+            self._sift_down(index)
+
+    def _remove_at(self, index: int):
+        heap = self._heap
+        entry = heap[index]
+        last = heap.pop()
+        del self._pos[entry[1]]
+        if index < len(heap):
+            heap[index] = last
+            self._pos[last[1]] = index
+            self._sift_up(index)
+            self._sift_down(self._pos[last[1]])
+        return entry[2]
+
+    def _swap(self, i: int, j: int):
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._pos[heap[i][1]] = i
+        self._pos[heap[j][1]] = j
+
+    def _sift_up(self, index: int):
+        heap = self._heap
+        while index > 0:
+            parent = (index - 1) >> 1
+            if heap[index][0] < heap[parent][0]:
+                self._swap(index, parent)
+                index = parent
+            else:
+                return
+
+    def _sift_down(self, index: int):
+        heap = self._heap
+        size = len(heap)
+        while True:
+            smallest = index
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < size and heap[child][0] < heap[smallest][0]:
+                    smallest = child
+            if smallest == index:
+                return
+            self._swap(index, smallest)
+            index = smallest
+
+
+class Scheduler:
+    """Escalonador periódico orientado a eventos.
+
+    Cada processo é liberado em `release_time` e, depois de executar, volta
+    para a fila de espera com a próxima liberação em `release_time + period`
+    (sem deriva; liberações perdidas por atraso não viram rajada). A thread
+    do escalonador dorme numa `threading.Condition` até a liberação mais
+    próxima e acorda na hora quando `add_process` enfileira trabalho.
+
+    As filas são `IndexedHeap` por nome de processo, então remover,
+    repriorizar, suspender e retomar custam O(log n). Adicionar um processo
+    com um nome já existente (restart hook) substitui o anterior. Mudanças de
+    estado (READY/RUNNING/BLOCKED/SUSPENDED/DEAD) são avisadas aos ouvintes
+    de `on_state_change`.
+    """
+
+    def __init__(self, policy='priority', admission: bool = True, workers: int = 1,
+                 process_workers: int = 0, quantum: float = DEFAULT_QUANTUM):
+        if workers < 1:
+            raise ValueError("Scheduler needs at least one worker")
+        self.policy = make_policy(policy)
+        self.admission = admission
+        # name -> process, the task set checked by admission control
+        self.processes = {}
+        self.workers = workers
+        self.process_workers = process_workers
+        self.quantum = quantum
+        # per-worker queues of released processes, keyed by (policy key, seq)
+        self.run_queues = [IndexedHeap() for _ in range(workers)]
+        self.worker_stats = [{'runs': 0, 'steals': 0, 'preemptions': 0} for _ in range(workers)]
+        # worker index -> process it is running
+        self.running = {}
+        # process name -> RunAccounting of its recent runs
+        self.accounting = {}
+        self._pool = None
+        # processes waiting for their next period, keyed by (release_time, seq)
+        self.waiting = IndexedHeap()
+        # callables(name, old_state, new_state)
+        self._listeners = []
         self.current_process = None
-        self._lock = threading.Lock()
+        self.default_period = DEFAULT_PERIOD
+        self._seq = itertools.count()
+        self._dispatches = itertools.count()
+        self._cond = threading.Condition()
         self._running = False
-        print("[KERNEL] Scheduler initialized (Preemptive Priority - simulated loop)")
+        print(f"[KERNEL] Scheduler initialized (Preemptive Priority - periodic, event-driven, "
+              f"policy={self.policy.name}, workers={workers})")
+
+    def _period_of(self, proc: Process) -> float:
+        return proc.period if proc.period is not None else self.default_period
+
+    def _tasks(self, processes) -> list:
+        tasks = []
+        for proc in processes:
+            if proc.wcet is not None:
+                period = self._period_of(proc)
+                tasks.append((period, proc.wcet, proc.deadline if proc.deadline is not None else period,
+                              proc.base_priority))
+        return tasks
+
+    def check_admission(self, process: Process):
+        """Levanta AdmissionError se `process` tornar o conjunto não escalonável"""
+        if process.wcet is None or not self.admission:
+            return
+        # a process re-added under the same name (restart) replaces the old one
+        candidates = [p for name, p in self.processes.items() if name != process.name] + [process]
+        reason = self.policy.admit(self._tasks(candidates))
+        if reason is not None:
+            raise AdmissionError(f"Process '{process.name}' rejected by {self.policy.name}: {reason}")
+
+    def utilization(self) -> float:
+        """Utilização declarada (wcet/period) dos processos admitidos"""
+        return utilization(self._tasks(self.processes.values()))
+
+    def _home(self, proc: Process) -> int:
+        """Worker dono da fila do processo: P1 no worker 0, demais classes nos outros"""
+        if self.workers == 1 or proc.priority <= P1_CRITICAL:
+            return 0
+        return 1 + (proc.priority - P2_HIGH) % (self.workers - 1)
+
+    def _wakeup(self):
+        # called with _cond held: wake workers waiting for work or for the next release
+        self._cond.notify_all()
+
+    def on_state_change(self, listener):
+        """Registra `listener(name, old_state, new_state)`; roda com o lock do escalonador"""
+        self._listeners.append(listener)
+
+    def _set_state(self, proc: Process, state: str):
+        old = proc.state
+        proc.state = state
+        if old != state:
+            for listener in self._listeners:
+                try:
+                    listener(proc.name, old, state)
+                except Exception as e:
+                    print(f"[SCHEDULER] State listener failed: {e}")
+
+    def state_of(self, name: str):
+        proc = self.processes.get(name)
+        return proc.state if proc else None
+
+    def _push_ready(self, proc: Process):
+        # called with _cond held
+        self._set_state(proc, READY)
+        key = self.policy.key(proc, self._period_of(proc))
+        self.run_queues[self._home(proc)].push(proc.name, (key, next(self._seq)), proc)
+
+    def _discard(self, proc: Process):
+        # called with _cond held: mark DEAD; a parked preempted body is closed (a running one at its next safe point)
+        self._set_state(proc, DEAD)
+        if proc.body is not None and all(running is not proc for running in self.running.values()):
+            proc.body.close()
+            proc.body = None
+
+    def _unqueue(self, proc: Process):
+        # called with _cond held: drop the process from whichever queue holds it
+        if self.waiting.remove(proc.name) is not None:
+            return
+        for queue in self.run_queues:
+            if queue.remove(proc.name) is not None:
+                return
 
     def add_process(self, process: Process):
-        with self._lock:
-            heapq.heappush(self.ready_queue, process)
-        print(f"  → Process '{process.name}' added (P{process.priority})")
-
-    def _schedule_loop(self, tick_ms: int):
-        print("\n[SCHEDULER] Starting scheduling loop...")
-        while self._running:
-            proc = None
-            with self._lock:
-                if self.ready_queue:
-                    proc = heapq.heappop(self.ready_queue)
+        """Adiciona um processo; um processo com o mesmo nome é substituído"""
+        if process.cpu_bound and self.process_workers:
+            try:
+                pickle.dumps(process.func)
+            except Exception as e:
+                raise TypeError(f"cpu_bound process '{process.name}' needs a picklable run ({e}); "
+                                f"run services that hold IPC state with kernel.transport.spawn_service") from e
+        with self._cond:
+            self.check_admission(process)
+            old = self.processes.get(process.name)
+            if old is not None:
+                self._unqueue(old)
+                self._discard(old)
+            self.processes[process.name] = process
+            process.release_time = time.monotonic()
+            self._push_ready(process)
+            self._wakeup()
+        action = 'replaced' if old is not None else 'added'
+        print(f"  → Process '{process.name}' {action} (P{process.priority})")
+
+    def remove_process(self, name: str) -> bool:
+        """Remove o processo do escalonamento (se estiver rodando, termina a execução corrente)"""
+        with self._cond:
+            proc = self.processes.pop(name, None)
             if proc is None:
-                time.sleep(tick_ms / 1000.0)
-                continue
+                return False
+            self._unqueue(proc)
+            self._discard(proc)
+        print(f"  → Process '{name}' removed")
+        return True
+
+    def set_priority(self, name: str, priority: int):
+        """Muda a prioridade base e reposiciona o processo na fila"""
+        with self._cond:
+            proc = self.processes[name]
+            proc.base_priority = priority
+            self._reprioritize(proc)
+
+    def inherit_priority(self, name: str, priority: int = None) -> bool:
+        """Eleva o processo à classe `priority` até nova ordem; None volta à prioridade base"""
+        with self._cond:
+            proc = self.processes.get(name)
+            if proc is None:
+                return False
+            proc.inherited = priority
+            self._reprioritize(proc)
+            return True
+
+    def _reprioritize(self, proc: Process):
+        # called with _cond held
+        priority = proc.base_priority
+        if proc.inherited is not None:
+            priority = min(priority, proc.inherited)
+        if proc.priority == priority:
+            return
+        queued = proc.state == READY
+        if queued:
+            self._unqueue(proc)
+        proc.priority = priority
+        if queued:
+            # the home worker may change with the class
+            self._push_ready(proc)
+            self._wakeup()
+
+    def suspend(self, name: str):
+        """Tira o processo do escalonamento até `resume` (após a execução corrente)"""
+        with self._cond:
+            proc = self.processes[name]
+            if proc.state in (READY, BLOCKED):
+                self._unqueue(proc)
+            self._set_state(proc, SUSPENDED)
+
+    def resume(self, name: str):
+        """Devolve um processo suspenso ao escalonamento, liberado imediatamente"""
+        with self._cond:
+            proc = self.processes[name]
+            if proc.state != SUSPENDED:
+                return
+            if any(running is proc for running in self.running.values()):
+                # suspended mid-run: just cancel the pending suspension
+                self._set_state(proc, RUNNING)
+                return
+            proc.release_time = time.monotonic()
+            self._push_ready(proc)
+            self._wakeup()
+
+    def _release_due(self, now: float):
+        # called with _cond held: move processes whose release time has come to the ready queue
+        while self.waiting and self.waiting.peek_key()[0] <= now:
+            self._push_ready(self.waiting.pop())
+
+    def _take(self, worker: int):
+        # called with _cond held: own queue first, then steal the most urgent entry elsewhere
+        queue = self.run_queues[worker]
+        if queue:
+            return queue.pop()
+        if worker == 0 and self.workers > 1:
+            # the P1 worker stays free to keep P1 cadence
+            return None
+        victim = None
+        for i, other in enumerate(self.run_queues):
+            if i != worker and other and (victim is None or other.peek_key() < self.run_queues[victim].peek_key()):
+                victim = i
+        if victim is None:
+            return None
+        self.worker_stats[worker]['steals'] += 1
+        return self.run_queues[victim].pop()
+
+    def _next_ready(self, worker: int = 0):
+        """Bloqueia até haver processo liberado para `worker` (ou o escalonador parar)"""
+        with self._cond:
+            while self._running:
+                self._release_due(time.monotonic())
+                proc = self._take(worker)
+                if proc is not None:
+                    self.worker_stats[worker]['runs'] += 1
+                    self._set_state(proc, RUNNING)
+                    self.running[worker] = proc
+                    proc.last_dispatch = next(self._dispatches)
+                    return proc
+                timeout = None
+                if self.waiting:
+                    timeout = max(0.0, self.waiting.peek_key()[0] - time.monotonic())
+                self._cond.wait(timeout)
+        return None
+
+    def _requeue(self, proc: Process, worker: int):
+        period = self._period_of(proc)
+        now = time.monotonic()
+        release = proc.release_time + period
+        if release < now:
+            # overran its period: release again now instead of replaying missed periods
+            release = now
+        with self._cond:
+            self.running.pop(worker, None)
+            if proc.state != RUNNING:
+                # suspended or removed/replaced while it ran
+                return
+            proc.release_time = release
+            self._set_state(proc, BLOCKED)
+            self.waiting.push(proc.name, (release, next(self._seq)), proc)
+            self._wakeup()
+
+    def _preempt(self, proc: Process, worker: int):
+        # the body keeps its place in the current release: back to the run queue as READY
+        with self._cond:
+            self.running.pop(worker, None)
+            self.worker_stats[worker]['preemptions'] += 1
+            if proc.state == DEAD:
+                proc.body.close()
+                proc.body = None
+            elif proc.state == RUNNING:
+                self._push_ready(proc)
+                self._wakeup()
+
+    def _should_preempt(self, proc: Process, worker: int) -> bool:
+        with self._cond:
+            if proc.state != RUNNING:
+                # suspended or removed at a safe point
+                return True
+            self._release_due(time.monotonic())
+            head = self.run_queues[worker].peek_key()
+            return head is not None and self.policy.preempts(head[0], self.policy.key(proc, self._period_of(proc)))
+
+    def _execute(self, proc: Process, worker: int = 0) -> bool:
+        """Executa o processo (ou uma fatia dele); False se o corpo foi preemptado"""
+        if proc.cpu_bound and self.process_workers:
+            with self._cond:
+                # workers race to the first cpu_bound release: only one creates the pool
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(self.process_workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+                pool = self._pool
+            pool.submit(proc.func).result()
+            return True
+        body = proc.body
+        if body is None:
+            # call the process run method once (cooperative model)
+            result = proc.func()
+            if not (inspect.isgenerator(result) or inspect.iscoroutine(result)):
+                return True
+            body = proc.body = result
+        slice_end = time.monotonic() + self.quantum
+        try:
+            while True:
+                body.send(None)
+                if time.monotonic() >= slice_end or self._should_preempt(proc, worker):
+                    return False
+        except StopIteration:
+            proc.body = None
+            return True
+
+    def _schedule_loop(self, worker: int = 0):
+        if worker == 0:
+            print("\n[SCHEDULER] Starting scheduling loop...")
+        while True:
+            proc = self._next_ready(worker)
+            if proc is None:
+                return
 
             self.current_process = proc
-            try:
+            started_ns = time.monotonic_ns()
+            if proc.body is None:
                 print(f"\n⚙️  Executing: {proc.name} (Priority {proc.priority})")
-                # call the process run method once (cooperative model)
-                proc.func()
+                proc.run_started_ns = started_ns
+                proc.run_exec_ns = 0
+            try:
+                finished = self._execute(proc, worker)
             except Exception as e:
                 print(f"[SCHEDULER] Process {proc.name} crashed: {e}")
+                proc.body = None
+                finished = True
+            finished_ns = time.monotonic_ns()
+            proc.run_exec_ns += finished_ns - started_ns
+            if not finished:
+                self._preempt(proc, worker)
+                continue
+            self._account(proc, proc.run_started_ns, finished_ns, proc.run_exec_ns)
+            self._requeue(proc, worker)
+
+    def _account(self, proc: Process, started_ns: int, finished_ns: int, exec_ns: int = None):
+        accounting = self.accounting.get(proc.name)
+        if accounting is None:
+            accounting = self.accounting.setdefault(proc.name, RunAccounting())
+        release_ns = int(proc.release_time * 1e9)
+        deadline = proc.deadline if proc.deadline is not None else self._period_of(proc)
+        accounting.record(release_ns, started_ns, finished_ns, release_ns + int(deadline * 1e9), exec_ns)
 
-            # after execution, re-enqueue to simulate periodic processes
-            # if process still considered runnable
-            time.sleep(tick_ms / 1000.0)
-            with self._lock:
-                heapq.heappush(self.ready_queue, proc)
+    def process_stats(self, name: str = None) -> dict:
+        """Latência, execução, jitter, perdas de prazo e fatia de CPU (de um ou de todos)"""
+        now_ns = time.monotonic_ns()
+        if name is not None:
+            accounting = self.accounting.get(name)
+            return accounting.summary(now_ns) if accounting else {}
+        return {n: a.summary(now_ns) for n, a in list(self.accounting.items())}
+
+    def snapshot(self) -> dict:
+        """Tabela de processos no formato de `/api/state` (cpu em %)"""
+        stats = self.process_stats()
+        processes = []
+        for name, proc in list(self.processes.items()):
+            entry = stats.get(name, {})
+            processes.append({
+                'name': name,
+                'priority': f"P{proc.priority}",
+                'status': proc.state.capitalize(),
+                'cpu': round(entry.get('cpu_share', 0.0) * 100, 1),
+                'runs': entry.get('runs', 0),
+                'deadlineMisses': entry.get('deadline_misses', 0),
+                'latencyMs': round(entry.get('latency_p50_ns', 0) / 1e6, 3),
+                'jitterMs': round(entry.get('jitter_ns', 0) / 1e6, 3),
+            })
+        return {'processes': processes, 'totalCpu': round(sum(p['cpu'] for p in processes), 1)}
 
     def run(self, processes: List, tick_ms: int = 100):
         """Start the scheduler loop in background and register initial processes.
 
-        This implementation simulates a cooperative/preemptive scheduler by
-        repeatedly invoking each process's `run()` and re-enqueuing it. It
-        runs in a background daemon thread so boot can continue.
+        Each process's `run()` is invoked once per period: the `period`
+        attribute of the instance (seconds) if declared, otherwise `tick_ms`.
+        Optional `wcet` and `deadline` attributes feed the policy and
+        admission control. It runs in a background daemon thread so boot
+        can continue.
         """
+        self.default_period = tick_ms / 1000.0
         for proc in processes:
             self.add_process(Process(
-                name=proc.__class__.__name__,
+                # out-of-process services (RemoteService) carry their own name
+                name=getattr(proc, 'process_name', proc.__class__.__name__),
                 priority=proc.priority,
-                func=proc.run
+                func=proc.run,
+                period=getattr(proc, 'period', None),
+                wcet=getattr(proc, 'wcet', None),
+                deadline=getattr(proc, 'deadline', None),
+                cpu_bound=getattr(proc, 'cpu_bound', False),
             ))
 
-        self._running = True
-        t = threading.Thread(target=self._schedule_loop, args=(tick_ms,), daemon=True)
-        t.start()
+        with self._cond:
+            self._running = True
+        self._start()
+
+    def _start(self):
+        for worker in range(self.workers):
+            t = threading.Thread(target=self._schedule_loop, args=(worker,), name=f"scheduler-{worker}", daemon=True)
+            t.start()
+
+    def stop(self):
+        """Para o loop do escalonador (o processo em execução termina normalmente)"""
+        with self._cond:
+            self._running = False
+            self._wakeup()
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
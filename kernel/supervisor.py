@@ -0,0 +1,143 @@
+"""
+Supervisão de handlers do IPC - isolamento de falhas e orçamento de tempo
+
+A exceção de um handler nunca sobe para a pilha do remetente: o hub registra
+a falha e segue. Cada destinatário pode ter um orçamento de tempo por
+entrega (`handler_budget`, em segundos). No modo síncrono, um destinatário
+com orçamento roda num `HandlerRunner` (thread própria) e o remetente espera
+no máximo o orçamento; no modo assíncrono o hub percebe o handler parado ao
+enfileirar a próxima mensagem.
+
+O `HandlerSupervisor` conta as falhas consecutivas de cada destinatário
+(exceção, estouro ou timeout). Ao atingir `fault_threshold`, o destinatário
+entra em quarentena por `quarantine_period` segundos: suas mensagens vão
+para a fila de dead letters e são reentregues quando a quarentena acaba ou
+quando o processo se registra de novo.
+"""
+
+import queue
+import threading
+import time
+
+DEFAULT_FAULT_THRESHOLD = 3
+DEFAULT_QUARANTINE_PERIOD = 5.0
+
+# Fault reasons
+ERROR = 'error'        # handler raised
+OVERRUN = 'overrun'    # handler finished, but over budget
+TIMEOUT = 'timeout'    # handler still running when the hub gave up waiting
+FAULT_REASONS = (ERROR, OVERRUN, TIMEOUT)
+
+# Quarantine states returned by HandlerSupervisor.check
+QUARANTINED = 'quarantined'
+RELEASED = 'released'
+
+
+class HandlerSupervisor:
+    """Contabiliza falhas de handlers e controla a quarentena"""
+
+    def __init__(self, fault_threshold: int = DEFAULT_FAULT_THRESHOLD,
+                 quarantine_period: float = DEFAULT_QUARANTINE_PERIOD):
+        if fault_threshold < 1:
+            raise ValueError("Fault threshold must be >= 1")
+        self.fault_threshold = fault_threshold
+        self.quarantine_period = quarantine_period
+        # receiver -> monotonic time at which the quarantine ends
+        self.quarantined = {}
+        # receiver -> fault counters
+        self._faults = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, receiver: str) -> dict:
+        # called with _lock held
+        entry = self._faults.get(receiver)
+        if entry is None:
+            entry = self._faults[receiver] = {
+                'consecutive': 0, ERROR: 0, OVERRUN: 0, TIMEOUT: 0, 'quarantines': 0, 'last_fault': None,
+            }
+        return entry
+
+    def success(self, receiver: str):
+        entry = self._faults.get(receiver)
+        if entry is not None and entry['consecutive']:
+            with self._lock:
+                entry['consecutive'] = 0
+
+    def fault(self, receiver: str, reason: str, detail: str = '') -> bool:
+        """Registra uma falha; True se o destinatário acabou de entrar em quarentena"""
+        if reason not in FAULT_REASONS:
+            raise ValueError(f"Unknown fault reason: {reason}")
+        with self._lock:
+            entry = self._entry(receiver)
+            entry[reason] += 1
+            entry['consecutive'] += 1
+            entry['last_fault'] = f"{reason}: {detail}" if detail else reason
+            if entry['consecutive'] < self.fault_threshold or receiver in self.quarantined:
+                return False
+            entry['consecutive'] = 0
+            entry['quarantines'] += 1
+            self.quarantined[receiver] = time.monotonic() + self.quarantine_period
+            return True
+
+    def check(self, receiver: str):
+        """None, QUARANTINED ou RELEASED (devolvido uma única vez, quando o prazo acaba)"""
+        with self._lock:
+            until = self.quarantined.get(receiver)
+            if until is None:
+                return None
+            if time.monotonic() < until:
+                return QUARANTINED
+            del self.quarantined[receiver]
+            return RELEASED
+
+    def is_quarantined(self, receiver: str) -> bool:
+        return receiver in self.quarantined
+
+    def reset(self, receiver: str) -> bool:
+        """Encerra a quarentena e zera as falhas consecutivas (ex.: re-registro)"""
+        with self._lock:
+            entry = self._faults.get(receiver)
+            if entry is not None:
+                entry['consecutive'] = 0
+            return self.quarantined.pop(receiver, None) is not None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                receiver: dict(entry, quarantined=receiver in self.quarantined)
+                for receiver, entry in self._faults.items()
+            }
+
+
+class HandlerRunner:
+    """Thread dedicada que executa, em ordem, os handlers síncronos de um destinatário"""
+
+    def __init__(self, owner: str):
+        self.owner = owner
+        self._jobs = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name=f"ipc-handler-{owner}", daemon=True)
+        self._thread.start()
+
+    def on_runner_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def submit(self, fn, *args) -> threading.Event:
+        """Agenda `fn(*args)`; o evento devolvido é sinalizado quando ela termina"""
+        done = threading.Event()
+        self._jobs.put((fn, args, done))
+        return done
+
+    def _loop(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            fn, args, done = job
+            try:
+                fn(*args)
+            finally:
+                done.set()
+
+    def close(self):
+        """Encerra a thread depois dos trabalhos já agendados"""
+        self._jobs.put(None)
@@ -0,0 +1,146 @@
+"""
+Tracing do IPC - camada plugável de rastreamento de mensagens
+
+O hub só chama o tracer quando `tracer.enabled` é verdadeiro e nunca formata
+nada por conta própria: cada tracer decide se e quando transformar a mensagem
+em texto. Isso tira o `print` (e o lock do terminal) do caminho quente.
+
+Tracers disponíveis:
+- ConsoleTracer: imprime cada mensagem (comportamento histórico)
+- NullTracer: desligado
+- SampledTracer: repassa 1 a cada N eventos para outro tracer
+- RingBufferTracer: grava registros binários de tamanho fixo em um buffer circular
+"""
+
+import struct
+import threading
+import time
+
+# Event kinds recorded by the hub
+SEND = 0
+BROADCAST = 1
+PUBLISH = 2
+KIND_NAMES = {SEND: 'send', BROADCAST: 'broadcast', PUBLISH: 'publish'}
+
+
+class NullTracer:
+    """Tracing desligado: o hub pula a chamada inteira"""
+    enabled = False
+
+    def trace(self, kind: int, sender: str, receiver: str, data: dict):
+        pass
+
+
+class ConsoleTracer:
+    """Imprime cada evento no terminal (formato histórico do hub)"""
+    enabled = True
+
+    def trace(self, kind: int, sender: str, receiver: str, data: dict):
+        if kind == BROADCAST:
+            print(f"📢 IPC Broadcast from {sender}: {data}")
+        elif kind == PUBLISH:
+            print(f"📢 IPC Publish {sender} → [{receiver}]: {data}")
+        else:
+            print(f"📨 IPC: {sender} → {receiver} | {data}")
+
+
+class SampledTracer:
+    """Repassa apenas 1 a cada `every` eventos para o tracer interno"""
+
+    def __init__(self, every: int, inner=None):
+        if every < 1:
+            raise ValueError("Sampling interval must be >= 1")
+        self.every = every
+        self.inner = inner if inner is not None else ConsoleTracer()
+        self._count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.inner.enabled
+
+    def trace(self, kind: int, sender: str, receiver: str, data: dict):
+        with self._lock:
+            sampled = self._count % self.every == 0
+            self._count += 1
+        if sampled:
+            self.inner.trace(kind, sender, receiver, data)
+
+
+class RingBufferTracer:
+    """Buffer circular binário com registros de tamanho fixo.
+
+    Cada registro guarda (timestamp monotônico em ns, tipo, id do remetente,
+    id do destinatário); os nomes são internados numa tabela à parte e o
+    payload não é formatado nem retido. A decodificação só acontece em
+    `records()`/`dump()`.
+    """
+    enabled = True
+    RECORD = struct.Struct('<qBHH')
+
+    def __init__(self, capacity: int = 4096):
+        if capacity < 1:
+            raise ValueError("Ring buffer capacity must be >= 1")
+        self.capacity = capacity
+        self._buf = bytearray(self.RECORD.size * capacity)
+        self._written = 0
+        self._names = []
+        self._name_ids = {}
+        self._lock = threading.Lock()
+
+    def _intern(self, name: str) -> int:
+        idx = self._name_ids.get(name)
+        if idx is None:
+            idx = len(self._names)
+            self._names.append(name)
+            self._name_ids[name] = idx
+        return idx
+
+    def trace(self, kind: int, sender: str, receiver: str, data: dict):
+        t_ns = time.monotonic_ns()
+        with self._lock:
+            slot = self._written % self.capacity
+            self.RECORD.pack_into(self._buf, slot * self.RECORD.size, t_ns, kind,
+                                  self._intern(sender), self._intern(receiver or ''))
+            self._written += 1
+
+    def __len__(self):
+        return min(self._written, self.capacity)
+
+    def records(self) -> list:
+        """Decodifica os registros retidos, do mais antigo ao mais recente"""
+        with self._lock:
+            count = min(self._written, self.capacity)
+            start = self._written - count
+            out = []
+            for i in range(start, self._written):
+                t_ns, kind, s_id, r_id = self.RECORD.unpack_from(self._buf, (i % self.capacity) * self.RECORD.size)
+                out.append((t_ns, KIND_NAMES.get(kind, str(kind)), self._names[s_id], self._names[r_id]))
+            return out
+
+    def dump(self):
+        for t_ns, kind, sender, receiver in self.records():
+            print(f"[IPC-TRACE] {t_ns} {kind} {sender} → {receiver or '*'}")
+
+
+def make_tracer(spec):
+    """Cria um tracer a partir de uma especificação.
+
+    Aceita um objeto tracer pronto ou uma string: 'console', 'off',
+    'sampled:N' ou 'ring[:capacidade]'.
+    """
+    if spec is None:
+        return ConsoleTracer()
+    if not isinstance(spec, str):
+        return spec
+    name, _, arg = spec.partition(':')
+    name = name.strip().lower()
+    if name in ('console', 'on'):
+        return ConsoleTracer()
+    if name in ('off', 'none', ''):
+        return NullTracer()
+    if name == 'sampled':
+        return SampledTracer(int(arg or 100))
+    if name == 'ring':
+        return RingBufferTracer(int(arg or 4096))
+    raise ValueError(f"Unknown IPC trace mode: {spec}")
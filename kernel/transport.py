@@ -0,0 +1,335 @@
+"""
+Transporte IPC multiprocesso - serviços em processos de trabalho
+
+Um serviço colocado fora do processo (ex.: NPUDriver, CompositionAnalyzer)
+roda num processo próprio, com seu próprio GIL, e conversa com o hub por um
+`multiprocessing.Pipe`. Cada quadro é uma tupla curta `(op, ...)` serializada
+com pickle e enviada com prefixo de tamanho (`Connection.send_bytes`).
+
+No processo filho o serviço recebe um `RemoteIPC`, que expõe a mesma API do
+hub (`register`, `send_message`, `broadcast`, `publish`, `send_many`,
+`request`, `reply`, ...). No processo do kernel, `spawn_service` registra o
+nome do serviço no hub e devolve um `RemoteService` com `priority` e `run()`,
+pronto para o `Scheduler`. Dentro ou fora do processo é só configuração.
+"""
+
+import inspect
+import itertools
+import multiprocessing
+import pickle
+import queue
+import threading
+from concurrent.futures import Future
+from types import MappingProxyType
+
+from kernel.buffers import BufferOwnershipError
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # pragma: no cover - platforms without shared memory
+    shared_memory = None
+
+# hub -> worker
+OP_MSG = 1
+OP_RUN = 2
+OP_STOP = 3
+OP_RESPONSE = 4
+# worker -> hub
+OP_SEND = 10
+OP_BROADCAST = 11
+OP_PUBLISH = 12
+OP_REPLY = 13
+OP_REQUEST = 14
+OP_SUBSCRIBE = 15
+OP_RELEASE = 16
+OP_SEND_MANY = 17
+OP_READY = 18
+OP_ERROR = 19
+
+
+def _encode(frame) -> bytes:
+    return pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _plain(data):
+    # read-only views (published payloads) are not picklable
+    return dict(data) if isinstance(data, MappingProxyType) else data
+
+
+class _Channel:
+    """Ponta de um Pipe com envio serializado entre threads"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._lock = threading.Lock()
+
+    def send(self, *frame):
+        payload = _encode(frame)
+        with self._lock:
+            self.conn.send_bytes(payload)
+
+    def recv(self):
+        return pickle.loads(self.conn.recv_bytes())
+
+
+# ---------------------------------------------------------------- worker side
+
+class RemoteIPC:
+    """Proxy do hub usado pelo serviço dentro do processo de trabalho"""
+
+    def __init__(self, channel: _Channel):
+        self._channel = channel
+        self.registered_processes = {}
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._attached = {}
+
+    def register(self, process_name: str, callback, **options):
+        self.registered_processes[process_name] = callback
+
+    def send_message(self, sender: str, receiver: str, data: dict, correlation_id=None) -> bool:
+        self._channel.send(OP_SEND, sender, receiver, data, correlation_id)
+        return True
+
+    def send_many(self, sender: str, messages) -> int:
+        messages = list(messages)
+        self._channel.send(OP_SEND_MANY, sender, messages)
+        return len(messages)
+
+    def broadcast(self, sender: str, data: dict):
+        self._channel.send(OP_BROADCAST, sender, data)
+
+    def publish(self, sender: str, topic: str, data: dict) -> int:
+        self._channel.send(OP_PUBLISH, sender, topic, data)
+        return 0
+
+    def subscribe(self, process_name: str, topic: str):
+        self._channel.send(OP_SUBSCRIBE, process_name, topic)
+
+    def reply(self, request_msg, data: dict) -> bool:
+        self._channel.send(OP_REPLY, request_msg.receiver, request_msg.sender,
+                           request_msg.correlation_id, data)
+        return True
+
+    def request(self, sender: str, receiver: str, data: dict, timeout: float = None) -> Future:
+        future = Future()
+        request_id = next(self._ids)
+        with self._lock:
+            self._pending[request_id] = future
+        self._channel.send(OP_REQUEST, request_id, sender, receiver, data, timeout)
+        return future
+
+    def _resolve(self, request_id, ok, payload):
+        from kernel.ipc import Message
+        with self._lock:
+            future = self._pending.pop(request_id, None)
+        if future is None or future.cancelled():
+            return
+        if ok:
+            sender, receiver, data, priority, correlation_id = payload
+            future.set_result(Message(sender, receiver, data, priority, correlation_id))
+        else:
+            kind, text = payload
+            future.set_exception(TimeoutError(text) if kind == 'timeout' else RuntimeError(text))
+
+    def buffer_view(self, handle, process_name: str) -> memoryview:
+        """Anexa o segmento compartilhado do handle (sem cópia)"""
+        if handle.owner != process_name:
+            raise BufferOwnershipError(f"'{process_name}' does not own buffer #{handle.buffer_id}")
+        if shared_memory is None or handle.shm_name is None:
+            raise BufferOwnershipError("Buffer is not backed by shared memory")
+        segment = self._attached.get(handle.buffer_id)
+        if segment is None:
+            segment = shared_memory.SharedMemory(name=handle.shm_name)
+            self._attached[handle.buffer_id] = segment
+        return segment.buf[:handle.length]
+
+    def release_buffer(self, handle, process_name: str):
+        segment = self._attached.pop(handle.buffer_id, None)
+        if segment is not None:
+            try:
+                segment.close()
+            except BufferError:
+                pass
+        self._channel.send(OP_RELEASE, handle, process_name)
+
+
+def _worker_main(conn, name, factory, args, kwargs):
+    """Ponto de entrada do processo de trabalho"""
+    from kernel.ipc import Message
+
+    channel = _Channel(conn)
+    ipc = RemoteIPC(channel)
+    instance = factory(ipc, *args, **kwargs)
+    work = queue.Queue()
+
+    def reader():
+        # responses resolve futures here so handlers may block on them
+        while True:
+            try:
+                frame = channel.recv()
+            except (EOFError, OSError):
+                work.put((OP_STOP,))
+                return
+            if frame[0] == OP_RESPONSE:
+                ipc._resolve(*frame[1:])
+            else:
+                work.put(frame)
+
+    threading.Thread(target=reader, name=f"{name}-reader", daemon=True).start()
+    channel.send(OP_READY, name, getattr(instance, 'priority', None))
+    while True:
+        frame = work.get()
+        op = frame[0]
+        if op == OP_STOP:
+            break
+        try:
+            if op == OP_MSG:
+                _, sender, receiver, data, priority, correlation_id = frame
+                callback = ipc.registered_processes.get(receiver)
+                if callback is not None:
+                    callback(Message(sender, receiver, data, priority, correlation_id))
+            elif op == OP_RUN:
+                body = instance.run()
+                if inspect.isgenerator(body) or inspect.iscoroutine(body):
+                    # preemptible bodies have no scheduler here: run to completion
+                    try:
+                        while True:
+                            body.send(None)
+                    except StopIteration:
+                        pass
+        except Exception as e:
+            channel.send(OP_ERROR, name, repr(e))
+
+
+# ------------------------------------------------------------------ hub side
+
+class RemoteService:
+    """Representa, no processo do kernel, um serviço que roda num worker"""
+
+    def __init__(self, ipc, name: str, process, channel: _Channel, priority):
+        self.ipc = ipc
+        self.process_name = name
+        self.priority = priority
+        self.period = None
+        self.process = process
+        self._channel = channel
+        self._alive = True
+        self.ready = threading.Event()
+        self._reader = threading.Thread(target=self._read_loop, name=f"transport-{name}", daemon=True)
+        self._reader.start()
+
+    def deliver(self, msg):
+        """Callback registrado no hub: encaminha a mensagem ao worker"""
+        if not self._alive:
+            raise ConnectionError(f"Worker of '{self.process_name}' is gone")
+        self._channel.send(OP_MSG, msg.sender, msg.receiver, _plain(msg.data), msg.priority, msg.correlation_id)
+
+    def run(self):
+        """Pede ao worker uma execução de `run()` (chamado pelo Scheduler)"""
+        if self._alive:
+            self._channel.send(OP_RUN)
+
+    def is_alive(self) -> bool:
+        return self._alive and self.process.is_alive()
+
+    def stop(self, timeout: float = 2.0):
+        if self._alive:
+            try:
+                self._channel.send(OP_STOP)
+            except (OSError, BrokenPipeError):
+                pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self._alive = False
+
+    def _read_loop(self):
+        ipc = self.ipc
+        while True:
+            try:
+                frame = self._channel.recv()
+            except (EOFError, OSError):
+                break
+            op = frame[0]
+            try:
+                if op == OP_SEND:
+                    _, sender, receiver, data, correlation_id = frame
+                    ipc.send_message(sender, receiver, data, correlation_id=correlation_id)
+                elif op == OP_SEND_MANY:
+                    ipc.send_many(frame[1], frame[2])
+                elif op == OP_REPLY:
+                    self._reply(*frame[1:])
+                elif op == OP_REQUEST:
+                    self._request(*frame[1:])
+                elif op == OP_BROADCAST:
+                    ipc.broadcast(frame[1], frame[2])
+                elif op == OP_PUBLISH:
+                    ipc.publish(frame[1], frame[2], frame[3])
+                elif op == OP_SUBSCRIBE:
+                    ipc.subscribe(frame[1], frame[2])
+                elif op == OP_RELEASE:
+                    ipc.release_buffer(frame[1], frame[2])
+                elif op == OP_READY:
+                    self.ready.set()
+                elif op == OP_ERROR:
+                    print(f"[TRANSPORT] Worker '{frame[1]}' handler failed: {frame[2]}")
+            except Exception as e:
+                print(f"[TRANSPORT] Frame from '{self.process_name}' failed: {e}")
+        self._alive = False
+        # messages for a dead worker go to the hub queue until it is respawned
+        if ipc.registered_processes.get(self.process_name) == self.deliver:
+            ipc.unregister(self.process_name)
+        print(f"[TRANSPORT] Worker for '{self.process_name}' disconnected")
+
+    def _reply(self, responder, requester, correlation_id, data):
+        from kernel.ipc import Message
+        request_msg = Message(requester, responder, {}, correlation_id=correlation_id)
+        self.ipc.reply(request_msg, data)
+
+    def _request(self, request_id, sender, receiver, data, timeout):
+        future = self.ipc.request(sender, receiver, data, timeout)
+
+        def forward(done):
+            try:
+                if done.cancelled():
+                    self._channel.send(OP_RESPONSE, request_id, False, ('cancelled', 'request cancelled'))
+                    return
+                error = done.exception()
+                if error is not None:
+                    kind = 'timeout' if isinstance(error, TimeoutError) else 'error'
+                    self._channel.send(OP_RESPONSE, request_id, False, (kind, str(error)))
+                    return
+                msg = done.result()
+                self._channel.send(OP_RESPONSE, request_id, True,
+                                   (msg.sender, msg.receiver, _plain(msg.data), msg.priority, msg.correlation_id))
+            except (OSError, BrokenPipeError):
+                pass
+
+        future.add_done_callback(forward)
+
+
+def spawn_service(ipc, name: str, factory, *args, priority=None, start_method: str = 'spawn',
+                  ready_timeout: float = 10.0, **kwargs) -> RemoteService:
+    """Inicia `factory(ipc_proxy, *args, **kwargs)` num processo de trabalho.
+
+    `factory` precisa ser importável pelo filho (ex.: a classe `NPUDriver`).
+    O nome é registrado no hub imediatamente; mensagens enviadas antes do
+    worker ficar pronto aguardam no Pipe.
+    """
+    if priority is not None:
+        kwargs.setdefault('priority', priority)
+    ctx = multiprocessing.get_context(start_method)
+    parent_conn, child_conn = ctx.Pipe(duplex=True)
+    process = ctx.Process(target=_worker_main, args=(child_conn, name, factory, args, kwargs),
+                          name=f"atlas-{name}", daemon=True)
+    process.start()
+    child_conn.close()
+    remote = RemoteService(ipc, name, process, _Channel(parent_conn), priority)
+    remote.period = getattr(factory, 'period', None)
+    ipc.register(name, remote.deliver, priority=priority)
+    if ready_timeout and not remote.ready.wait(ready_timeout):
+        print(f"[TRANSPORT] Worker for '{name}' did not report ready in {ready_timeout}s")
+    print(f"[TRANSPORT] '{name}' running out-of-process (pid {process.pid})")
+    return remote
@@ -1,12 +1,28 @@
 """
 AtlasOS - Sistema Operacional Microkernel
 Missão: Exploração do cometa interestelar 3I/ATLAS
+
+Variáveis de ambiente:
+  ATLAS_IPC_TRACE     modo de tracing do IPC: console (padrão), off, sampled:N, ring[:N]
+  ATLAS_OOP_SERVICES  serviços que rodam em processos de trabalho, separados por
+                      vírgula (suportados: NPUDriver, CompositionAnalyzer)
+  ATLAS_SCHED_POLICY  política do escalonador: priority (padrão), rr, rm, edf
+  ATLAS_SCHED_WORKERS threads do escalonador (padrão 1; com 2 ou mais, P1 ganha worker dedicado)
+  ATLAS_RUNTIME       threads (padrão) ou asyncio: Scheduler, IPC e RecoveryAgent num event loop
+  ATLAS_STATE_URL     destino do snapshot do escalonador no servidor Node
+                      (padrão http://localhost:3001/api/kernel/state; off desliga)
 """
 
+import asyncio
+import os
+
 from kernel.scheduler import Scheduler, Process
 from kernel.ipc import IPC
 from kernel.mmu import MMU
 from kernel.irq import IRQHandler
+from kernel.transport import spawn_service
+from kernel.runtime import AsyncIPC, AsyncScheduler
+from kernel.export import StateExporter, DEFAULT_URL
 from services.recovery import RecoveryAgent
 from services.flight_control import FlightControl
 from services.navigation import NavigationAI
@@ -16,8 +32,8 @@ from apps.composition import CompositionAnalyzer
 from services.filesystem import FileSystem
 from drivers.propulsion import PropulsionDriver
 
-def boot_atlasOS():
-    """Sequência de boot do AtlasOS"""
+def boot_atlasOS(runtime: str = 'threads'):
+    """Sequência de boot do AtlasOS (runtime 'asyncio' exige um event loop rodando)"""
     print("=" * 60)
     print("🚀 AtlasOS v1.0 - Microkernel Boot Sequence")
     print("📡 Mission: 3I/ATLAS Interstellar Comet Exploration")
@@ -25,16 +41,39 @@ def boot_atlasOS():
     
     # Camada 1: Microkernel (Modo Kernel)
     print("\n[LAYER 1] Initializing Microkernel...")
-    scheduler = Scheduler()
-    ipc = IPC()
+    policy = os.environ.get('ATLAS_SCHED_POLICY', 'priority')
+    trace = os.environ.get('ATLAS_IPC_TRACE', 'console')
+    if runtime == 'asyncio':
+        scheduler = AsyncScheduler(policy=policy)
+        ipc = AsyncIPC(trace=trace)
+    else:
+        scheduler = Scheduler(policy=policy, workers=int(os.environ.get('ATLAS_SCHED_WORKERS', '1')))
+        ipc = IPC(trace=trace)
+    # servers answering IPC requests inherit the requester's priority
+    ipc.attach_scheduler(scheduler)
     mmu = MMU()
+    # region handles sent over IPC become MMU grants to the receiver
+    ipc.attach_mmu(mmu)
     irq_handler = IRQHandler()
     print("✅ Scheduler, IPC, MMU, IRQ loaded")
     
+    # Placement: in-process instance or worker process, same IPC contract
+    out_of_process = {n.strip() for n in os.environ.get('ATLAS_OOP_SERVICES', '').split(',') if n.strip()}
+    workers = {}
+
+    def place(name, factory, *args, priority):
+        if name not in out_of_process:
+            return factory(ipc, *args, priority=priority)
+        old = workers.pop(name, None)
+        if old is not None:
+            old.stop()
+        workers[name] = spawn_service(ipc, name, factory, *args, priority=priority)
+        return workers[name]
+
     # Camada 2: Serviços Essenciais (Modo Usuário)
     print("\n[LAYER 2] Starting Essential Services...")
     camera_driver = CameraDriver(ipc, irq_handler, priority=3)
-    npu_driver = NPUDriver(ipc, priority=3)
+    npu_driver = place('NPUDriver', NPUDriver, priority=3)
     # allocate MMU regions for services (example sizes)
     mmu.allocate('FlightControl', 0x1000)
     mmu.allocate('NavigationAI', 0x1000)
@@ -61,7 +100,9 @@ def boot_atlasOS():
     
     # Camada 4: Aplicações Científicas (Modo Usuário)
     print("\n[LAYER 4] Loading Scientific Applications...")
-    composition_analyzer = CompositionAnalyzer(ipc, npu_driver, priority=4)
+    # a worker process cannot hold a reference to an in-kernel driver object
+    composition_npu = None if 'CompositionAnalyzer' in out_of_process else npu_driver
+    composition_analyzer = place('CompositionAnalyzer', CompositionAnalyzer, composition_npu, priority=4)
     print("✅ Composition Analyzer (P4) loaded")
     
     print("\n" + "=" * 60)
@@ -83,26 +124,33 @@ def boot_atlasOS():
     flight_factory = lambda: FlightControl(ipc, priority=1)
     navigation_factory = lambda: NavigationAI(ipc, npu_driver, priority=2)
     camera_factory = lambda: CameraDriver(ipc, priority=3)
-    npu_factory = lambda: NPUDriver(ipc, priority=3)
+    npu_factory = lambda: place('NPUDriver', NPUDriver, priority=3)
     propulsion_factory = lambda: PropulsionDriver(ipc, priority=3)
-    composition_factory = lambda: CompositionAnalyzer(ipc, npu_driver, priority=4)
+    composition_factory = lambda: place('CompositionAnalyzer', CompositionAnalyzer, composition_npu, priority=4)
     filesystem_factory = lambda: FileSystem(ipc, mmu)
 
     def make_restart_hook(name, factory, priority):
         def hook():
             new_inst = factory()
             # Enfileira nova instância no escalonador
-            scheduler.add_process(Process(name, priority, new_inst.run))
+            scheduler.add_process(Process(name, priority, new_inst.run, getattr(new_inst, 'period', None)))
             print(f"[MAIN] Recovery hook: recreated and enqueued '{name}'")
         return hook
 
+    def make_reregister_hook(name, factory):
+        def hook():
+            # passive services have no body to schedule: the constructor re-registers them in the hub
+            factory()
+            print(f"[MAIN] Recovery hook: recreated and re-registered '{name}'")
+        return hook
+
     recovery_agent.register_restart_hook('FlightControl', make_restart_hook('FlightControl', flight_factory, 1))
     recovery_agent.register_restart_hook('NavigationAI', make_restart_hook('NavigationAI', navigation_factory, 2))
     recovery_agent.register_restart_hook('CameraDriver', make_restart_hook('CameraDriver', camera_factory, 3))
     recovery_agent.register_restart_hook('NPUDriver', make_restart_hook('NPUDriver', npu_factory, 3))
     recovery_agent.register_restart_hook('PropulsionDriver', make_restart_hook('PropulsionDriver', propulsion_factory, 3))
     recovery_agent.register_restart_hook('CompositionAnalyzer', make_restart_hook('CompositionAnalyzer', composition_factory, 4))
-    recovery_agent.register_restart_hook('FileSystem', make_restart_hook('FileSystem', filesystem_factory, 3))
+    recovery_agent.register_restart_hook('FileSystem', make_reregister_hook('FileSystem', filesystem_factory))
 
     # Register IRQ handlers to convert hardware IRQ -> IPC messages
     def irq_to_ipc_camera(data):
@@ -111,6 +159,8 @@ def boot_atlasOS():
     def irq_to_ipc_propulsion(data):
         ipc.send_message('IRQ', 'PropulsionDriver', data or {})
 
+    # hardware interrupts are delivered with critical priority
+    ipc.set_priority('IRQ', 1)
     irq_handler.register_irq(3, irq_to_ipc_camera, 'Camera')
     irq_handler.register_irq(5, irq_to_ipc_propulsion, 'Propulsores')
 
@@ -124,9 +174,22 @@ def boot_atlasOS():
         composition_analyzer # P4
     ])
 
+    # real scheduler accounting for the dashboard's /api/state
+    state_url = os.environ.get('ATLAS_STATE_URL', DEFAULT_URL)
+    if state_url != 'off':
+        StateExporter(scheduler, state_url).start()
+
     # Demo: FlightControl sends a burn command to PropulsionDriver via IPC
     print('\n>>> DEMO: FlightControl -> PropulsionDriver (burn)')
     ipc.send_message('FlightControl', 'PropulsionDriver', {'action': 'burn', 'duration': 500, 'thrust': 3.2})
 
+async def boot_atlasOS_async():
+    """Boot no runtime asyncio; o kernel vive enquanto o loop rodar"""
+    boot_atlasOS(runtime='asyncio')
+    await asyncio.Event().wait()
+
 if __name__ == "__main__":
-    boot_atlasOS()
+    if os.environ.get('ATLAS_RUNTIME', 'threads') == 'asyncio':
+        asyncio.run(boot_atlasOS_async())
+    else:
+        boot_atlasOS()
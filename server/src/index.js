@@ -30,6 +30,14 @@ let systemState = {
 
 const startTime = Date.now();
 
+// Last time the Python kernel pushed its scheduler snapshot (0 = never)
+let kernelStateAt = 0;
+const KERNEL_STATE_TTL_MS = 5000;
+
+function kernelLinked() {
+  return Date.now() - kernelStateAt < KERNEL_STATE_TTL_MS;
+}
+
 // ============ FUNÇÕES AUXILIARES ============
 function logEvent(message, type = "info") {
   const event = {
@@ -86,6 +94,8 @@ function captureImage() {
 }
 
 function simulateProcessActivity() {
+  // real cpu/deadline data from the kernel replaces the simulation while it keeps arriving
+  if (kernelLinked()) return;
   systemState.processes.forEach((proc) => {
     if (proc.status === "Running") {
       proc.cpu = Math.max(5, Math.min(50, proc.cpu + (Math.random() - 0.5) * 10));
@@ -215,6 +225,30 @@ app.get('/api/state', (req, res) => {
   res.json(systemState);
 });
 
+// Scheduler.snapshot() pushed by the Python kernel (kernel/export.py)
+app.post('/api/kernel/state', (req, res) => {
+  const { processes, totalCpu } = req.body || {};
+  if (!Array.isArray(processes)) {
+    return res.status(400).json({ error: "processes must be an array" });
+  }
+  const now = Date.now();
+  const known = new Map(systemState.processes.map((p) => [p.name, p]));
+  let nextPid = systemState.processes.reduce((max, p) => Math.max(max, p.pid || 0), 0) + 1;
+  systemState.processes = processes.map((p) => {
+    const previous = known.get(p.name);
+    return {
+      ...p,
+      pid: previous && previous.pid ? previous.pid : nextPid++,
+      startTime: previous && previous.startTime ? previous.startTime : now,
+      lastHeartbeat: now,
+    };
+  });
+  systemState.totalCpu = totalCpu ?? systemState.processes.reduce((sum, p) => sum + (p.cpu || 0), 0);
+  if (!kernelLinked()) logEvent("Kernel Python conectado: dados reais do escalonador", "success");
+  kernelStateAt = now;
+  res.json({ ok: true });
+});
+
 server.listen(PORT, () => {
   console.log(`🚀 AtlasOS Kernel Backend rodando em http://localhost:${PORT}`);
   console.log(`📡 WebSocket Server: ws://localhost:${PORT}`);
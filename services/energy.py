@@ -36,8 +36,8 @@ class EnergyManager:
                 print("[Energy] Budget low: issuing stop to PropulsionDriver")
                 # send stop command to PropulsionDriver
                 self.ipc.send_message('EnergyManager', 'PropulsionDriver', {'action': 'stop', 'reason': 'energy_budget'})
-                # optionally broadcast warning
-                self.ipc.broadcast('EnergyManager', {'type': 'energy_warning', 'budget': self.budget})
+                # notify services subscribed to 'energy_warning'
+                self.ipc.publish('EnergyManager', 'energy_warning', {'type': 'energy_warning', 'budget': self.budget})
 
     def get_budget(self):
         return self.budget
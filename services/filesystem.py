@@ -5,8 +5,13 @@ Recebe mensagens de `save` e armazena metadados em memória (stub).
 import os
 import json
 
+from kernel.buffers import BufferHandle
+from kernel.mmu import MemoryAccessError, RegionHandle
+
 DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
 METADATA_PATH = os.path.join(DATA_DIR, 'metadata.json')
+# a save that blocks on disk longer than this no longer stalls the sender
+HANDLER_BUDGET = 0.5
 
 
 class FileSystem:
@@ -14,7 +19,7 @@ class FileSystem:
         self.ipc = ipc
         self.mmu = mmu
         self.storage = []
-        ipc.register('FileSystem', self.receive_message)
+        ipc.register('FileSystem', self.receive_message, handler_budget=HANDLER_BUDGET)
         self._load()
         print('[SERVICE] FileSystem loaded (handles save requests to Flash)')
 
@@ -44,6 +49,17 @@ class FileSystem:
             print(f"[FileSystem] Error saving metadata: {e}")
 
     def receive_message(self, msg):
+        frame = (msg.data or {}).get('frame')
+        if isinstance(frame, BufferHandle):
+            # the hub made us the owner of the frame buffer: always release it
+            try:
+                self._handle(msg, frame)
+            finally:
+                self.ipc.release_buffer(frame, 'FileSystem')
+        else:
+            self._handle(msg, None)
+
+    def _handle(self, msg, frame):
         data = msg.data or {}
         action = data.get('action')
         if action == 'save':
@@ -63,12 +79,36 @@ class FileSystem:
                     return
 
             entry = {'filename': filename, 'type': ftype}
+            if frame is not None:
+                view = self.ipc.buffer_view(frame, 'FileSystem')
+                entry['bytes'] = len(view)
+                view.release()
+            region = data.get('region')
+            if isinstance(region, RegionHandle) and self.mmu is not None:
+                try:
+                    # our own mapping of the sender's region: the grant the hub made on delivery
+                    view = self.mmu.read('FileSystem', region.base, region.size)
+                except MemoryAccessError as e:
+                    print(f"[FileSystem] MMU: {e}")
+                    self.ipc.send_message('FileSystem', msg.sender, {'status': 'error', 'reason': 'access-violation'})
+                    return
+                try:
+                    entry['bytes'] = self._persist(filename, view)
+                finally:
+                    view.release()
             self.storage.append(entry)
             self._save()
             print(f"[FileSystem] Saved metadata: {entry}")
             # respond back to sender with ACK
             self.ipc.send_message('FileSystem', msg.sender, {'status': 'ok', 'filename': filename})
 
+    def _persist(self, filename: str, view: memoryview) -> int:
+        # written to Flash straight from the memoryview, without an intermediate bytes copy
+        frames_dir = os.path.join(DATA_DIR, 'frames')
+        os.makedirs(frames_dir, exist_ok=True)
+        with open(os.path.join(frames_dir, os.path.basename(filename)), 'wb') as f:
+            return f.write(view)
+
     def list_files(self):
         return list(self.storage)
 
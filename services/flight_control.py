@@ -4,6 +4,9 @@ Navegação e estabilização durante aproximação do cometa 3I/ATLAS
 """
 
 class FlightControl:
+    # release period (s) used by the Scheduler
+    period = 0.1
+
     def __init__(self, ipc, priority=1):
         self.ipc = ipc
         self.priority = priority
@@ -17,8 +20,8 @@ class FlightControl:
         print(f"   Distance to 3I/ATLAS: {self.distance_to_comet:,} km")
         print(f"   Status: Trajectory locked, thrusters nominal")
         
-        # Broadcast status via IPC
-        self.ipc.broadcast("FlightControl", {
+        # Publish status to subscribers of 'flight.status' only
+        self.ipc.publish("FlightControl", 'flight.status', {
             'distance': self.distance_to_comet,
             'status': 'stable'
         })
@@ -3,7 +3,13 @@ Navigation AI - Navegação com IA (P2 - Alta)
 Rastreamento da trajetória hiperbólica do cometa 3I/ATLAS
 """
 
+# deadline for an NPU trajectory request (seconds)
+NPU_TIMEOUT = 2.0
+
 class NavigationAI:
+    # release period (s) used by the Scheduler
+    period = 0.5
+
     def __init__(self, ipc, npu_driver, priority=2):
         self.ipc = ipc
         self.npu = npu_driver
@@ -15,17 +21,31 @@ class NavigationAI:
         """Rastreia trajetória do cometa usando NPU"""
         print("🧭 Navigation AI: Tracking 3I/ATLAS trajectory...")
         
-        # Solicita processamento via IPC
-        self.ipc.send_message(
+        # Solicita processamento via IPC (request/reply com prazo)
+        future = self.ipc.request(
             sender="NavigationAI",
             receiver="NPUDriver",
-            data={'action': 'process', 'task': 'trajectory_tracking'}
+            data={'action': 'process', 'task': 'trajectory_tracking'},
+            timeout=NPU_TIMEOUT
         )
+        future.add_done_callback(self._on_npu_reply)
         # heartbeat to recovery agent
         self.ipc.send_message('NavigationAI', 'RecoveryAgent', {'type': 'heartbeat'})
+        return future
     
+    def _on_npu_reply(self, future):
+        """Callback do Future do pedido ao NPU"""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            print(f"  → NPU request failed: {error}")
+            return
+        print(f"  → NPU Result: {future.result().data.get('result', {})}")
+
     def receive_message(self, msg):
         """Handler de mensagens IPC"""
+        # uncorrelated results (e.g. a reply that arrived after the deadline)
         if msg.sender == "NPUDriver":
             result = msg.data.get('result', {})
             print(f"  → NPU Result: {result}")
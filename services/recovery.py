@@ -11,13 +11,21 @@ class RecoveryAgent:
         self.ipc = ipc
         self.monitored_processes = {}
         self.restart_count = {}
+        # process_name -> handler faults reported by the IPC hub
+        self.fault_count = {}
         # hooks: process_name -> callable that will recreate/enqueue the process
         self.restart_hooks = {}
-        ipc.register("RecoveryAgent", self.receive_message)
+        ipc.register("RecoveryAgent", self.receive_message, batch_callback=self.receive_batch)
         print("[SERVICE] Recovery Agent active (Auto-healing enabled)")
-        # start background monitor thread
-        self._monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
-        self._monitor_thread.start()
+        # asyncio runtime: the monitor is a loop timer instead of a thread
+        self.loop = getattr(ipc, 'loop', None)
+        if self.loop is not None:
+            self._monitor_thread = None
+            self.loop.call_soon_threadsafe(self._monitor_tick)
+        else:
+            # start background monitor thread
+            self._monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
+            self._monitor_thread.start()
     
     def monitor(self, process_name: str):
         """Adiciona processo ao monitoramento"""
@@ -63,23 +71,61 @@ class RecoveryAgent:
         self.restart_hooks[process_name] = hook_callable
         print(f"  → Recovery Agent: restart hook registered for '{process_name}'")
 
+    def _scan(self):
+        """Varre processos monitorados e reinicia os que expiraram o heartbeat"""
+        for name in list(self.monitored_processes.keys()):
+            if self.detect_failure(name):
+                print(f"[Recovery] Detected failure for '{name}' (timeout)")
+                self.restart_process(name)
+                # reset last_heartbeat to avoid consecutive restarts
+                self.monitored_processes[name]['last_heartbeat'] = time.time()
+
     def _monitor_loop(self):
         """Thread que varre processos monitorados e reinicia os que expirarem heartbeats."""
         while True:
             try:
-                for name in list(self.monitored_processes.keys()):
-                    if self.detect_failure(name):
-                        print(f"[Recovery] Detected failure for '{name}' (timeout)")
-                        self.restart_process(name)
-                        # reset last_heartbeat to avoid consecutive restarts
-                        self.monitored_processes[name]['last_heartbeat'] = time.time()
+                self._scan()
                 time.sleep(1.0)
             except Exception as e:
                 print(f"[Recovery] Monitor loop error: {e}")
+
+    def _monitor_tick(self):
+        """Timer do event loop (runtime asyncio): uma varredura por segundo"""
+        try:
+            self._scan()
+        except Exception as e:
+            print(f"[Recovery] Monitor loop error: {e}")
+        self.loop.call_later(1.0, self._monitor_tick)
     
     def receive_message(self, msg):
         """Handler de mensagens IPC"""
-        if msg.data.get('type') == 'heartbeat':
+        msg_type = msg.data.get('type')
+        if msg_type == 'heartbeat':
             process = msg.sender
             if process in self.monitored_processes:
                 self.monitored_processes[process]['last_heartbeat'] = time.time()
+        elif msg_type == 'handler_fault':
+            self.handle_fault(msg.data)
+
+    def handle_fault(self, fault: dict):
+        """Processo em quarentena no hub IPC: reinicia se houver hook, senão só registra"""
+        process = fault.get('process')
+        self.fault_count[process] = self.fault_count.get(process, 0) + 1
+        print(f"[Recovery] '{process}' quarantined by IPC ({fault.get('reason')}: {fault.get('detail')})")
+        if process in self.monitored_processes:
+            self.monitored_processes[process]['status'] = 'quarantined'
+        if process in self.restart_hooks:
+            self.restart_process(process)
+            if process in self.monitored_processes:
+                self.monitored_processes[process]['status'] = 'running'
+
+    def receive_batch(self, msgs):
+        """Handler de lotes IPC: processa vários heartbeats com um único relógio"""
+        now = time.time()
+        for msg in msgs:
+            if msg.data.get('type') == 'heartbeat':
+                entry = self.monitored_processes.get(msg.sender)
+                if entry is not None:
+                    entry['last_heartbeat'] = now
+            else:
+                self.receive_message(msg)
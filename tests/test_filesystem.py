@@ -1,9 +1,11 @@
 import os
+import tempfile
 import time
 import unittest
+from unittest import mock
 
 from kernel.ipc import IPC
-from kernel.mmu import MMU
+from kernel.mmu import MMU, READ
 from drivers.camera import CameraDriver
 from services.filesystem import FileSystem
 
@@ -31,5 +33,57 @@ class FileSystemIntegrationTest(unittest.TestCase):
         files = self.fs.list_files()
         self.assertTrue(any(f['filename'] == filename for f in files))
 
+class ZeroCopyFrameTest(unittest.TestCase):
+    def test_frame_buffer_handed_to_filesystem_and_released(self):
+        ipc = IPC(trace='off')
+        mmu = MMU()
+        mmu.allocate('CameraDriver', 0x0800)
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch('services.filesystem.DATA_DIR', tmp), \
+                mock.patch('services.filesystem.METADATA_PATH', os.path.join(tmp, 'metadata.json')):
+            fs = FileSystem(ipc, mmu)
+            cam = CameraDriver(ipc, frame_bytes=4096)
+            filename = cam.capture_image()
+            entry = [f for f in fs.list_files() if f['filename'] == filename][0]
+        self.assertEqual(entry['bytes'], 4096)
+        # FileSystem owned the buffer after delivery and released it
+        self.assertEqual(len(ipc.buffers), 0)
+
+    def test_frame_persisted_from_camera_region(self):
+        ipc = IPC(trace='off')
+        mmu = MMU(backing='bytearray')
+        ipc.attach_mmu(mmu)
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch('services.filesystem.DATA_DIR', tmp), \
+                mock.patch('services.filesystem.METADATA_PATH', os.path.join(tmp, 'metadata.json')):
+            fs = FileSystem(ipc, mmu)
+            cam = CameraDriver(ipc, frame_bytes=2048, mmu=mmu)
+            filename = cam.capture_image()
+            entry = [f for f in fs.list_files() if f['filename'] == filename][0]
+            with open(os.path.join(tmp, 'frames', filename), 'rb') as f:
+                frame = f.read()
+        self.assertEqual(entry['bytes'], 2048)
+        self.assertEqual(frame, mmu.read('CameraDriver', cam.frame_addr, 2048).tobytes())
+        self.assertTrue(frame.startswith(b'ATLAS-FRAME ' + filename.encode()))
+        # no IPC buffer was needed
+        self.assertEqual(len(ipc.buffers), 0)
+        # FileSystem read through its own read-only grant of the camera region
+        self.assertEqual(mmu.spaces['FileSystem'].regions[cam.frame_addr]['perms'], READ)
+
+    def test_region_without_grant_is_denied(self):
+        # without attach_mmu the hub grants nothing: the sender's mapping is not ours to read
+        ipc = IPC(trace='off')
+        mmu = MMU(backing='bytearray')
+        replies = []
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch('services.filesystem.DATA_DIR', tmp), \
+                mock.patch('services.filesystem.METADATA_PATH', os.path.join(tmp, 'metadata.json')):
+            fs = FileSystem(ipc, mmu)
+            cam = CameraDriver(ipc, frame_bytes=2048, mmu=mmu)
+            ipc.register('CameraDriver', lambda msg: replies.append(msg.data))
+            cam.capture_image()
+            self.assertEqual(fs.list_files(), [])
+        self.assertIn({'status': 'error', 'reason': 'access-violation'}, replies)
+
 if __name__ == '__main__':
     unittest.main()
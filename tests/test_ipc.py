@@ -0,0 +1,718 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from kernel.ipc import IPC, Message, MailboxFullError, DROP_OLDEST, DROP_NEWEST, REJECT, DEFAULT_PRIORITY
+from kernel.trace import RingBufferTracer, SampledTracer
+from kernel.buffers import BufferOwnershipError
+from kernel.metrics import Histogram
+from kernel.scheduler import Scheduler, Process
+from drivers.npu import NPUDriver
+from services.navigation import NavigationAI
+
+
+class AsyncMailboxTest(unittest.TestCase):
+    def setUp(self):
+        self.ipc = IPC(async_mode=True, mailbox_capacity=2)
+        self.release = threading.Event()
+        self.received = []
+
+    def tearDown(self):
+        self.release.set()
+        self.ipc.shutdown()
+
+    def slow_handler(self, msg):
+        self.release.wait(2)
+        self.received.append(msg.data['n'])
+
+    def fill(self, count):
+        # first message is picked up by the dispatcher and blocks in the handler
+        self.ipc.send_message('Tester', 'Slow', {'n': 0})
+        time.sleep(0.05)
+        return [self.ipc.send_message('Tester', 'Slow', {'n': i}) for i in range(1, count + 1)]
+
+    def test_sender_does_not_run_receiver_handler(self):
+        self.ipc.register('Slow', self.slow_handler)
+        start = time.monotonic()
+        self.ipc.send_message('Tester', 'Slow', {'n': 0})
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.release.set()
+        self.assertTrue(self.ipc.flush(2))
+        self.assertEqual(self.received, [0])
+
+    def test_drop_oldest_keeps_newest(self):
+        self.ipc.register('Slow', self.slow_handler, backpressure=DROP_OLDEST)
+        self.fill(4)
+        self.assertEqual(self.ipc.queue_depth('Slow'), 2)
+        self.release.set()
+        self.ipc.flush(2)
+        self.assertEqual(self.received, [0, 3, 4])
+        self.assertEqual(self.ipc.mailboxes['Slow'].dropped, 2)
+
+    def test_drop_newest_reports_drop(self):
+        self.ipc.register('Slow', self.slow_handler, backpressure=DROP_NEWEST)
+        self.assertEqual(self.fill(3), [True, True, False])
+        self.release.set()
+        self.ipc.flush(2)
+        self.assertEqual(self.received, [0, 1, 2])
+
+    def test_reject_raises(self):
+        self.ipc.register('Slow', self.slow_handler, backpressure=REJECT)
+        self.fill(2)
+        with self.assertRaises(MailboxFullError):
+            self.ipc.send_message('Tester', 'Slow', {'n': 3})
+
+    def test_block_waits_for_space(self):
+        ipc = IPC(async_mode=True, mailbox_capacity=1, block_timeout=0.1)
+        ipc.register('Slow', self.slow_handler)
+        ipc.send_message('Tester', 'Slow', {'n': 0})
+        time.sleep(0.05)
+        self.assertTrue(ipc.send_message('Tester', 'Slow', {'n': 1}))
+        start = time.monotonic()
+        self.assertFalse(ipc.send_message('Tester', 'Slow', {'n': 2}))
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+        self.release.set()
+        ipc.flush(2)
+        ipc.shutdown()
+
+
+class PriorityDispatchTest(unittest.TestCase):
+    def run_ordering(self, aging_step, wait_between):
+        ipc = IPC(async_mode=True, trace='off', aging_step=aging_step)
+        release = threading.Event()
+        order = []
+
+        def handler(msg):
+            release.wait(2)
+            order.append(msg.data['tag'])
+
+        ipc.register('RecoveryAgent', handler, priority=4)
+        ipc.set_priority('FlightControl', 1)
+        ipc.set_priority('CompositionAnalyzer', 4)
+        ipc.send_message('CompositionAnalyzer', 'RecoveryAgent', {'tag': 'busy'})
+        time.sleep(0.05)
+        ipc.send_message('CompositionAnalyzer', 'RecoveryAgent', {'tag': 'bulk'})
+        time.sleep(wait_between)
+        ipc.send_message('FlightControl', 'RecoveryAgent', {'tag': 'critical'})
+        release.set()
+        ipc.flush(2)
+        ipc.shutdown()
+        return order
+
+    def test_p1_overtakes_pending_bulk(self):
+        self.assertEqual(self.run_ordering(1.0, 0), ['busy', 'critical', 'bulk'])
+
+    def test_aging_lets_old_bulk_through(self):
+        self.assertEqual(self.run_ordering(0.001, 0.05), ['busy', 'bulk', 'critical'])
+
+    def test_sender_class_orders_traffic_to_critical_receiver(self):
+        ipc = IPC(async_mode=True, trace='off', aging_step=1.0)
+        release = threading.Event()
+        order = []
+        ipc.register('FlightControl', lambda msg: (release.wait(2), order.append(msg.data['tag'])), priority=1)
+        ipc.set_priority('IRQ', 1)
+        ipc.set_priority('CompositionAnalyzer', 4)
+        ipc.send_message('CompositionAnalyzer', 'FlightControl', {'tag': 'busy'})
+        time.sleep(0.05)
+        ipc.send_message('CompositionAnalyzer', 'FlightControl', {'tag': 'bulk'})
+        ipc.send_message('IRQ', 'FlightControl', {'tag': 'critical'})
+        release.set()
+        ipc.flush(2)
+        ipc.shutdown()
+        self.assertEqual(order, ['busy', 'critical', 'bulk'])
+
+    def test_drop_oldest_evicts_least_urgent(self):
+        ipc = IPC(async_mode=True, mailbox_capacity=2, backpressure=DROP_OLDEST, trace='off')
+        release = threading.Event()
+        order = []
+        ipc.register('Sink', lambda msg: (release.wait(2), order.append(msg.data['tag'])))
+        ipc.set_priority('FlightControl', 1)
+        ipc.send_message('Tester', 'Sink', {'tag': 'busy'})
+        time.sleep(0.05)
+        ipc.send_message('FlightControl', 'Sink', {'tag': 'p1'})
+        ipc.send_message('Tester', 'Sink', {'tag': 'p4-a'})
+        ipc.send_message('Tester', 'Sink', {'tag': 'p4-b'})
+        release.set()
+        ipc.flush(2)
+        ipc.shutdown()
+        self.assertEqual(order, ['busy', 'p1', 'p4-b'])
+
+    def test_drop_oldest_drops_less_critical_arrival(self):
+        ipc = IPC(async_mode=True, mailbox_capacity=1, backpressure=DROP_OLDEST, trace='off')
+        release = threading.Event()
+        order = []
+        ipc.register('Sink', lambda msg: (release.wait(2), order.append(msg.data['tag'])))
+        ipc.set_priority('FlightControl', 1)
+        ipc.set_priority('App', 4)
+        ipc.send_message('Tester', 'Sink', {'tag': 'busy'})
+        time.sleep(0.05)
+        self.assertTrue(ipc.send_message('FlightControl', 'Sink', {'tag': 'p1'}))
+        # a P4 arrival meeting a full P1 queue is the one dropped
+        self.assertFalse(ipc.send_message('App', 'Sink', {'tag': 'p4'}))
+        release.set()
+        ipc.flush(2)
+        ipc.shutdown()
+        self.assertEqual(order, ['busy', 'p1'])
+
+
+class BatchSendTest(unittest.TestCase):
+    def test_send_many_groups_by_receiver(self):
+        ipc = IPC(trace='off')
+        batches, singles = [], []
+        ipc.register('RecoveryAgent', singles.append, batch_callback=batches.append)
+        ipc.register('EnergyManager', singles.append)
+        sent = ipc.send_many('PropulsionDriver', [
+            ('RecoveryAgent', {'type': 'heartbeat'}),
+            ('EnergyManager', {'telemetry': {'thrust': 1.0}}),
+            ('RecoveryAgent', {'telemetry': {'thrust': 1.0}}),
+            ('Tester', {'status': 'ack'}),
+        ])
+        self.assertEqual(sent, 4)
+        self.assertEqual(len(batches), 1)
+        self.assertEqual([m.data for m in batches[0]], [{'type': 'heartbeat'}, {'telemetry': {'thrust': 1.0}}])
+        self.assertEqual([m.receiver for m in singles], ['EnergyManager'])
+        self.assertEqual([m.receiver for m in ipc.message_queue], ['Tester'])
+
+    def test_async_batch_receiver_drains_pending(self):
+        ipc = IPC(async_mode=True, trace='off')
+        release = threading.Event()
+        batches = []
+
+        def on_batch(msgs):
+            release.wait(2)
+            batches.append([m.data['n'] for m in msgs])
+
+        ipc.register('Sink', lambda msg: None, batch_callback=on_batch)
+        ipc.send_message('Tester', 'Sink', {'n': 0})
+        time.sleep(0.05)
+        ipc.send_many('Tester', [('Sink', {'n': n}) for n in range(1, 4)])
+        release.set()
+        ipc.flush(2)
+        ipc.shutdown()
+        self.assertEqual(batches, [[0], [1, 2, 3]])
+
+    def test_full_receiver_does_not_cancel_other_groups(self):
+        ipc = IPC(async_mode=True, mailbox_capacity=1, trace='off')
+        release = threading.Event()
+        received = []
+        ipc.register('Full', lambda msg: release.wait(2), backpressure=REJECT)
+        ipc.register('Sink', received.append)
+        ipc.send_message('Tester', 'Full', {})
+        time.sleep(0.05)
+        ipc.send_message('Tester', 'Full', {})
+        refused = ipc.alloc_buffer('CameraDriver', 16)
+        frame = ipc.alloc_buffer('CameraDriver', 16)
+        sent = ipc.send_many('CameraDriver', [('Full', {'frame': refused}), ('Sink', {'frame': frame})])
+        self.assertEqual(sent, 1)
+        self.assertEqual(ipc.buffers.owner_of(refused), 'CameraDriver')
+        self.assertEqual(ipc.buffers.owner_of(frame), 'Sink')
+        release.set()
+        ipc.flush(2)
+        self.assertEqual(len(received), 1)
+        ipc.shutdown()
+
+
+class ZeroCopyBufferTest(unittest.TestCase):
+    def setUp(self):
+        self.ipc = IPC(trace='off')
+        self.views = []
+        self.ipc.register('NPUDriver', self.on_tensor)
+
+    def tearDown(self):
+        self.ipc.shutdown()
+
+    def on_tensor(self, msg):
+        handle = msg.data['tensor']
+        view = self.ipc.buffer_view(handle, 'NPUDriver')
+        self.views.append(bytes(view[:4]))
+        view.release()
+        self.ipc.release_buffer(handle, 'NPUDriver')
+
+    def test_ownership_moves_with_message(self):
+        handle = self.ipc.alloc_buffer('CameraDriver', 64)
+        self.ipc.buffers.write(handle, 'CameraDriver', b'\x01\x02\x03\x04')
+        self.ipc.send_message('CameraDriver', 'NPUDriver', {'tensor': handle})
+        self.assertEqual(self.views, [b'\x01\x02\x03\x04'])
+        self.assertEqual(len(self.ipc.buffers), 0)
+        with self.assertRaises(BufferOwnershipError):
+            self.ipc.buffer_view(handle, 'CameraDriver')
+
+    def test_only_owner_can_send_or_read(self):
+        handle = self.ipc.alloc_buffer('CameraDriver', 16)
+        with self.assertRaises(BufferOwnershipError):
+            self.ipc.buffer_view(handle, 'NPUDriver')
+        with self.assertRaises(BufferOwnershipError):
+            self.ipc.send_message('NavigationAI', 'NPUDriver', {'tensor': handle})
+        with self.assertRaises(BufferOwnershipError):
+            self.ipc.broadcast('CameraDriver', {'tensor': handle})
+        self.ipc.release_buffer(handle, 'CameraDriver')
+
+    def test_refused_message_returns_ownership_to_sender(self):
+        release = threading.Event()
+        for policy in (DROP_NEWEST, DROP_OLDEST, REJECT):
+            ipc = IPC(async_mode=True, mailbox_capacity=1, backpressure=policy, trace='off')
+            ipc.register('Slow', lambda msg: release.wait(2))
+            ipc.send_message('Tester', 'Slow', {})
+            time.sleep(0.05)
+            queued = ipc.alloc_buffer('CameraDriver', 16)
+            ipc.send_message('CameraDriver', 'Slow', {'tensor': queued})
+            refused = ipc.alloc_buffer('NPUDriver', 16)
+            if policy == REJECT:
+                with self.assertRaises(MailboxFullError):
+                    ipc.send_message('NPUDriver', 'Slow', {'tensor': refused})
+            else:
+                ipc.send_message('NPUDriver', 'Slow', {'tensor': refused})
+            # drop_oldest evicts the queued frame; the others refuse the new one
+            if policy == DROP_OLDEST:
+                self.assertEqual(ipc.buffers.owner_of(queued), 'CameraDriver')
+                self.assertEqual(ipc.buffers.owner_of(refused), 'Slow')
+            else:
+                self.assertEqual(ipc.buffers.owner_of(queued), 'Slow')
+                self.assertEqual(ipc.buffers.owner_of(refused), 'NPUDriver')
+            release.set()
+            ipc.shutdown()
+            release.clear()
+
+
+class DeadLetterTest(unittest.TestCase):
+    def test_per_receiver_cap_and_ttl(self):
+        ipc = IPC(trace='off', dead_letter_cap=3, dead_letter_ttl=0.05)
+        for n in range(5):
+            ipc.send_message('Tester', 'CameraDriver', {'n': n})
+        ipc.send_message('Tester', 'NPUDriver', {'n': 0})
+        self.assertEqual([m.data['n'] for m in ipc.dead_letters.messages('CameraDriver')], [2, 3, 4])
+        self.assertEqual(ipc.dead_letters.evicted_cap, 2)
+        time.sleep(0.1)
+        self.assertEqual(ipc.message_queue, [])
+        self.assertEqual(ipc.dead_letters.expired, 4)
+
+    def test_discarded_dead_letters_release_their_buffers(self):
+        ipc = IPC(trace='off', dead_letter_cap=1, dead_letter_ttl=0.05)
+        frames = [ipc.alloc_buffer('CameraDriver', 16) for _ in range(3)]
+        for frame in frames:
+            ipc.send_message('CameraDriver', 'NPUDriver', {'tensor': frame})
+        # the two evicted frames are freed; the retained one waits for the receiver
+        self.assertEqual(len(ipc.buffers), 1)
+        self.assertEqual(ipc.buffers.owner_of(frames[2]), 'NPUDriver')
+        time.sleep(0.1)
+        self.assertEqual(ipc.message_queue, [])
+        self.assertEqual(len(ipc.buffers), 0)
+        ipc.shutdown()
+
+    def test_replay_on_reregistration_in_order(self):
+        ipc = IPC(trace='off', replay_rate=500)
+        for n in range(5):
+            ipc.send_message('Tester', 'CameraDriver', {'n': n})
+        received = []
+        done = threading.Event()
+
+        def handler(msg):
+            received.append(msg.data['n'])
+            if len(received) == 7:
+                done.set()
+
+        ipc.register('CameraDriver', handler)
+        # sent while the replay is running: must arrive after the retained ones
+        ipc.send_message('Tester', 'CameraDriver', {'n': 5})
+        ipc.send_message('Tester', 'CameraDriver', {'n': 6})
+        self.assertTrue(done.wait(2))
+        self.assertEqual(received, list(range(7)))
+        self.assertEqual(len(ipc.dead_letters), 0)
+
+    def test_replay_is_rate_limited(self):
+        ipc = IPC(trace='off', replay_rate=50)
+        for n in range(5):
+            ipc.send_message('Tester', 'CameraDriver', {'n': n})
+        received = []
+        ipc.register('CameraDriver', received.append)
+        time.sleep(0.05)
+        self.assertLess(len(received), 5)
+        time.sleep(0.2)
+        self.assertEqual(len(received), 5)
+
+
+class FaultIsolationTest(unittest.TestCase):
+    def test_handler_exception_does_not_reach_sender(self):
+        ipc = IPC(trace='off')
+
+        def broken(msg):
+            raise RuntimeError('disk on fire')
+
+        ipc.register('FileSystem', broken)
+        self.assertTrue(ipc.send_message('CameraDriver', 'FileSystem', {'action': 'save'}))
+        # a failing request fails its caller immediately instead of at the deadline
+        future = ipc.request('NavigationAI', 'FileSystem', {}, timeout=5)
+        with self.assertRaises(RuntimeError):
+            future.result(1)
+        self.assertEqual(ipc.handler_faults()['FileSystem']['error'], 2)
+
+    def test_slow_sync_handler_is_bounded_then_quarantined(self):
+        ipc = IPC(trace='off', fault_threshold=2, quarantine_period=60)
+        hang = threading.Event()
+        faults = []
+        ipc.register('RecoveryAgent', lambda msg: faults.append(msg.data))
+        ipc.register('FileSystem', lambda msg: hang.wait(2), handler_budget=0.05)
+        started = time.monotonic()
+        for _ in range(3):
+            ipc.send_message('CameraDriver', 'FileSystem', {'action': 'save'})
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertTrue(ipc.handler_faults()['FileSystem']['quarantined'])
+        # the fault is reported off the sender's thread
+        deadline = time.monotonic() + 2
+        while not faults and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual([f['process'] for f in faults], ['FileSystem'])
+        self.assertEqual(faults[0]['reason'], 'timeout')
+        # traffic during the quarantine is retained, then replayed on re-registration
+        self.assertEqual(len(ipc.dead_letters.messages('FileSystem')), 1)
+        hang.set()
+        received = []
+        ipc.register('FileSystem', received.append)
+        deadline = time.monotonic() + 2
+        while not received and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(received), 1)
+        self.assertFalse(ipc.handler_faults()['FileSystem']['quarantined'])
+        ipc.shutdown()
+
+    def test_handler_that_always_finishes_late_is_quarantined(self):
+        # sync: each sender gives up after the budget; the late finish must not reset the count
+        ipc = IPC(trace='off', fault_threshold=3, quarantine_period=60)
+        ipc.register('FileSystem', lambda msg: time.sleep(0.12), handler_budget=0.05)
+        for _ in range(3):
+            ipc.send_message('CameraDriver', 'FileSystem', {'action': 'save'})
+            time.sleep(0.1)
+        faults = ipc.handler_faults()['FileSystem']
+        self.assertTrue(faults['quarantined'])
+        self.assertEqual(faults['timeout'], 3)
+        ipc.shutdown()
+
+        # async: a stall noticed by the next send is followed by a late finish
+        ipc = IPC(async_mode=True, trace='off', fault_threshold=3, quarantine_period=60)
+        ipc.register('FileSystem', lambda msg: time.sleep(0.12), handler_budget=0.05)
+        for _ in range(2):
+            ipc.send_message('CameraDriver', 'FileSystem', {'action': 'save'})
+            time.sleep(0.08)
+            ipc.send_message('CameraDriver', 'FileSystem', {'action': 'save'})
+            ipc.flush(2)
+        self.assertTrue(ipc.handler_faults()['FileSystem']['quarantined'])
+        ipc.shutdown()
+
+    def test_stalled_mailbox_is_quarantined_and_released(self):
+        ipc = IPC(async_mode=True, mailbox_capacity=1, trace='off', fault_threshold=1, quarantine_period=0.2)
+        hang = threading.Event()
+        received = []
+
+        def handler(msg):
+            received.append(msg.data['n'])
+            hang.wait(2)
+
+        ipc.register('FileSystem', handler, handler_budget=0.05)
+        ipc.send_message('CameraDriver', 'FileSystem', {'n': 1})
+        ipc.send_message('CameraDriver', 'FileSystem', {'n': 2})
+        time.sleep(0.1)
+        # the stall is noticed on the next send; a full 'block' mailbox no longer blocks the sender
+        started = time.monotonic()
+        for n in range(3, 6):
+            ipc.send_message('CameraDriver', 'FileSystem', {'n': n})
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(ipc.handler_faults()['FileSystem']['timeout'], 1)
+        hang.set()
+        time.sleep(0.25)
+        ipc.send_message('CameraDriver', 'FileSystem', {'n': 6})
+        ipc.flush(2)
+        deadline = time.monotonic() + 2
+        while len(received) < 6 and time.monotonic() < deadline:
+            time.sleep(0.01)
+            ipc.flush(1)
+        self.assertEqual(received, [1, 2, 3, 4, 5, 6])
+        ipc.shutdown()
+
+
+class MetricsTest(unittest.TestCase):
+    def test_histogram_relative_error_is_bounded(self):
+        hist = Histogram()
+        for value in range(1, 10001):
+            hist.record(value)
+        self.assertEqual(hist.count, 10000)
+        for p, exact in ((50, 5000), (90, 9000), (99, 9900)):
+            self.assertLessEqual(abs(hist.percentile(p) - exact) / exact, 0.125)
+        self.assertEqual(hist.buckets()[-1][1], 10000)
+
+    def test_histogram_buckets_split_each_octave(self):
+        hist = Histogram()
+        values = list(range(1024, 2048)) + [0, 1, 15, 16, 17, 999, 65535, 10 ** 6, 10 ** 9 + 7]
+        for value in values:
+            bound = hist.upper_bound(hist._key(value))
+            self.assertGreaterEqual(bound, value)
+            self.assertLess(bound - value, max(1, value) / 8)
+        self.assertEqual(len({hist._key(v) for v in range(1024, 2048)}), 8)
+        # keys are monotonic, so buckets stay ordered
+        keys = [hist._key(v) for v in range(5000)]
+        self.assertEqual(keys, sorted(keys))
+
+    def test_route_counters_and_handler_histograms(self):
+        ipc = IPC(trace='off')
+        ipc.register('RecoveryAgent', lambda msg: None)
+        for _ in range(3):
+            ipc.send_message('FlightControl', 'RecoveryAgent', {'type': 'heartbeat'})
+        ipc.send_message('CameraDriver', 'RecoveryAgent', {'type': 'heartbeat'})
+        ipc.send_message('CameraDriver', 'FileSystem', {'action': 'save'})
+        snap = ipc.metrics_snapshot()
+        self.assertEqual(snap['routes']['FlightControl->RecoveryAgent']['messages'], 3)
+        self.assertGreater(snap['routes']['FlightControl->RecoveryAgent']['bytes'], 0)
+        self.assertEqual(snap['handler_ns']['RecoveryAgent']['count'], 4)
+        self.assertEqual(snap['dead_letters'], {'FileSystem': 1})
+        self.assertEqual(ipc.metrics.hot_routes(1), [(('FlightControl', 'RecoveryAgent'), 3)])
+        text = ipc.metrics_text()
+        self.assertIn('atlas_ipc_messages_total{sender="FlightControl",receiver="RecoveryAgent"} 3', text)
+        self.assertIn('atlas_ipc_handler_seconds_count{receiver="RecoveryAgent"} 4', text)
+
+    def test_async_queue_depth_gauge(self):
+        ipc = IPC(async_mode=True, trace='off')
+        release = threading.Event()
+        ipc.register('Slow', lambda msg: release.wait(2))
+        for _ in range(3):
+            ipc.send_message('Tester', 'Slow', {})
+        time.sleep(0.05)
+        self.assertEqual(ipc.metrics_snapshot()['queue_depth'], {'Slow': 2})
+        release.set()
+        ipc.flush(2)
+        self.assertEqual(ipc.metrics_snapshot()['handler_ns']['Slow']['count'], 3)
+        ipc.shutdown()
+
+
+class TracingTest(unittest.TestCase):
+    def test_ring_buffer_keeps_last_records(self):
+        tracer = RingBufferTracer(capacity=3)
+        ipc = IPC(trace=tracer)
+        ipc.register('Sink', lambda msg: None)
+        for _ in range(5):
+            ipc.send_message('Tester', 'Sink', {'type': 'heartbeat'})
+        ipc.broadcast('Tester', {'status': 'stable'})
+        records = tracer.records()
+        self.assertEqual(len(records), 3)
+        self.assertEqual([r[1] for r in records], ['send', 'send', 'broadcast'])
+        self.assertEqual(records[0][2:], ('Tester', 'Sink'))
+        self.assertLessEqual(records[0][0], records[-1][0])
+
+    def test_sampled_forwards_one_in_n(self):
+        inner = RingBufferTracer()
+        ipc = IPC(trace=SampledTracer(4, inner))
+        for i in range(10):
+            ipc.send_message('Tester', 'Nobody', {'n': i})
+        self.assertEqual(len(inner), 3)
+
+    def test_off_skips_formatting(self):
+        class Loud:
+            def __repr__(self):
+                raise AssertionError("payload formatted while tracing is off")
+        ipc = IPC(trace='off')
+        ipc.register('Sink', lambda msg: None)
+        ipc.send_message('Tester', 'Sink', {'obj': Loud()})
+        ipc.broadcast('Tester', {'obj': Loud()})
+
+
+class PublishSubscribeTest(unittest.TestCase):
+    def setUp(self):
+        self.ipc = IPC(trace='off')
+        self.inbox = {}
+        for name in ('FlightControl', 'NavigationAI', 'CameraDriver', 'PropulsionDriver'):
+            self.inbox[name] = []
+            self.ipc.register(name, self.inbox[name].append)
+
+    def test_only_subscribers_receive(self):
+        self.ipc.subscribe('NavigationAI', 'flight.status')
+        self.ipc.subscribe('PropulsionDriver', 'flight.status')
+        delivered = self.ipc.publish('FlightControl', 'flight.status', {'distance': 150000, 'status': 'stable'})
+        self.assertEqual(delivered, 2)
+        self.assertEqual(self.inbox['CameraDriver'], [])
+        self.assertEqual(self.inbox['FlightControl'], [])
+        nav_msg = self.inbox['NavigationAI'][0]
+        # subscribers share one message and one read-only payload
+        self.assertIs(nav_msg, self.inbox['PropulsionDriver'][0])
+        self.assertEqual(nav_msg.receiver, 'flight.status')
+        with self.assertRaises(TypeError):
+            nav_msg.data['status'] = 'tampered'
+
+    def test_publish_without_subscribers_and_unsubscribe(self):
+        self.assertEqual(self.ipc.publish('EnergyManager', 'energy_warning', {'budget': 1.0}), 0)
+        self.ipc.subscribe('CameraDriver', 'energy_warning')
+        self.ipc.unsubscribe('CameraDriver')
+        self.assertEqual(self.ipc.subscribers('energy_warning'), ())
+        self.assertEqual(self.ipc.publish('EnergyManager', 'energy_warning', {'budget': 1.0}), 0)
+
+
+class MessageEnvelopeTest(unittest.TestCase):
+    def test_message_has_no_instance_dict(self):
+        msg = Message('A', 'B', {})
+        self.assertFalse(hasattr(msg, '__dict__'))
+        with self.assertRaises(AttributeError):
+            msg.extra = 1
+
+    def test_envelope_metadata(self):
+        ipc = IPC(trace='off')
+        inbox = []
+
+        class Service:
+            priority = 1
+
+            def receive_message(self, msg):
+                pass
+
+        ipc.register('FlightControl', Service().receive_message)
+        ipc.register('Sink', inbox.append)
+        ipc.send_message('FlightControl', 'Sink', {'n': 1})
+        ipc.send_message('Tester', 'Sink', {'n': 2}, correlation_id='req-7')
+        first, second = inbox
+        self.assertLess(first.seq, second.seq)
+        self.assertLessEqual(first.timestamp_ns, second.timestamp_ns)
+        self.assertEqual(first.priority, 1)
+        self.assertEqual(second.priority, DEFAULT_PRIORITY)
+        self.assertIsNone(first.correlation_id)
+        self.assertEqual(second.correlation_id, 'req-7')
+
+
+class RequestReplyTest(unittest.TestCase):
+    def test_navigation_request_resolved_by_npu(self):
+        ipc = IPC(trace='off')
+        npu = NPUDriver(ipc)
+        nav = NavigationAI(ipc, npu)
+        future = nav.track_comet()
+        reply = future.result(timeout=1)
+        self.assertEqual(reply.sender, 'NPUDriver')
+        self.assertEqual(reply.data['result']['trajectory'], 'hyperbolic')
+        self.assertEqual(ipc.pending_requests(), 0)
+
+    def test_concurrent_requests_are_matched(self):
+        ipc = IPC(async_mode=True, trace='off')
+
+        def echo(msg):
+            # answer in reverse order of arrival to prove correlation, not order
+            time.sleep(0.05 * (3 - msg.data['n']))
+            ipc.reply(msg, {'n': msg.data['n']})
+
+        ipc.register('Worker', lambda msg: threading.Thread(target=echo, args=(msg,)).start())
+        futures = [ipc.request('Tester', 'Worker', {'n': n}, timeout=2) for n in range(3)]
+        self.assertEqual([f.result(timeout=2).data['n'] for f in futures], [0, 1, 2])
+        ipc.shutdown()
+
+    def test_deadline_expires(self):
+        ipc = IPC(trace='off')
+        ipc.register('Mute', lambda msg: None)
+        future = ipc.request('Tester', 'Mute', {}, timeout=0.05)
+        with self.assertRaises(TimeoutError):
+            future.result(timeout=1)
+        self.assertEqual(ipc.pending_requests(), 0)
+
+    def test_request_async(self):
+        ipc = IPC(trace='off')
+        ipc.register('Echo', lambda msg: ipc.reply(msg, {'pong': True}))
+        reply = asyncio.run(ipc.request_async('Tester', 'Echo', {'ping': True}, timeout=1))
+        self.assertTrue(reply.data['pong'])
+
+    def test_dropped_and_evicted_requests_fail_now(self):
+        scheduler = Scheduler()
+        for name, priority in (('FlightControl', 1), ('NavigationAI', 2), ('NPUDriver', 3)):
+            scheduler.add_process(Process(name, priority, lambda: None))
+        release = threading.Event()
+        for policy in (DROP_NEWEST, DROP_OLDEST):
+            ipc = IPC(async_mode=True, mailbox_capacity=1, backpressure=policy, trace='off')
+            ipc.attach_scheduler(scheduler)
+            ipc.register('NPUDriver', lambda msg: release.wait(2), priority=3)
+            ipc.send_message('Tester', 'NPUDriver', {})
+            time.sleep(0.05)
+            first = ipc.request('NavigationAI', 'NPUDriver', {'n': 1}, timeout=5)
+            second = ipc.request('FlightControl', 'NPUDriver', {'n': 2}, timeout=5)
+            # drop_newest refuses the second request; drop_oldest evicts the queued first one
+            lost, kept = (second, first) if policy == DROP_NEWEST else (first, second)
+            with self.assertRaises(MailboxFullError):
+                lost.result(timeout=0.5)
+            self.assertFalse(kept.done())
+            self.assertEqual(ipc.pending_requests(), 1)
+            # only the request still queued boosts the server
+            expected = 2 if policy == DROP_NEWEST else 1
+            self.assertEqual(scheduler.processes['NPUDriver'].priority, expected)
+            release.set()
+            ipc.shutdown()
+            release.clear()
+            scheduler.inherit_priority('NPUDriver', None)
+
+
+class PriorityInheritanceTest(unittest.TestCase):
+    def test_server_runs_at_most_critical_pending_requester(self):
+        scheduler = Scheduler()
+        ipc = IPC(trace='off')
+        ipc.attach_scheduler(scheduler)
+        for name, priority in (('NavigationAI', 2), ('NPUDriver', 3), ('CompositionAnalyzer', 4)):
+            scheduler.add_process(Process(name, priority, lambda: None))
+        inbox = []
+        ipc.register('NPUDriver', inbox.append, priority=3)
+        npu = scheduler.processes['NPUDriver']
+
+        science = ipc.request('CompositionAnalyzer', 'NPUDriver', {'task': 'composition_analysis'})
+        self.assertEqual(npu.priority, 3)
+        tracking = ipc.request('NavigationAI', 'NPUDriver', {'task': 'trajectory_tracking'})
+        # the request carries the requester's class and boosts the server
+        self.assertEqual(inbox[1].priority, 2)
+        self.assertEqual(npu.priority, 2)
+        self.assertEqual(ipc.inherited_priorities(), {'NPUDriver': 2})
+
+        time.sleep(0.01)
+        ipc.reply(inbox[1], {'result': 'hyperbolic'})
+        self.assertEqual(tracking.result(timeout=1).data['result'], 'hyperbolic')
+        self.assertEqual(npu.priority, 3)
+        ipc.reply(inbox[0], {'result': 'organics'})
+        self.assertTrue(science.done())
+        self.assertEqual((npu.priority, npu.base_priority), (3, 3))
+        self.assertEqual(ipc.inherited_priorities(), {})
+
+        # only the P2 request waited on a less critical server
+        inversion = ipc.metrics_snapshot()['priority_inversion_ns']
+        self.assertEqual(inversion['NPUDriver']['count'], 1)
+        self.assertGreaterEqual(inversion['NPUDriver']['max'], 10_000_000)
+        self.assertIn('atlas_ipc_priority_inversion_seconds_count{receiver="NPUDriver"} 1', ipc.metrics_text())
+
+    def test_inversion_ends_when_less_critical_work_is_gone(self):
+        ipc = IPC(trace='off')
+        inbox = []
+        ipc.register('NPUDriver', inbox.append)
+        ipc.set_priority('NavigationAI', 2)
+        ipc.set_priority('FlightControl', 1)
+        # a slow round trip with nothing less critical pending is not an inversion
+        alone = ipc.request('FlightControl', 'NPUDriver', {})
+        time.sleep(0.02)
+        ipc.reply(inbox[0], {})
+        self.assertTrue(alone.done())
+        self.assertNotIn('NPUDriver', ipc.metrics_snapshot()['priority_inversion_ns'])
+
+        science = ipc.request('CompositionAnalyzer', 'NPUDriver', {})
+        tracking = ipc.request('NavigationAI', 'NPUDriver', {})
+        time.sleep(0.01)
+        ipc.reply(inbox[1], {})
+        # the P2 request is no longer behind P4 work, however long its own reply takes
+        time.sleep(0.05)
+        ipc.reply(inbox[2], {})
+        self.assertTrue(science.done() and tracking.done())
+        inversion = ipc.metrics_snapshot()['priority_inversion_ns']['NPUDriver']
+        self.assertEqual(inversion['count'], 1)
+        self.assertGreaterEqual(inversion['max'], 10_000_000)
+        self.assertLess(inversion['max'], 50_000_000)
+
+    def test_timeout_drops_the_boost(self):
+        scheduler = Scheduler()
+        ipc = IPC(trace='off')
+        ipc.attach_scheduler(scheduler)
+        scheduler.add_process(Process('FileSystem', 3, lambda: None))
+        ipc.register('FileSystem', lambda msg: None)
+        ipc.set_priority('FlightControl', 1)
+        future = ipc.request('FlightControl', 'FileSystem', {}, timeout=0.05)
+        self.assertEqual(scheduler.processes['FileSystem'].priority, 1)
+        with self.assertRaises(TimeoutError):
+            future.result(timeout=1)
+        self.assertEqual(scheduler.processes['FileSystem'].priority, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
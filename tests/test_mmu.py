@@ -0,0 +1,325 @@
+import os
+import random
+import tempfile
+import unittest
+
+from kernel.ipc import IPC
+from kernel.mmu import (MMU, BuddyAllocator, OutOfMemoryError, MemoryAccessError, QuotaExceededError,
+                        RegionHandle, READ, WRITE, EXECUTE, RW, NORMAL, WARNING, CRITICAL, GLOBAL,
+                        MEMORY_PRESSURE_TOPIC)
+
+
+class BuddyAllocatorTest(unittest.TestCase):
+    def test_regions_do_not_overlap(self):
+        mmu = MMU()
+        sizes = {'FlightControl': 0x1000, 'NavigationAI': 0x3000, 'CameraDriver': 0x0800,
+                 'NPUDriver': 0x5000, 'CompositionAnalyzer': 0x0400}
+        for name, size in sizes.items():
+            mmu.allocate(name, size)
+        spans = sorted((r['base'], r['base'] + r['size']) for r in mmu.memory_map.values())
+        for (_, end), (start, _) in zip(spans, spans[1:]):
+            self.assertLessEqual(end, start)
+
+    def test_reallocate_and_free_return_blocks(self):
+        mmu = MMU(memory_size=0x10000)
+        for _ in range(50):
+            # a restarted service allocating again must not leak its old block
+            mmu.allocate('CameraDriver', 0x0800)
+        self.assertEqual(mmu.stats()['used'], 0x0800)
+        self.assertTrue(mmu.free('CameraDriver'))
+        self.assertFalse(mmu.free('CameraDriver'))
+        stats = mmu.stats()
+        self.assertEqual((stats['used'], stats['free_blocks']), (0, {0x10000: 1}))
+
+    def test_out_of_memory_on_reallocate_keeps_old_region(self):
+        mmu = MMU(memory_size=0x4000, min_block=0x1000)
+        base = mmu.allocate('NPUDriver', 0x2000)
+        mmu.allocate('CameraDriver', 0x1000)
+        with self.assertRaises(OutOfMemoryError):
+            mmu.allocate('NPUDriver', 0x2000)
+        self.assertEqual(mmu.memory_map['NPUDriver']['base'], base)
+        self.assertEqual(mmu.usage('NPUDriver'), 0x2000)
+        self.assertTrue(mmu.check_access('NPUDriver', base))
+
+    def test_realloc_in_place_and_moving(self):
+        mmu = MMU(memory_size=0x10000)
+        base = mmu.allocate('NPUDriver', 0x1000)
+        # the upper buddy is free: grows in place
+        self.assertEqual(mmu.realloc('NPUDriver', 0x2000), base)
+        mmu.allocate('CameraDriver', 0x2000)
+        # the next buddy is taken: the region moves
+        moved = mmu.realloc('NPUDriver', 0x4000)
+        self.assertNotEqual(moved, base)
+        self.assertEqual(mmu.realloc('NPUDriver', 0x100), moved)
+        self.assertEqual(mmu.stats()['used'], 0x2000 + 0x100)
+
+    def test_out_of_memory_and_fragmentation(self):
+        mmu = MMU(memory_size=0x4000, min_block=0x1000)
+        for i in range(4):
+            mmu.allocate(f"svc{i}", 0x0C00)
+        with self.assertRaises(OutOfMemoryError):
+            mmu.allocate('svc4', 0x100)
+        stats = mmu.stats()
+        self.assertEqual(stats['utilization'], 1.0)
+        self.assertAlmostEqual(stats['internal_fragmentation'], 0.25)
+        mmu.free('svc0')
+        mmu.free('svc2')
+        stats = mmu.stats()
+        # 8 KiB free but no 8 KiB block
+        self.assertEqual((stats['free'], stats['largest_free_block']), (0x2000, 0x1000))
+        self.assertAlmostEqual(stats['external_fragmentation'], 0.5)
+        with self.assertRaises(OutOfMemoryError):
+            mmu.allocate('svc5', 0x2000)
+
+    def test_random_churn_coalesces_fully(self):
+        allocator = BuddyAllocator(0x40000, 0x100)
+        rng = random.Random(7)
+        live = []
+        for _ in range(2000):
+            if live and rng.random() < 0.5:
+                allocator.free(live.pop(rng.randrange(len(live))))
+            else:
+                try:
+                    live.append(allocator.alloc(rng.randint(1, 0x2000)))
+                except OutOfMemoryError:
+                    pass
+        blocks = sorted((addr, allocator.block_size(addr)) for addr in live)
+        for (addr, size), (nxt, _) in zip(blocks, blocks[1:]):
+            self.assertLessEqual(addr + size, nxt)
+        for addr in live:
+            allocator.free(addr)
+        self.assertEqual(allocator.free_blocks(), {0x40000: 1})
+        with self.assertRaises(ValueError):
+            allocator.free(0)
+
+
+class AccessCheckTest(unittest.TestCase):
+    def test_multiple_regions_and_permissions(self):
+        mmu = MMU()
+        data = mmu.allocate('NavigationAI', 0x1000)
+        code = mmu.map('NavigationAI', 0x2000, READ | EXECUTE)
+        self.assertTrue(mmu.check_access('NavigationAI', data + 0x10, WRITE))
+        self.assertTrue(mmu.check_access('NavigationAI', code + 0x1FFF, EXECUTE))
+        self.assertFalse(mmu.check_access('NavigationAI', code, WRITE))
+        self.assertFalse(mmu.check_access('NavigationAI', data, EXECUTE))
+        self.assertFalse(mmu.check_access('NavigationAI', code + 0x2000))
+        self.assertFalse(mmu.check_access('FlightControl', data))
+        mmu.protect('NavigationAI', data, READ)
+        self.assertFalse(mmu.check_access('NavigationAI', data, WRITE))
+        self.assertEqual(mmu.memory_map['NavigationAI']['base'], data)
+
+    def test_tlb_hits_and_invalidation(self):
+        mmu = MMU()
+        # two sub-page regions share one page
+        first = mmu.map('CameraDriver', 0x400)
+        second = mmu.map('CameraDriver', 0x400, READ)
+        self.assertEqual(first // 0x1000, second // 0x1000)
+        for _ in range(10):
+            self.assertTrue(mmu.check_access('CameraDriver', first, RW))
+        self.assertFalse(mmu.check_access('CameraDriver', second, WRITE))
+        tlb = mmu.stats()['tlb']
+        self.assertEqual((tlb['hits'], tlb['misses']), (9, 2))
+        # unmapping invalidates the cached translation
+        self.assertTrue(mmu.unmap('CameraDriver', first))
+        self.assertFalse(mmu.check_access('CameraDriver', first))
+        self.assertTrue(mmu.check_access('CameraDriver', second))
+        self.assertFalse(mmu.unmap('NPUDriver', second))
+
+    def test_lookup_scales_with_many_regions(self):
+        mmu = MMU(memory_size=0x1000000, tlb_entries=8)
+        bases = [mmu.map('FileSystem', 0x100) for _ in range(5000)]
+        for base in bases[::97]:
+            self.assertIs(mmu.translate('FileSystem', base + 0xFF)['base'], base)
+        self.assertIsNone(mmu.translate('FileSystem', bases[-1] + 0x100))
+
+
+class BackedMemoryTest(unittest.TestCase):
+    def test_views_are_checked_and_zero_copy(self):
+        mmu = MMU(backing='bytearray')
+        base = mmu.allocate('NPUDriver', 0x800)
+        self.assertEqual(mmu.write('NPUDriver', base + 8, b'tensor'), 6)
+        snapshot = mmu.read('NPUDriver', base + 8, 6)
+        self.assertTrue(snapshot.readonly)
+        self.assertEqual(snapshot.tobytes(), b'tensor')
+        # a writable view aliases the same memory
+        mmu.view('NPUDriver', base + 8, 1, RW)[0] = ord('T')
+        self.assertEqual(snapshot.tobytes(), b'Tensor')
+        with self.assertRaises(MemoryAccessError):
+            mmu.read('NPUDriver', base + 0x7FF, 2)
+        with self.assertRaises(MemoryAccessError):
+            mmu.read('CameraDriver', base, 1)
+        mmu.protect('NPUDriver', base, READ)
+        with self.assertRaises(MemoryAccessError):
+            mmu.write('NPUDriver', base, b'x')
+        with self.assertRaises(MemoryAccessError):
+            MMU().read('NPUDriver', 0, 1)
+
+    def test_new_regions_are_zeroed_and_realloc_keeps_contents(self):
+        mmu = MMU(memory_size=0x10000, backing='bytearray')
+        base = mmu.allocate('CameraDriver', 0x1000)
+        mmu.write('CameraDriver', base, b'secret')
+        mmu.free('CameraDriver')
+        reused = mmu.allocate('NavigationAI', 0x1000)
+        self.assertEqual(reused, base)
+        self.assertEqual(mmu.read('NavigationAI', reused, 6).tobytes(), bytes(6))
+        mmu.write('NavigationAI', reused, b'orbit')
+        mmu.allocate('NPUDriver', 0x1000)
+        moved = mmu.realloc('NavigationAI', 0x4000)
+        self.assertNotEqual(moved, reused)
+        self.assertEqual(mmu.read('NavigationAI', moved, 5).tobytes(), b'orbit')
+        self.assertEqual(mmu.read('NavigationAI', moved + 0x1000, 0x3000).tobytes(), bytes(0x3000))
+
+    def test_file_backed_mmap(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'physical.bin')
+            mmu = MMU(memory_size=0x4000, backing='mmap', backing_path=path)
+            base = mmu.allocate('FileSystem', 0x100)
+            mmu.write('FileSystem', base, b'flash')
+            mmu.close()
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read()[base:base + 5], b'flash')
+        anonymous = MMU(memory_size=0x4000, backing='mmap')
+        anonymous.write('Tester', anonymous.allocate('Tester', 0x10), b'ok')
+        anonymous.close()
+
+
+class SharedRegionTest(unittest.TestCase):
+    def test_grants_refcounts_and_revocation(self):
+        mmu = MMU(backing='bytearray')
+        frame = mmu.map('CameraDriver', 0x1000)
+        mmu.write('CameraDriver', frame, b'comet')
+        mmu.grant('CameraDriver', frame, 'NPUDriver', READ)
+        mmu.grant('CameraDriver', frame, 'CompositionAnalyzer', RW)
+        # grantees see the same bytes, within their own permissions
+        self.assertEqual(mmu.read('NPUDriver', frame, 5).tobytes(), b'comet')
+        self.assertFalse(mmu.check_access('NPUDriver', frame, WRITE))
+        mmu.write('CompositionAnalyzer', frame, b'C')
+        self.assertEqual(mmu.read('NPUDriver', frame, 5).tobytes(), b'Comet')
+        # a read-only grantee cannot hand out write access
+        with self.assertRaises(MemoryAccessError):
+            mmu.grant('NPUDriver', frame, 'FileSystem', RW)
+        self.assertEqual(mmu.regions[frame]['refs'], 3)
+
+        # the owner unmaps: the block lives on while grantees map it
+        self.assertTrue(mmu.unmap('CameraDriver', frame))
+        self.assertEqual(mmu.read('NPUDriver', frame, 5).tobytes(), b'Comet')
+        self.assertEqual(mmu.revoke('CameraDriver', frame, 'NPUDriver'), 1)
+        self.assertFalse(mmu.check_access('NPUDriver', frame))
+        self.assertEqual(mmu.stats()['shared_regions'], 1)
+        self.assertTrue(mmu.free('CompositionAnalyzer'))
+        self.assertNotIn(frame, mmu.regions)
+        self.assertEqual(mmu.stats()['used'], 0)
+
+    def test_discarded_dead_letters_revoke_their_grants(self):
+        mmu = MMU(backing='bytearray')
+        ipc = IPC(trace='off', dead_letter_cap=1)
+        ipc.attach_mmu(mmu)
+        first = mmu.map('CameraDriver', 0x800)
+        second = mmu.map('CameraDriver', 0x800)
+        for base in (first, second, second):
+            ipc.send_message('CameraDriver', 'FileSystem', {'frame': mmu.handle('CameraDriver', base)})
+        # the evicted frame loses its grant; the retained copy of the second keeps it
+        self.assertFalse(mmu.check_access('FileSystem', first))
+        self.assertTrue(mmu.check_access('FileSystem', second))
+        self.assertEqual(mmu.regions[first]['refs'], 1)
+
+    def test_realloc_moves_grantee_mappings(self):
+        mmu = MMU(memory_size=0x10000, backing='bytearray')
+        base = mmu.allocate('NPUDriver', 0x1000)
+        mmu.grant('NPUDriver', base, 'NavigationAI')
+        mmu.allocate('CameraDriver', 0x1000)
+        mmu.write('NPUDriver', base, b'tensor')
+        self.assertTrue(mmu.check_access('NavigationAI', base))
+        moved = mmu.realloc('NPUDriver', 0x4000)
+        self.assertNotEqual(moved, base)
+        self.assertFalse(mmu.check_access('NavigationAI', base))
+        self.assertEqual(mmu.read('NavigationAI', moved, 6).tobytes(), b'tensor')
+        self.assertEqual(mmu.read('NavigationAI', moved + 0x3FFF, 1).tobytes(), b'\x00')
+
+    def test_ipc_passes_region_handles(self):
+        mmu = MMU(backing='bytearray')
+        ipc = IPC(trace='off')
+        ipc.attach_mmu(mmu)
+        frame = mmu.map('CameraDriver', 0x800)
+        mmu.write('CameraDriver', frame, b'nucleus')
+        seen = {}
+
+        def consumer(name):
+            def handler(msg):
+                handle = msg.data['frame']
+                seen[name] = mmu.read(name, handle.base, 7).tobytes()
+            return handler
+
+        for name in ('NPUDriver', 'CompositionAnalyzer'):
+            ipc.register(name, consumer(name))
+            ipc.subscribe(name, 'camera.frames')
+        handle = mmu.handle('CameraDriver', frame, READ)
+        self.assertIsInstance(handle, RegionHandle)
+        self.assertEqual(ipc.publish('CameraDriver', 'camera.frames', {'frame': handle}), 2)
+        self.assertEqual(seen, {'NPUDriver': b'nucleus', 'CompositionAnalyzer': b'nucleus'})
+        ipc.register('FileSystem', consumer('FileSystem'))
+        ipc.send_message('CameraDriver', 'FileSystem', {'frame': handle})
+        self.assertEqual(seen['FileSystem'], b'nucleus')
+        self.assertEqual(mmu.revoke('CameraDriver', frame), 3)
+        # a process without access cannot forward the region
+        with self.assertRaises(MemoryAccessError):
+            ipc.send_message('NPUDriver', 'FileSystem', {'frame': handle})
+
+
+class QuotaPressureTest(unittest.TestCase):
+    def test_process_and_global_quotas(self):
+        mmu = MMU(quota=0x3000)
+        mmu.set_quota('NPUDriver', 0x1000)
+        base = mmu.allocate('NPUDriver', 0x800)
+        with self.assertRaises(QuotaExceededError):
+            mmu.map('NPUDriver', 0x900)
+        # a refused re-allocation keeps the old region
+        with self.assertRaises(OutOfMemoryError):
+            mmu.allocate('NPUDriver', 0x1800)
+        self.assertEqual(mmu.memory_map['NPUDriver']['base'], base)
+        self.assertEqual(mmu.realloc('NPUDriver', 0x1000), base)
+        self.assertEqual(mmu.usage('NPUDriver'), 0x1000)
+        mmu.allocate('CameraDriver', 0x2000)
+        with self.assertRaises(QuotaExceededError):
+            mmu.allocate('FileSystem', 0x100)
+        mmu.free('CameraDriver')
+        self.assertEqual(mmu.usage('CameraDriver'), 0)
+        mmu.allocate('FileSystem', 0x100)
+
+    def test_watermark_crossings_notify_listeners(self):
+        mmu = MMU(memory_size=0x10000, min_block=0x1000)
+        events = []
+        mmu.on_pressure(events.append)
+        for i in range(11):
+            mmu.map('CameraDriver', 0x1000)
+        self.assertEqual(events, [])
+        mmu.map('CameraDriver', 0x1000)
+        self.assertEqual((events[-1]['scope'], events[-1]['level']), (GLOBAL, WARNING))
+        for i in range(3):
+            mmu.map('NPUDriver', 0x1000)
+        self.assertEqual([e['level'] for e in events], [WARNING, CRITICAL])
+        mmu.free('NPUDriver')
+        mmu.free('CameraDriver')
+        self.assertEqual([e['level'] for e in events], [WARNING, CRITICAL, WARNING, NORMAL])
+        # per-process pressure against its own quota
+        mmu.set_quota('NPUDriver', 0x4000)
+        mmu.map('NPUDriver', 0x3000)
+        self.assertEqual((events[-1]['scope'], events[-1]['level'], events[-1]['limit']), ('NPUDriver', WARNING, 0x4000))
+        self.assertEqual(mmu.stats()['pressure'], {GLOBAL: NORMAL, 'NPUDriver': WARNING})
+
+    def test_pressure_published_over_ipc(self):
+        mmu = MMU(memory_size=0x4000, min_block=0x1000)
+        ipc = IPC(trace='off')
+        ipc.attach_mmu(mmu)
+        received = []
+        ipc.register('FileSystem', received.append)
+        ipc.subscribe('FileSystem', MEMORY_PRESSURE_TOPIC)
+        for _ in range(3):
+            mmu.map('CameraDriver', 0x1000)
+        self.assertEqual(len(received), 1)
+        self.assertEqual(received[0].sender, 'MMU')
+        self.assertEqual(received[0].data['level'], WARNING)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,4 @@
+import threading
 import time
 import unittest
 
@@ -40,5 +41,26 @@ class RecoveryIntegrationTest(unittest.TestCase):
         time.sleep(2)
         self.assertTrue(called['ran'])
 
+    def test_quarantine_restart_runs_off_the_sender_thread(self):
+        ipc = IPC(trace='off', fault_threshold=1, quarantine_period=60)
+        recovery = RecoveryAgent(ipc)
+
+        def broken(msg):
+            raise RuntimeError('disk on fire')
+
+        ipc.register('FileSystem', broken)
+        hook_threads = []
+        # a passive service is only re-registered, never enqueued in the scheduler
+        recovery.register_restart_hook('FileSystem', lambda: (
+            hook_threads.append(threading.current_thread()), ipc.register('FileSystem', lambda msg: None)))
+        self.assertTrue(ipc.send_message('CameraDriver', 'FileSystem', {'action': 'save'}))
+        deadline = time.time() + 2
+        while not hook_threads and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(hook_threads), 1)
+        self.assertIsNot(hook_threads[0], threading.current_thread())
+        self.assertEqual(recovery.fault_count, {'FileSystem': 1})
+        self.assertFalse(ipc.handler_faults()['FileSystem']['quarantined'])
+
 if __name__ == '__main__':
     unittest.main()
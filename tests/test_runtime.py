@@ -0,0 +1,196 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from kernel.runtime import AsyncIPC, AsyncScheduler
+from kernel.scheduler import Process
+from drivers.propulsion import PropulsionDriver
+from services.recovery import RecoveryAgent
+
+
+class AsyncIPCTest(unittest.IsolatedAsyncioTestCase):
+    async def test_sync_and_async_handlers_run_on_the_loop(self):
+        ipc = AsyncIPC(trace='off')
+        received = []
+        loop_thread = threading.current_thread()
+
+        def sync_handler(msg):
+            received.append(('sync', msg.data['n'], threading.current_thread() is loop_thread))
+
+        async def async_handler(msg):
+            await asyncio.sleep(0.001 * (3 - msg.data['n']))
+            received.append(('async', msg.data['n']))
+
+        ipc.register('FileSystem', sync_handler)
+        ipc.register('NavigationAI', async_handler)
+        for n in range(3):
+            ipc.send_message('CameraDriver', 'FileSystem', {'n': n})
+            ipc.send_message('FlightControl', 'NavigationAI', {'n': n})
+        # delivery is scheduled, not inline
+        self.assertEqual(received, [])
+        await ipc.drain()
+        self.assertEqual([r for r in received if r[0] == 'sync'], [('sync', n, True) for n in range(3)])
+        # async handlers of one receiver are serialized in send order
+        self.assertEqual([r for r in received if r[0] == 'async'], [('async', n) for n in range(3)])
+
+    async def test_budget_cancels_async_handler_and_faults_are_isolated(self):
+        ipc = AsyncIPC(trace='off', fault_threshold=2, quarantine_period=60)
+        reports = []
+        ipc.register('RecoveryAgent', lambda msg: reports.append(msg.data))
+
+        async def stuck(msg):
+            await asyncio.sleep(10)
+
+        ipc.register('NPUDriver', stuck, handler_budget=0.02)
+        started = time.monotonic()
+        ipc.send_message('NavigationAI', 'NPUDriver', {})
+        ipc.send_message('NavigationAI', 'NPUDriver', {})
+        await ipc.drain()
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(ipc.handler_faults()['NPUDriver']['timeout'], 2)
+        await ipc.drain()
+        self.assertEqual([r['process'] for r in reports], ['NPUDriver'])
+
+    async def test_budgeted_sync_handler_blocks_its_thread_not_the_loop(self):
+        ipc = AsyncIPC(trace='off')
+        ticks = []
+        writes = []
+        loop_thread = threading.current_thread()
+
+        def disk_write(msg):
+            time.sleep(0.1)
+            writes.append(threading.current_thread() is loop_thread)
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        ipc.register('FileSystem', disk_write, handler_budget=1.0)
+        ipc.send_message('CameraDriver', 'FileSystem', {})
+        ipc.send_message('CameraDriver', 'FileSystem', {})
+        started = time.monotonic()
+        await asyncio.gather(ticker(), ipc.drain())
+        # the loop kept ticking while both writes blocked the FileSystem thread, in order
+        self.assertEqual(writes, [False, False])
+        self.assertLess(ticks[-1] - started, 0.1)
+        ipc.shutdown()
+
+    async def test_budgeted_sync_handler_overrun_records_timeout(self):
+        ipc = AsyncIPC(trace='off')
+        ipc.register('FileSystem', lambda msg: time.sleep(0.1), handler_budget=0.02)
+        ipc.send_message('CameraDriver', 'FileSystem', {})
+        await ipc.drain()
+        self.assertEqual(ipc.handler_faults()['FileSystem']['timeout'], 1)
+        ipc.shutdown()
+
+    async def test_propulsion_burn_awaits_instead_of_sleeping(self):
+        ipc = AsyncIPC(trace='off')
+        driver = PropulsionDriver(ipc)
+        self.assertTrue(asyncio.iscoroutinefunction(ipc.registered_processes['PropulsionDriver']))
+        received = []
+        ipc.register('RecoveryAgent', lambda msg: received.append(msg.data))
+        ipc.register('Tester', lambda msg: received.append(msg.data))
+        ipc.send_message('Tester', 'PropulsionDriver', {'action': 'burn', 'duration': 10, 'thrust': 1.5})
+        await ipc.drain()
+        self.assertIn({'status': 'ack', 'action': 'burn'}, received)
+        self.assertIn({'telemetry': {'thrust': 1.5, 'duration_ms': 10}}, received)
+        self.assertEqual(driver.state, 'BURNING')
+
+    async def test_request_reply_and_deadline_timer(self):
+        ipc = AsyncIPC(trace='off')
+
+        async def npu(msg):
+            await asyncio.sleep(0.001)
+            ipc.reply(msg, {'result': msg.data['x'] * 2})
+
+        ipc.register('NPUDriver', npu)
+        ipc.register('Silent', lambda msg: None)
+        reply = await ipc.request_async('NavigationAI', 'NPUDriver', {'x': 21}, timeout=1)
+        self.assertEqual(reply.data['result'], 42)
+        with self.assertRaises(TimeoutError):
+            await ipc.request_async('NavigationAI', 'Silent', {}, timeout=0.02)
+        # no deadline reaper thread in this runtime
+        self.assertIsNone(ipc._reaper)
+
+
+class AsyncSchedulerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_thousands_of_services_without_threads(self):
+        ipc = AsyncIPC(trace='off')
+        scheduler = AsyncScheduler()
+        heartbeats = set()
+        ipc.register('RecoveryAgent', lambda msg: heartbeats.add(msg.sender))
+        threads_before = threading.active_count()
+
+        def make_service(name):
+            async def run():
+                await asyncio.sleep(0.001)
+                ipc.send_message(name, 'RecoveryAgent', {'type': 'heartbeat'})
+            return run
+
+        for i in range(2000):
+            scheduler.add_process(Process(f"svc{i}", 3, make_service(f"svc{i}"), period=5.0))
+        scheduler.run([])
+        deadline = time.monotonic() + 5
+        while len(heartbeats) < 2000 and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        scheduler.stop()
+        self.assertEqual(len(heartbeats), 2000)
+        self.assertEqual(threading.active_count(), threads_before)
+
+    async def test_periodic_process_and_awaiting_body(self):
+        scheduler = AsyncScheduler()
+        runs = []
+        io_done = []
+
+        async def driver_io():
+            await asyncio.sleep(0.05)
+            io_done.append(time.monotonic())
+
+        scheduler.add_process(Process('FlightControl', 1, lambda: runs.append(time.monotonic()), period=0.02))
+        scheduler.add_process(Process('CameraDriver', 3, driver_io, period=1.0))
+        scheduler.run([])
+        await asyncio.sleep(0.2)
+        scheduler.stop()
+        # FlightControl kept its period while the camera body awaited I/O
+        self.assertGreaterEqual(len(runs), 8)
+        self.assertEqual(len(io_done), 1)
+
+
+    async def test_sync_body_with_wcet_runs_off_the_loop(self):
+        scheduler = AsyncScheduler()
+        loop_thread = threading.current_thread()
+        ran_on = []
+        ticks = []
+
+        def blocking_io():
+            time.sleep(0.1)
+            ran_on.append(threading.current_thread() is loop_thread)
+
+        scheduler.add_process(Process('CameraDriver', 3, blocking_io, period=1.0, wcet=0.15))
+        scheduler.run([])
+        started = time.monotonic()
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.15)
+        scheduler.stop()
+        self.assertEqual(ran_on, [False])
+        self.assertLess(ticks[-1] - started, 0.1)
+
+
+class AsyncRecoveryTest(unittest.IsolatedAsyncioTestCase):
+    async def test_monitor_runs_as_loop_timer(self):
+        ipc = AsyncIPC(trace='off')
+        recovery = RecoveryAgent(ipc)
+        self.assertIsNone(recovery._monitor_thread)
+        restarted = asyncio.Event()
+        recovery.monitor('CameraDriver')
+        recovery.register_restart_hook('CameraDriver', restarted.set)
+        recovery.monitored_processes['CameraDriver']['last_heartbeat'] = time.time() - 10
+        await asyncio.wait_for(restarted.wait(), 2.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,426 @@
+import functools
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from kernel.export import StateExporter
+from kernel.scheduler import (Scheduler, Process, AdmissionError, RoundRobinPolicy, IndexedHeap,
+                              response_times, checkpoint, READY, RUNNING, BLOCKED, SUSPENDED, DEAD)
+from kernel.ipc import IPC
+from kernel.metrics import RunAccounting
+
+
+class PeriodicSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = Scheduler()
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def test_add_process_wakes_idle_loop(self):
+        self.scheduler.run([], tick_ms=1000)
+        time.sleep(0.05)
+        ran = threading.Event()
+        started = time.monotonic()
+        self.scheduler.add_process(Process('Probe', 2, ran.set))
+        self.assertTrue(ran.wait(1))
+        self.assertLess(time.monotonic() - started, 0.05)
+
+    def test_processes_run_at_their_declared_periods(self):
+        runs = {'Fast': [], 'Slow': []}
+        self.scheduler.add_process(Process('Fast', 1, lambda: runs['Fast'].append(time.monotonic()), period=0.02))
+        self.scheduler.add_process(Process('Slow', 4, lambda: runs['Slow'].append(time.monotonic()), period=0.1))
+        self.scheduler.run([])
+        time.sleep(0.35)
+        self.scheduler.stop()
+        # a P1 process with a short period no longer starves lower classes
+        self.assertGreaterEqual(len(runs['Fast']), 10)
+        self.assertTrue(3 <= len(runs['Slow']) <= 5, runs['Slow'])
+        gaps = [b - a for a, b in zip(runs['Slow'], runs['Slow'][1:])]
+        for gap in gaps:
+            self.assertAlmostEqual(gap, 0.1, delta=0.03)
+
+    def test_overrun_releases_immediately_without_burst(self):
+        runs = []
+
+        def slow():
+            runs.append(time.monotonic())
+            time.sleep(0.06)
+
+        self.scheduler.add_process(Process('Overrun', 3, slow, period=0.02))
+        self.scheduler.run([])
+        time.sleep(0.3)
+        self.scheduler.stop()
+        gaps = [b - a for a, b in zip(runs, runs[1:])]
+        self.assertTrue(gaps)
+        self.assertTrue(all(gap >= 0.055 for gap in gaps), gaps)
+
+
+def _record_pid(path):
+    with open(path, 'a') as f:
+        f.write(f"{os.getpid()}\n")
+
+
+class MultiWorkerTest(unittest.TestCase):
+    def test_slow_low_priority_work_does_not_delay_p1(self):
+        scheduler = Scheduler(workers=2)
+        p1_runs = []
+        scheduler.add_process(Process('FlightControl', 1, lambda: p1_runs.append(time.monotonic()), period=0.02))
+        scheduler.add_process(Process('CompositionAnalyzer', 4, lambda: time.sleep(0.3), period=1.0))
+        scheduler.run([])
+        time.sleep(0.3)
+        scheduler.stop()
+        self.assertGreaterEqual(len(p1_runs), 10)
+
+    def test_idle_worker_steals_work(self):
+        scheduler = Scheduler(workers=3)
+        running = []
+        overlap = threading.Event()
+
+        def job():
+            running.append(1)
+            if len(running) >= 2:
+                overlap.set()
+            overlap.wait(1)
+
+        # both P3 processes home on the same worker; another one must steal
+        scheduler.add_process(Process('CameraDriver', 3, job, period=5.0))
+        scheduler.add_process(Process('NPUDriver', 3, job, period=5.0))
+        self.assertEqual(scheduler._home(scheduler.processes['CameraDriver']),
+                         scheduler._home(scheduler.processes['NPUDriver']))
+        scheduler.run([])
+        self.assertTrue(overlap.wait(1))
+        scheduler.stop()
+        self.assertGreaterEqual(sum(w['steals'] for w in scheduler.worker_stats), 1)
+        # the dedicated P1 worker never steals
+        self.assertEqual(scheduler.worker_stats[0]['steals'], 0)
+
+    def test_cpu_bound_process_runs_in_process_pool(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'pids')
+            scheduler = Scheduler(process_workers=1)
+            scheduler.add_process(Process('Crunch', 4, functools.partial(_record_pid, path),
+                                          period=5.0, cpu_bound=True))
+            scheduler.run([])
+            deadline = time.monotonic() + 20
+            while not os.path.exists(path) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            scheduler.stop()
+            with open(path) as f:
+                pid = int(f.read().split()[0])
+            self.assertNotEqual(pid, os.getpid())
+
+    def test_cpu_bound_process_must_be_picklable(self):
+        scheduler = Scheduler(process_workers=1)
+        # a bound method of a service holding the hub (locks, threads) cannot cross processes
+        service = IPC(trace='off')
+        with self.assertRaises(TypeError):
+            scheduler.add_process(Process('CompositionAnalyzer', 4, service.flush, cpu_bound=True))
+        self.assertNotIn('CompositionAnalyzer', scheduler.processes)
+
+
+class AccountingTest(unittest.TestCase):
+    def test_ring_keeps_recent_runs_and_counts_misses(self):
+        acct = RunAccounting(capacity=4)
+        for i in range(10):
+            release = i * 1000
+            acct.record(release, release + 10 + i, release + 110 + i, release + 114)
+        summary = acct.summary(10 * 1000)
+        self.assertEqual(summary['runs'], 10)
+        self.assertEqual(summary['deadline_misses'], 5)
+        # only the last 4 runs (latency 16..19) are retained
+        self.assertEqual(summary['latency_max_ns'], 19)
+        self.assertEqual(summary['jitter_ns'], 3)
+        self.assertEqual(summary['exec_max_ns'], 100)
+
+    def test_scheduler_reports_misses_and_cpu_share(self):
+        scheduler = Scheduler()
+        scheduler.add_process(Process('FlightControl', 1, lambda: time.sleep(0.01), period=0.05))
+        scheduler.add_process(Process('Overrun', 4, lambda: time.sleep(0.03), period=0.02))
+        scheduler.run([])
+        time.sleep(0.3)
+        scheduler.stop()
+        stats = scheduler.process_stats()
+        self.assertEqual(stats['FlightControl']['deadline_misses'], 0)
+        self.assertGreater(stats['Overrun']['deadline_misses'], 0)
+        self.assertGreater(stats['Overrun']['cpu_share'], stats['FlightControl']['cpu_share'])
+        row = {p['name']: p for p in scheduler.snapshot()['processes']}['FlightControl']
+        self.assertEqual(row['priority'], 'P1')
+        self.assertGreater(row['cpu'], 0)
+
+    def test_exporter_posts_snapshot_to_the_state_server(self):
+        received = []
+
+        class KernelState(BaseHTTPRequestHandler):
+            def do_POST(self):
+                received.append((self.path, json.loads(self.rfile.read(int(self.headers['Content-Length'])))))
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(b'{"ok": true}')
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(('127.0.0.1', 0), KernelState)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        scheduler = Scheduler()
+        scheduler.add_process(Process('FlightControl', 1, lambda: time.sleep(0.005), period=0.02))
+        scheduler.run([])
+        time.sleep(0.1)
+        scheduler.stop()
+        url = f"http://127.0.0.1:{server.server_port}/api/kernel/state"
+        self.assertTrue(StateExporter(scheduler, url).push())
+        path, state = received[0]
+        self.assertEqual(path, '/api/kernel/state')
+        row = state['processes'][0]
+        self.assertEqual(row['name'], 'FlightControl')
+        self.assertIn('deadlineMisses', row)
+        self.assertIn('jitterMs', row)
+        # no server: the push fails quietly and the next one retries
+        server.shutdown()
+        server.server_close()
+        self.assertFalse(StateExporter(scheduler, url).push())
+
+
+class LifecycleTest(unittest.TestCase):
+    def test_indexed_heap_matches_sorted_order(self):
+        rng = random.Random(7)
+        heap = IndexedHeap()
+        keys = {}
+        for i in range(200):
+            name = f"p{i}"
+            keys[name] = rng.random()
+            heap.push(name, keys[name], name)
+        for name in rng.sample(sorted(keys), 50):
+            self.assertEqual(heap.remove(name), name)
+            del keys[name]
+        for name in rng.sample(sorted(keys), 50):
+            keys[name] = rng.random()
+            heap.update(name, keys[name])
+        self.assertIsNone(heap.remove('missing'))
+        popped = [heap.pop() for _ in range(len(heap))]
+        self.assertEqual(popped, sorted(keys, key=keys.get))
+
+    def test_restart_replaces_instead_of_duplicating(self):
+        scheduler = Scheduler()
+        old = Process('NavigationAI', 2, print)
+        scheduler.add_process(old)
+        new = Process('NavigationAI', 2, print)
+        scheduler.add_process(new)
+        self.assertEqual(old.state, DEAD)
+        self.assertIs(scheduler.processes['NavigationAI'], new)
+        self.assertEqual(sum(len(q) for q in scheduler.run_queues), 1)
+
+    def test_suspend_resume_remove_and_reprioritize(self):
+        scheduler = Scheduler()
+        transitions = []
+        scheduler.on_state_change(lambda name, old, new: transitions.append((name, old, new)))
+        runs = {'CameraDriver': 0, 'NPUDriver': 0}
+
+        def body(name):
+            runs[name] += 1
+
+        for name in runs:
+            scheduler.add_process(Process(name, 3, functools.partial(body, name), period=0.02))
+        scheduler.suspend('NPUDriver')
+        self.assertEqual(scheduler.state_of('NPUDriver'), SUSPENDED)
+        scheduler.run([])
+        time.sleep(0.1)
+        self.assertEqual(runs['NPUDriver'], 0)
+        self.assertGreater(runs['CameraDriver'], 0)
+        scheduler.resume('NPUDriver')
+        time.sleep(0.1)
+        self.assertGreater(runs['NPUDriver'], 0)
+        scheduler.set_priority('NPUDriver', 1)
+        self.assertEqual(scheduler.processes['NPUDriver'].priority, 1)
+        self.assertTrue(scheduler.remove_process('CameraDriver'))
+        self.assertFalse(scheduler.remove_process('CameraDriver'))
+        time.sleep(0.05)
+        count = runs['CameraDriver']
+        time.sleep(0.1)
+        scheduler.stop()
+        self.assertEqual(runs['CameraDriver'], count)
+        seen = {(old, new) for name, old, new in transitions if name == 'CameraDriver'}
+        self.assertTrue({(READY, RUNNING), (RUNNING, BLOCKED), (BLOCKED, READY)} <= seen)
+        self.assertIn(DEAD, {new for name, old, new in transitions if name == 'CameraDriver'})
+        self.assertIn(('NPUDriver', READY, SUSPENDED), transitions)
+
+    def test_inherited_priority_reorders_queue_and_keeps_base(self):
+        scheduler = Scheduler()
+        scheduler.add_process(Process('CameraDriver', 3, lambda: None))
+        scheduler.add_process(Process('CompositionAnalyzer', 4, lambda: None))
+        self.assertTrue(scheduler.inherit_priority('CompositionAnalyzer', 2))
+        self.assertEqual(scheduler._take(0).name, 'CompositionAnalyzer')
+        # a base change while boosted keeps the boost until it is dropped
+        scheduler.set_priority('CompositionAnalyzer', 3)
+        proc = scheduler.processes['CompositionAnalyzer']
+        self.assertEqual((proc.priority, proc.base_priority), (2, 3))
+        scheduler.inherit_priority('CompositionAnalyzer', None)
+        self.assertEqual(proc.priority, 3)
+        self.assertFalse(scheduler.inherit_priority('Unknown', 1))
+
+
+class PreemptionTest(unittest.TestCase):
+    def test_generator_body_is_preempted_for_higher_priority(self):
+        scheduler = Scheduler()
+        p1_runs = []
+        science_done = threading.Event()
+
+        def science():
+            for _ in range(150):
+                time.sleep(0.002)
+                yield
+            science_done.set()
+
+        scheduler.add_process(Process('CompositionAnalyzer', 4, science, period=10.0))
+        scheduler.add_process(Process('FlightControl', 1, lambda: p1_runs.append(time.monotonic()), period=0.02))
+        scheduler.run([])
+        self.assertTrue(science_done.wait(3))
+        scheduler.stop()
+        # P1 kept its cadence while the 300 ms science body was running
+        self.assertGreaterEqual(len(p1_runs), 8)
+        self.assertGreater(scheduler.worker_stats[0]['preemptions'], 0)
+        self.assertEqual(scheduler.process_stats('CompositionAnalyzer')['runs'], 1)
+
+    def test_quantum_time_slices_equal_priority_bodies(self):
+        scheduler = Scheduler(quantum=0.005)
+        trace = []
+
+        def body(name):
+            for _ in range(20):
+                trace.append(name)
+                time.sleep(0.001)
+                yield
+
+        scheduler.add_process(Process('CameraDriver', 3, functools.partial(body, 'C'), period=10.0))
+        scheduler.add_process(Process('NPUDriver', 3, functools.partial(body, 'N'), period=10.0))
+        scheduler.run([])
+        time.sleep(0.2)
+        scheduler.stop()
+        self.assertEqual(trace.count('C'), 20)
+        self.assertEqual(trace.count('N'), 20)
+        switches = sum(1 for a, b in zip(trace, trace[1:]) if a != b)
+        self.assertGreater(switches, 2)
+
+    def test_round_robin_switches_same_class_only_on_quantum(self):
+        scheduler = Scheduler(policy='rr', quantum=0.05)
+        trace = []
+
+        def body(name):
+            for _ in range(10):
+                trace.append(name)
+                time.sleep(0.001)
+                yield
+
+        scheduler.add_process(Process('CameraDriver', 3, functools.partial(body, 'C'), period=10.0))
+        scheduler.add_process(Process('NPUDriver', 3, functools.partial(body, 'N'), period=10.0))
+        scheduler.run([])
+        time.sleep(0.2)
+        scheduler.stop()
+        # each 10 ms body fits in one quantum: no ABAB alternation at every yield
+        self.assertEqual(trace, ['C'] * 10 + ['N'] * 10)
+
+    def test_coroutine_body_and_suspension_at_safe_point(self):
+        scheduler = Scheduler(quantum=0.001)
+        steps = []
+
+        async def navigation():
+            for i in range(50):
+                steps.append(i)
+                time.sleep(0.001)
+                await checkpoint()
+
+        scheduler.add_process(Process('NavigationAI', 2, navigation, period=10.0))
+        scheduler.run([])
+        time.sleep(0.01)
+        scheduler.suspend('NavigationAI')
+        time.sleep(0.02)
+        paused_at = len(steps)
+        time.sleep(0.05)
+        self.assertEqual(len(steps), paused_at)
+        self.assertLess(paused_at, 50)
+        scheduler.resume('NavigationAI')
+        time.sleep(0.2)
+        scheduler.stop()
+        self.assertEqual(steps, list(range(50)))
+
+
+class PolicyTest(unittest.TestCase):
+    def _first_runs(self, policy, processes):
+        scheduler = Scheduler(policy=policy)
+        order = []
+        for name, priority, kwargs in processes:
+            scheduler.add_process(Process(name, priority, lambda n=name: order.append(n), **kwargs))
+        scheduler.run([], tick_ms=1000)
+        time.sleep(0.1)
+        scheduler.stop()
+        return order[:len(processes)]
+
+    def test_edf_runs_earliest_deadline_first(self):
+        order = self._first_runs('edf', [
+            ('FlightControl', 1, {'period': 1.0}),
+            ('CameraDriver', 3, {'period': 1.0, 'deadline': 0.2}),
+            ('CompositionAnalyzer', 4, {'period': 0.5}),
+        ])
+        self.assertEqual(order, ['CameraDriver', 'CompositionAnalyzer', 'FlightControl'])
+
+    def test_rate_monotonic_orders_by_period(self):
+        order = self._first_runs('rm', [
+            ('Slow', 1, {'period': 2.0}),
+            ('Fast', 4, {'period': 0.5}),
+        ])
+        self.assertEqual(order, ['Fast', 'Slow'])
+
+    def test_equal_priority_is_stable(self):
+        order = self._first_runs('priority', [
+            ('CameraDriver', 3, {}), ('NPUDriver', 3, {}), ('PropulsionDriver', 3, {}),
+        ])
+        self.assertEqual(order, ['CameraDriver', 'NPUDriver', 'PropulsionDriver'])
+
+    def test_round_robin_prefers_least_recently_run(self):
+        policy = RoundRobinPolicy()
+        a, b = Process('A', 3, None), Process('B', 3, None)
+        a.last_dispatch, b.last_dispatch = 7, 3
+        self.assertLess(policy.key(b, 1.0), policy.key(a, 1.0))
+
+    def test_response_time_analysis(self):
+        self.assertEqual(response_times([(7, 3, 7), (12, 3, 12), (20, 5, 20)]), [3, 6, 20])
+        self.assertEqual(response_times([(7, 3, 7), (12, 3, 12), (20, 6, 20)])[2], None)
+
+    def test_admission_control(self):
+        rm = Scheduler(policy='rm')
+        rm.add_process(Process('T1', 1, print, period=0.007, wcet=0.003))
+        rm.add_process(Process('T2', 2, print, period=0.012, wcet=0.003))
+        with self.assertRaises(AdmissionError):
+            rm.add_process(Process('T3', 3, print, period=0.020, wcet=0.006))
+        self.assertNotIn('T3', rm.processes)
+        # best-effort processes (no wcet) are always admitted
+        rm.add_process(Process('Logger', 4, print))
+
+        edf = Scheduler(policy='edf')
+        edf.add_process(Process('A', 1, print, period=0.01, wcet=0.005))
+        edf.add_process(Process('B', 2, print, period=0.02, wcet=0.01))
+        self.assertAlmostEqual(edf.utilization(), 1.0)
+        with self.assertRaises(AdmissionError):
+            edf.add_process(Process('C', 3, print, period=0.1, wcet=0.001))
+        # a restart under the same name replaces the old task instead of adding to it
+        edf.add_process(Process('B', 2, print, period=0.02, wcet=0.01))
+
+    def test_fixed_priority_admission_uses_class_order(self):
+        for policy in ('priority', 'rr'):
+            scheduler = Scheduler(policy=policy)
+            scheduler.add_process(Process('FlightControl', 1, print, period=0.005, wcet=0.0025))
+            # U = 1.0, but the short P2 period misses behind the long P1 job
+            with self.assertRaises(AdmissionError):
+                scheduler.add_process(Process('NavigationAI', 2, print, period=0.002, wcet=0.001))
+            scheduler.add_process(Process('NavigationAI', 2, print, period=0.01, wcet=0.002))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import threading
+import unittest
+
+from kernel.ipc import IPC
+from kernel.transport import spawn_service
+from drivers.npu import NPUDriver
+from services.navigation import NavigationAI
+
+
+class OutOfProcessServiceTest(unittest.TestCase):
+    def setUp(self):
+        self.ipc = IPC(trace='off')
+        self.heartbeats = []
+        self.got_heartbeat = threading.Event()
+        self.ipc.register('RecoveryAgent', self.on_recovery)
+        self.npu = spawn_service(self.ipc, 'NPUDriver', NPUDriver, priority=3)
+
+    def tearDown(self):
+        self.npu.stop()
+        self.ipc.shutdown()
+
+    def on_recovery(self, msg):
+        self.heartbeats.append(msg.sender)
+        self.got_heartbeat.set()
+
+    def test_request_reply_crosses_process_boundary(self):
+        self.assertTrue(self.npu.is_alive())
+        self.assertEqual(self.ipc.priority_of('NPUDriver'), 3)
+        nav = NavigationAI(self.ipc, self.npu)
+        reply = nav.track_comet().result(timeout=5)
+        self.assertEqual(reply.sender, 'NPUDriver')
+        self.assertEqual(reply.data['result']['speed'], '30 km/s')
+
+    def test_scheduler_run_reaches_worker(self):
+        self.npu.run()
+        self.assertTrue(self.got_heartbeat.wait(5))
+        self.assertIn('NPUDriver', self.heartbeats)
+
+    def test_dead_worker_is_unregistered(self):
+        self.npu.stop()
+        self.npu._reader.join(5)
+        self.assertNotIn('NPUDriver', self.ipc.registered_processes)
+        self.ipc.send_message('NavigationAI', 'NPUDriver', {'action': 'process'})
+        self.assertEqual(self.ipc.message_queue[-1].receiver, 'NPUDriver')
+
+
+if __name__ == '__main__':
+    unittest.main()
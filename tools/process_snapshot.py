@@ -6,6 +6,10 @@ human-readable snapshot of active processes in Portuguese.
 Example line:
 servico_controle_voo P1 status: rodando CPU%: 5.0%
 
+With the Python kernel running (main.py pushes Scheduler.snapshot() to the
+server through kernel/export.py), CPU is the real share and the PERDAS
+(deadline misses) and JITTER columns appear.
+
 Run:
   python3 tools/process_snapshot.py
 
@@ -27,9 +31,9 @@ def human_status(s):
     s_lower = s.lower()
     if s_lower in ('running', 'rodando'):
         return 'rodando'
-    if s_lower in ('waiting', 'sleeping', 'paused', 'wait'):
+    if s_lower in ('waiting', 'sleeping', 'paused', 'wait', 'blocked', 'ready', 'suspended'):
         return 'waiting'
-    if s_lower in ('stopped', 'stopped'):
+    if s_lower in ('stopped', 'dead'):
         return 'stopped'
     return s
 
@@ -76,14 +80,17 @@ def print_snapshot(state):
     prio_w = 4
     status_w = 12
     cpu_w = 7
+    # scheduler accounting (Scheduler.snapshot) adds deadline misses and jitter
+    accounting = any('deadlineMisses' in p for p in processes)
 
     # header
     hdr_name = 'PROCESSO'.ljust(name_w)
     hdr_prio = 'P'.center(prio_w)
     hdr_status = 'STATUS'.center(status_w)
     hdr_cpu = 'CPU'.rjust(cpu_w)
-    print(f"{hdr_name} {hdr_prio} {hdr_status} {hdr_cpu}")
-    print('-' * min(cols, name_w + prio_w + status_w + cpu_w + 6))
+    hdr_extra = f" {'PERDAS'.rjust(6)} {'JITTER'.rjust(9)}" if accounting else ''
+    print(f"{hdr_name} {hdr_prio} {hdr_status} {hdr_cpu}{hdr_extra}")
+    print('-' * min(cols, name_w + prio_w + status_w + cpu_w + 6 + len(hdr_extra)))
 
     for p in processes:
         name = p.get('name') or '<sem-nome>'
@@ -105,7 +112,14 @@ def print_snapshot(state):
             status_text = status_text[:status_w]
         status_col = status_text.center(status_w)
 
-        print(f"{name_col} {prio_col} {color}{status_col}{RESET} {cpu_fmt.rjust(cpu_w)}")
+        extra = ''
+        if accounting:
+            misses = str(p.get('deadlineMisses', ''))
+            jitter = p.get('jitterMs')
+            jitter_fmt = f"{jitter:.2f}ms" if isinstance(jitter, (int, float)) else ''
+            extra = f" {misses.rjust(6)} {jitter_fmt.rjust(9)}"
+
+        print(f"{name_col} {prio_col} {color}{status_col}{RESET} {cpu_fmt.rjust(cpu_w)}{extra}")
 
     print(border)
     print('\n')